@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ContactsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.contacts'
+
+    def ready(self):
+        from apps.contacts.signals import (caller_id,  # noqa: F401
+                                           funnel, response_cache,
+                                           search_index, versioning)
@@ -0,0 +1,236 @@
+import gzip
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.tenants.models import Tenant
+from apps.utils.cache import TTLCache
+from apps.utils.pagination import CreatedOnKeysetPagination
+from apps.utils.response_cache import (CONTACTS, invalidate_responses,
+                                       invalidate_timelines)
+
+from .models import (ArchivedContact, ArchiveKind, ArchiveSegment, Contact,
+                     ContactNote, ContactTimeline)
+
+# kind -> (model, text column)
+ARCHIVE_MODELS = {
+    ArchiveKind.TIMELINE: (ContactTimeline, "title"),
+    ArchiveKind.NOTES: (ContactNote, "body"),
+}
+DELETE_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=None)
+def get_archive_storage():
+    """CONTACT_ARCHIVE_STORAGE may name any Django storage class, e.g. an object storage one"""
+    storage_path = getattr(settings, "CONTACT_ARCHIVE_STORAGE", None)
+    if storage_path:
+        return import_string(storage_path)()
+    return FileSystemStorage(location=settings.CONTACT_ARCHIVE_ROOT)
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime) -> datetime:
+    return month_start(month_start(value) + timedelta(days=32))
+
+
+class ContactArchiver:
+    """
+    Moves a tenant's timeline entries and notes older than archive_after_days
+    out of the database into one gzipped JSON file per kind and month.
+
+    Whole months are archived at once, oldest first. Each month is written to
+    storage before its rows are deleted in the same transaction that records
+    the segment, so a failed run leaves at most an unreferenced file behind.
+    """
+
+    def __init__(self, tenant: Tenant, now: Optional[datetime] = None) -> None:
+        self._tenant = tenant
+        now = now or timezone.now()
+        # Only months that ended before the threshold are complete
+        self.cutoff = month_start(now - timedelta(days=tenant.archive_after_days))
+
+    def archive(self) -> Dict[str, int]:
+        """Archive every kind, returns the number of rows moved per kind"""
+        return {kind.value: self.archive_kind(kind) for kind in ARCHIVE_MODELS}
+
+    def archive_kind(self, kind: ArchiveKind) -> int:
+        model, _ = ARCHIVE_MODELS[kind]
+        archived = 0
+        while True:
+            oldest = (
+                model.objects.filter(tenant=self._tenant, created_on__lt=self.cutoff)
+                .order_by("created_on")
+                .values_list("created_on", flat=True)
+                .first()
+            )
+            if oldest is None:
+                return archived
+            archived += self.archive_month(kind, month_start(oldest))
+
+    def archive_month(self, kind: ArchiveKind, period: datetime) -> int:
+        model, text_field = ARCHIVE_MODELS[kind]
+        rows = list(
+            model.objects.filter(
+                tenant=self._tenant, created_on__gte=period, created_on__lt=next_month(period)
+            )
+            .order_by("contact_id", "-created_on", "-id")
+            .values_list("id", "contact_id", "created_on", text_field)
+        )
+        contacts = defaultdict(list)
+        for row_id, contact_id, created_on, text in rows:
+            contacts[contact_id].append([row_id, created_on.isoformat(), text])
+
+        path = (
+            f"{self._tenant.id}/{kind.lower()}/{period:%Y-%m}/{uuid.uuid4().hex}.json.gz"
+        )
+        payload = json.dumps({"contacts": contacts}, separators=(",", ":")).encode("utf-8")
+        storage = get_archive_storage()
+        path = storage.save(path, ContentFile(gzip.compress(payload)))
+
+        try:
+            with transaction.atomic():
+                segment = ArchiveSegment.objects.create(
+                    tenant=self._tenant,
+                    kind=kind,
+                    period=period.date(),
+                    path=path,
+                    row_count=len(rows),
+                )
+                ArchivedContact.objects.bulk_create(
+                    [
+                        ArchivedContact(
+                            segment=segment,
+                            contact_id=contact_id,
+                            kind=kind,
+                            row_count=len(contact_rows),
+                            # Rows are newest first
+                            newest_created_on=datetime.fromisoformat(contact_rows[0][1]),
+                            oldest_created_on=datetime.fromisoformat(contact_rows[-1][1]),
+                        )
+                        for contact_id, contact_rows in contacts.items()
+                    ]
+                )
+                ids = [row[0] for row in rows]
+                for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                    # A plain DELETE: delete() would load every row for the post_delete
+                    # receivers, whose invalidations are done once for the segment below
+                    batch = model.objects.filter(id__in=ids[start:start + DELETE_BATCH_SIZE])
+                    batch._raw_delete(batch.db)
+                if kind == ArchiveKind.TIMELINE:
+                    invalidate_timelines(self._tenant.id, contacts)
+                else:
+                    # Archived notes may have been among a contact's latest notes
+                    Contact.objects.filter(id__in=contacts).update(updated_on=timezone.now())
+                    invalidate_responses(self._tenant.id, CONTACTS)
+        except Exception:
+            storage.delete(path)
+            raise
+        return len(rows)
+
+
+class ArchiveReader:
+    """Reads archived rows of a contact, keeping recently read segments parsed in memory"""
+
+    def __init__(self, cache_size: int = 64) -> None:
+        # Segments never change once written
+        self._segments = TTLCache(maxsize=cache_size, ttl=3600)
+
+    def read_segment(self, path: str) -> Dict[str, List]:
+        contacts = self._segments.get(path)
+        if contacts is None:
+            with get_archive_storage().open(path, "rb") as stream:
+                contacts = json.loads(gzip.decompress(stream.read()))["contacts"]
+            self._segments.set(path, contacts)
+        return contacts
+
+    def get_rows(
+        self,
+        kind: ArchiveKind,
+        contact_id: int,
+        descending: bool,
+        position: Optional[Tuple[datetime, int]],
+        limit: int,
+    ) -> List[Dict]:
+        """
+        Up to limit rows of the contact after position, as {"id", "created_on", <text>}
+        dicts, in (created_on, id) order. Only the segments needed are read.
+        """
+        _, text_field = ARCHIVE_MODELS[kind]
+        segments = ArchivedContact.objects.filter(contact_id=contact_id, kind=kind)
+        if position is not None:
+            # Segments entirely before the position cannot contribute
+            if descending:
+                segments = segments.filter(oldest_created_on__lte=position[0])
+            else:
+                segments = segments.filter(newest_created_on__gte=position[0])
+        segments = segments.order_by(
+            "-newest_created_on" if descending else "oldest_created_on"
+        ).values_list("segment__path", flat=True)
+
+        rows = []
+        for path in segments.iterator():
+            for row_id, created_on, text in self.read_segment(path).get(str(contact_id), []):
+                key = (datetime.fromisoformat(created_on), row_id)
+                if position is not None and (key >= position if descending else key <= position):
+                    continue
+                rows.append({"id": row_id, "created_on": key[0], text_field: text})
+            # Segments of one contact and kind cover separate months
+            if len(rows) >= limit:
+                break
+        rows.sort(key=lambda row: (row["created_on"], row["id"]), reverse=descending)
+        return rows[:limit]
+
+
+archive_reader = ArchiveReader()
+
+
+class ArchivedCreatedOnPagination(CreatedOnKeysetPagination):
+    """
+    CreatedOnKeysetPagination over a contact's hot rows followed by its archived ones.
+
+    Archived rows are older than every hot row, so the archive is only read
+    once a page runs past the last hot row, or when paging back from it.
+    """
+
+    def __init__(self, kind: ArchiveKind, contact_id: int) -> None:
+        self.kind = kind
+        self.contact_id = contact_id
+
+    def fetch_results(self, queryset, ordering, position) -> List:
+        results = super().fetch_results(queryset, ordering, position)
+        limit = self.page_size + 1
+        descending = ordering[0].startswith("-")
+        if descending and len(results) >= limit:
+            return results
+        if position is not None:
+            # Already converted to (datetime, int) by clean_position
+            position = tuple(position)
+        archived = archive_reader.get_rows(self.kind, self.contact_id, descending, position, limit)
+        if not archived:
+            return results
+        merged = sorted(
+            [*results, *archived],
+            key=lambda row: (row["created_on"], row["id"])
+            if isinstance(row, dict)
+            else (row.created_on, row.id),
+            reverse=descending,
+        )
+        return merged[:limit]
+
+
+def archive_tenant(tenant_id: int) -> Dict[str, int]:
+    return ContactArchiver(Tenant.objects.get(id=tenant_id)).archive()
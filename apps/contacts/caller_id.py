@@ -0,0 +1,203 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.utils.phone_numbers import normalize_phone_number
+from apps.utils.response_cache import (CALLER_ID, invalidate_responses,
+                                       response_cache)
+from routers.db_routers import read_from_primary
+
+from .models import Contact, ContactAssociate
+
+
+class TenantCallerIdIndex:
+    """E.164 number -> associate and contact for a single tenant"""
+
+    def __init__(self, generation: str) -> None:
+        # number -> associate id
+        self.numbers: Dict[str, int] = {}
+        # associate id -> (number, name, contact id)
+        self.associates: Dict[int, Tuple[str, str, int]] = {}
+        self.contact_names: Dict[int, str] = {}
+        self.generation = generation
+        self.built_at = self.checked_at = time.monotonic()
+
+    @classmethod
+    def build(cls, rows, generation: str) -> "TenantCallerIdIndex":
+        index = cls(generation)
+        for associate_id, number, name, contact_id, contact_name in rows:
+            index.add(associate_id, number, name, contact_id)
+            index.contact_names[contact_id] = contact_name
+        return index
+
+    def add(self, associate_id: int, number, name: str, contact_id: int) -> None:
+        self.remove(associate_id)
+        number = normalize_phone_number(number)
+        if number is None:
+            return
+        self.numbers[number] = associate_id
+        self.associates[associate_id] = (number, name, contact_id)
+
+    def remove(self, associate_id: int) -> None:
+        entry = self.associates.pop(associate_id, None)
+        if entry is not None and self.numbers.get(entry[0]) == associate_id:
+            del self.numbers[entry[0]]
+
+    def lookup(self, number: str) -> Optional[Dict]:
+        associate_id = self.numbers.get(number)
+        if associate_id is None:
+            return None
+        _, name, contact_id = self.associates[associate_id]
+        return {
+            "number": number,
+            "associate": {"id": associate_id, "name": name},
+            "contact": {"id": contact_id, "name": self.contact_names.get(contact_id)},
+        }
+
+
+class CallerIdIndex:
+    """
+    Resolves phone numbers of incoming calls to a tenant's contacts without a query.
+
+    Each tenant's index is built with one query on first use and kept current
+    in this process by the ContactAssociate and Contact signals. Once their
+    transaction commits, those writes start a new CALLER_ID generation for the
+    tenant in the shared cache and move this process's index to it. Other
+    processes check the generation at most every CALLER_ID_RECHECK_INTERVAL
+    seconds and rebuild on a change, one thread per tenant at a time. Every
+    index is also rebuilt after CALLER_ID_MAX_AGE seconds, which bounds a write
+    of another process missed between reading and starting a generation.
+
+    Generations live in the "responses" cache, which processes only share with
+    REDIS_URL set. Without it, writes of other processes such as Celery
+    imports only show up after CALLER_ID_MAX_AGE.
+    """
+
+    def __init__(self) -> None:
+        self._indexes: Dict[int, TenantCallerIdIndex] = {}
+        self._lock = threading.Lock()
+        # tenant id -> lock held while that tenant's index is rebuilt
+        self._build_locks: Dict[int, threading.Lock] = {}
+
+    @property
+    def recheck_interval(self) -> float:
+        return getattr(settings, "CALLER_ID_RECHECK_INTERVAL", 1.0)
+
+    @property
+    def max_age(self) -> float:
+        return getattr(settings, "CALLER_ID_MAX_AGE", 300.0)
+
+    def is_current(self, index: Optional[TenantCallerIdIndex], generation: str) -> bool:
+        return (
+            index is not None
+            and index.generation == generation
+            and time.monotonic() - index.built_at < self.max_age
+        )
+
+    def get_index(self, tenant_id: int) -> TenantCallerIdIndex:
+        with self._lock:
+            index = self._indexes.get(tenant_id)
+        now = time.monotonic()
+        if index is not None and now - index.checked_at < self.recheck_interval:
+            return index
+
+        generation = response_cache.get_generations(tenant_id, [CALLER_ID])[0]
+        if self.is_current(index, generation):
+            index.checked_at = now
+            return index
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(tenant_id, threading.Lock())
+        with build_lock:
+            # Another thread may have rebuilt it while we waited
+            with self._lock:
+                index = self._indexes.get(tenant_id)
+            if self.is_current(index, generation):
+                return index
+            rows = (
+                ContactAssociate.objects.filter(tenant_id=tenant_id, phone_number__isnull=False)
+                .values_list("id", "phone_number", "name", "contact_id", "contact__name")
+                .iterator(chunk_size=2000)
+            )
+            with read_from_primary():
+                index = TenantCallerIdIndex.build(rows, generation)
+            with self._lock:
+                self._indexes[tenant_id] = index
+        return index
+
+    def lookup(self, tenant_id: int, number) -> Optional[Dict]:
+        """The associate and contact of a number in any format, None if unknown"""
+        number = normalize_phone_number(number)
+        if number is None:
+            return None
+        index = self.get_index(tenant_id)
+        with self._lock:
+            return index.lookup(number)
+
+    def lookup_contact_ids(self, tenant_id: int, numbers: Iterable[str]) -> Dict[str, int]:
+        """Map E.164 numbers to contact ids, unknown numbers are left out"""
+        index = self.get_index(tenant_id)
+        contact_ids = {}
+        with self._lock:
+            for number in numbers:
+                associate_id = index.numbers.get(number)
+                if associate_id is not None:
+                    contact_ids[number] = index.associates[associate_id][2]
+        return contact_ids
+
+    def update_on_commit(self, tenant_id: int, update: Callable[[TenantCallerIdIndex], None]) -> None:
+        """
+        Apply an in-place update to this process's index once the transaction
+        commits, then start a new generation. The index moves to it only if it
+        was on the previous one, otherwise it has missed other writes and is
+        rebuilt on its next use.
+        """
+
+        def apply() -> None:
+            key = response_cache.generation_key(tenant_id, CALLER_ID)
+            previous = response_cache.cache.get(key)
+            generation = str(time.time_ns())
+            response_cache.cache.set(key, generation, timeout=None)
+            with self._lock:
+                index = self._indexes.get(tenant_id)
+                if index is None:
+                    return
+                update(index)
+                if previous is not None and index.generation == str(previous):
+                    index.generation = generation
+
+        transaction.on_commit(apply)
+
+    # The updates copy what they need now, the instance may change or lose its pk before commit
+
+    def index_associate(self, associate: ContactAssociate) -> None:
+        entry = (associate.id, associate.phone_number, associate.name, associate.contact_id)
+        self.update_on_commit(associate.tenant_id, lambda index: index.add(*entry))
+
+    def remove_associate(self, associate: ContactAssociate) -> None:
+        associate_id = associate.id
+        self.update_on_commit(associate.tenant_id, lambda index: index.remove(associate_id))
+
+    def rename_contact(self, contact: Contact) -> None:
+        contact_id, name = contact.id, contact.name
+
+        def rename(index: TenantCallerIdIndex) -> None:
+            index.contact_names[contact_id] = name
+
+        self.update_on_commit(contact.tenant_id, rename)
+
+    def invalidate_tenant(self, tenant_id: int) -> None:
+        """Called after bulk writes that bypass the ContactAssociate signals"""
+        with self._lock:
+            self._indexes.pop(tenant_id, None)
+        invalidate_responses(tenant_id, CALLER_ID)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+caller_id_index = CallerIdIndex()
@@ -1,121 +1,407 @@
+from collections import Counter
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django.utils.translation import gettext as _
+from rest_framework import status
 from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 
 from apps.profiles.models import UserProfile
-from apps.utils.db_helper import save_models_in_transaction
+from apps.tenants.models import Tenant
+from apps.utils.response_cache import (CONTACTS, USERS, invalidate_responses,
+                                       invalidate_timelines)
 
-from .models import Contact, ContactTimeline, Lifecycle
+from .counters import (apply_counter_deltas, claim_locked_slot,
+                       recompute_locked_counts)
+from .funnel import FunnelDeltas
+from .models import Contact, ContactTimeline, Lifecycle, LifecycleAction
 
 
 class ContactAlreadyLocked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+
     def __init__(self, detail="Contact is already locked!") -> None:
         self._detail = detail
         super().__init__(detail=self._detail)
 
 
 class ContactAlreadyUnlocked(APIException):
+    status_code = status.HTTP_409_CONFLICT
+
     def __init__(self, detail="Contact is already unlocked!") -> None:
         self._detail = detail
         super().__init__(detail=self._detail)
 
 
 class CustomerNotLockable(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+
     def __init__(self, detail="Customers cannot be locked!") -> None:
         self._detail = detail
         super().__init__(detail=self._detail)
 
 
 class ContactCooldown(APIException):
+    status_code = status.HTTP_409_CONFLICT
+
     def __init__(self, detail: str) -> None:
         self._detail = detail
         super().__init__(detail=self._detail)
 
 
 class ContactLifecycleController:
+    """
+    Lifecycle transitions for a single contact.
+
+    Every transition is decided by the database: lock and unlock are conditional
+    UPDATEs that only match a row in the expected state, and conversions lock the
+    row first. The in-memory contact only produces error messages, so concurrent
+    requests can never double-lock a contact or push a rep past the tenant cap.
+    """
+
     def __init__(self, contact: Contact) -> None:
         self._contact: Contact = contact
 
-    def lock_contact(self, user: UserProfile):
+    def check_lockable(self, user: UserProfile):
         if self._contact.is_locked:
             raise ContactAlreadyLocked()
         if self._contact.lifecycle_status == Lifecycle.CUSTOMER:
             raise CustomerNotLockable()
-
         cooldown_time_remaining = self.get_cooldown_remaining(user=user)
         if cooldown_time_remaining > timedelta(0):
             raise ContactCooldown(
                 detail=f"Cannot lock prospect for {cooldown_time_remaining}"
             )
-        if user.total_contacts_locked == user.tenant.max_prospects_per_user:
-            return Response(
-                {"message": "Max number of prospects locked. Cannot lock more!"}
+
+    def lockable_contacts(self, user: UserProfile, now: datetime):
+        cooldown_start = now - timedelta(days=user.tenant.prospect_cooldown_days)
+        return (
+            Contact.objects.filter(id=self._contact.id, is_locked=False)
+            .exclude(lifecycle_status=Lifecycle.CUSTOMER)
+            .exclude(last_locked_by=user, unlocked_on__gt=cooldown_start)
+        )
+
+    def lock_contact(self, user: UserProfile):
+        self.check_lockable(user=user)
+        now = timezone.now()
+        with transaction.atomic():
+            # Claim a slot under the cap first, the row lock serialises a rep's concurrent locks
+            if not claim_locked_slot(
+                user_id=user.id, max_locked=user.tenant.max_prospects_per_user
+            ):
+                return Response(
+                    {"message": "Max number of prospects locked. Cannot lock more!"}
+                )
+            locked = self.lockable_contacts(user=user, now=now).update(
+                is_locked=True, locked_on=now, locked_by=user, customer_of=None
             )
+            if not locked:
+                # Lost a race, raising rolls back the claimed slot
+                self._contact.refresh_from_db()
+                self.check_lockable(user=user)
+                raise ContactAlreadyLocked()
+            self.create_timeline_event(
+                user=user, title=f"Contact Locked By: {user.__str__()}"
+            ).save()
+            # update() sends no signals, the counters are shown in user lists
+            invalidate_responses(self._contact.tenant_id, CONTACTS, USERS)
+
         self._contact.is_locked = True
-        self._contact.locked_on = datetime.now()
+        self._contact.locked_on = now
         self._contact.locked_by = user
         self._contact.customer_of = None
         user.total_contacts_locked += 1
-        event = self.create_timeline_event(
-            user=user, title=f"Contact Locked By: {user.__str__()}"
-        )
-        save_models_in_transaction(model_list=[self._contact, user, event])
         return Response({"message": "Successfully locked contact"})
 
     def get_cooldown_remaining(self, user: UserProfile):
-        cooldown_days: int = user.tenant.prospect_cooldown_days
-        if self._contact.locked_by is None:
-            return timedelta(0)
-        if self._contact.locked_by.id != user.id:
+        if self._contact.last_locked_by_id != user.id or self._contact.unlocked_on is None:
             return timedelta(0)
-        unlocked_since = (
-            datetime.now().timestamp() - self._contact.locked_on.timestamp()
-        )
-        return timedelta(days=cooldown_days) - timedelta(milliseconds=unlocked_since)
+        cooldown = timedelta(days=user.tenant.prospect_cooldown_days)
+        return max(cooldown - (timezone.now() - self._contact.unlocked_on), timedelta(0))
 
     def update_lifecycle_status(self, user: UserProfile, status: Lifecycle):
-        if self._contact.lifecycle_status == status:
-            return
+        with transaction.atomic():
+            contact: Contact = Contact.objects.select_for_update().get(id=self._contact.id)
+            if contact.lifecycle_status == status:
+                return
 
-        if status == Lifecycle.CUSTOMER:
-            if self._contact.is_locked:
-                user.total_contacts_locked -= 1
-            self._contact.customer_of = user
-            self._contact.is_locked = True
-            self._contact.locked_by = None
-            user.total_customers += 1
-        if status == Lifecycle.PROSPECT:
-            if self._contact.lifecycle_status == Lifecycle.CUSTOMER:
-                user.total_customers -= 1
-                self._contact.customer_of = None
-
-        event = self.create_timeline_event(
-            user, f"Contact updated from {self._contact.lifecycle_status} to {status}"
-        )
-        self._contact.lifecycle_updated_on = datetime.now()
-        self._contact.lifecycle_status = status
-        save_models_in_transaction(model_list=[self._contact, user, event])
+            if status == Lifecycle.CUSTOMER:
+                if contact.is_locked:
+                    apply_counter_deltas(contact.locked_by_id, total_contacts_locked=-1)
+                contact.customer_of = user
+                contact.is_locked = True
+                contact.locked_by = None
+                apply_counter_deltas(user.id, total_customers=1)
+            if status == Lifecycle.PROSPECT:
+                if contact.lifecycle_status == Lifecycle.CUSTOMER:
+                    apply_counter_deltas(contact.customer_of_id, total_customers=-1)
+                    contact.customer_of = None
 
+            self._contact = contact
+            event = self.create_timeline_event(
+                user, f"Contact updated from {contact.lifecycle_status} to {status}"
+            )
+            now = timezone.now()
+            funnel = FunnelDeltas(contact.tenant_id)
+            funnel.add_transition(user.id, contact.lifecycle_status, status, now)
+            contact.lifecycle_updated_on = now
+            contact.lifecycle_status = status
+            contact.save(
+                update_fields=[
+                    "customer_of",
+                    "is_locked",
+                    "locked_by",
+                    "lifecycle_updated_on",
+                    "lifecycle_status",
+                    "updated_on",
+                ]
+            )
+            event.save()
+            # Last, the tenant's funnel row is shared by all of its lifecycle changes
+            funnel.save()
+            invalidate_responses(contact.tenant_id, USERS)
 
     def unlock_contact(self, user: UserProfile):
-        if not self._contact.is_locked:
-            raise ContactAlreadyUnlocked()
-        if self._contact.lifecycle_status == Lifecycle.CUSTOMER:
-            raise CustomerNotLockable()
+        with transaction.atomic():
+            # The counter belongs to whoever holds the lock, not to the requesting user
+            owners = list(
+                Contact.objects.select_for_update()
+                .filter(id=self._contact.id, is_locked=True)
+                .exclude(lifecycle_status=Lifecycle.CUSTOMER)
+                .values_list("locked_by_id", flat=True)
+            )
+            if not owners:
+                self._contact.refresh_from_db()
+                if self._contact.lifecycle_status == Lifecycle.CUSTOMER:
+                    raise CustomerNotLockable()
+                raise ContactAlreadyUnlocked()
+            Contact.objects.filter(id=self._contact.id).update(is_locked=False, locked_by=None)
+            apply_counter_deltas(owners[0], total_contacts_locked=-1)
+            self.create_timeline_event(
+                user=user, title=f"Contact unlocked by: {user.__str__()}"
+            ).save()
+            invalidate_responses(self._contact.tenant_id, CONTACTS, USERS)
 
         self._contact.is_locked = False
-        user.total_contacts_locked -= 1
-        event = self.create_timeline_event(
-            user=user, title=f"Contact unlocked by: {user.get_full_name()}"
-        )
-        save_models_in_transaction(model_list=[self._contact, user, event])
+        self._contact.locked_by = None
+        if owners[0] == user.id:
+            user.total_contacts_locked -= 1
         return Response({"message": "Successfully unlocked contact"})
 
     def create_timeline_event(self, user: UserProfile, title: str):
         event = ContactTimeline()
-        event.tenant = self._contact.tenant
+        event.tenant_id = self._contact.tenant_id
         event.contact = self._contact
         event.title = title
         return event
+
+
+MAX_PROSPECTS_MESSAGE = "Max number of prospects locked. Cannot lock more!"
+
+
+class BulkLifecycleController:
+    """
+    Applies one lifecycle action to many contacts of the user's tenant.
+
+    Visibility is checked for all contacts in a single locking query, and every
+    state change, counter delta and timeline event is written with set-based
+    statements inside one transaction. Each id gets its own result.
+    """
+
+    def __init__(self, user: UserProfile) -> None:
+        self._user: UserProfile = user
+        self._errors: Dict[int, str] = {}
+        self._events: List[ContactTimeline] = []
+        self._funnel = FunnelDeltas(user.tenant_id)
+
+    def apply(self, contact_ids: List[int], action: LifecycleAction) -> List[Dict]:
+        contact_ids = list(dict.fromkeys(contact_ids))
+        now = timezone.now()
+        with transaction.atomic():
+            # Same rule as ViewContactPermissions: own tenant, unlocked or locked by the user
+            contacts = list(
+                Contact.objects.select_for_update()
+                .filter(tenant_id=self._user.tenant_id, id__in=contact_ids)
+                .filter(Q(locked_by__isnull=True) | Q(locked_by=self._user))
+            )
+            found = {contact.id for contact in contacts}
+            for contact_id in contact_ids:
+                if contact_id not in found:
+                    self._errors[contact_id] = "Not found"
+            getattr(self, action)(contacts, now)
+            ContactTimeline.objects.bulk_create(self._events)
+            self._funnel.save()
+            if self._events:
+                invalidate_responses(self._user.tenant_id, CONTACTS, USERS)
+                invalidate_timelines(
+                    self._user.tenant_id, [event.contact_id for event in self._events]
+                )
+        return [self.get_result(contact_id) for contact_id in contact_ids]
+
+    def get_result(self, contact_id: int) -> Dict:
+        error: Optional[str] = self._errors.get(contact_id)
+        if error is None:
+            return {"id": contact_id, "status": "ok"}
+        return {"id": contact_id, "status": "error", "message": error}
+
+    def add_event(self, contact: Contact, title: str) -> None:
+        self._events.append(
+            ContactTimeline(tenant_id=contact.tenant_id, contact_id=contact.id, title=title)
+        )
+
+    def lock(self, contacts: List[Contact], now: datetime) -> None:
+        cooldown_start = now - timedelta(days=self._user.tenant.prospect_cooldown_days)
+        eligible = []
+        for contact in contacts:
+            if contact.is_locked:
+                self._errors[contact.id] = str(ContactAlreadyLocked().detail)
+            elif contact.lifecycle_status == Lifecycle.CUSTOMER:
+                self._errors[contact.id] = str(CustomerNotLockable().detail)
+            elif (
+                contact.last_locked_by_id == self._user.id
+                and contact.unlocked_on is not None
+                and contact.unlocked_on > cooldown_start
+            ):
+                self._errors[contact.id] = "Cannot lock prospect during cooldown"
+            else:
+                eligible.append(contact)
+
+        locked, max_prospects = (
+            UserProfile.objects.select_for_update(of=("self",))
+            .filter(id=self._user.id)
+            .values_list("total_contacts_locked", "tenant__max_prospects_per_user")
+            .get()
+        )
+        slots = max(max_prospects - locked, 0)
+        for contact in eligible[slots:]:
+            self._errors[contact.id] = MAX_PROSPECTS_MESSAGE
+        eligible = eligible[:slots]
+        if not eligible:
+            return
+
+        Contact.objects.filter(id__in=[contact.id for contact in eligible]).update(
+            is_locked=True, locked_on=now, locked_by=self._user, customer_of=None
+        )
+        apply_counter_deltas(self._user.id, total_contacts_locked=len(eligible))
+        for contact in eligible:
+            self.add_event(contact, f"Contact Locked By: {self._user.__str__()}")
+
+    def unlock(self, contacts: List[Contact], now: datetime) -> None:
+        eligible = []
+        for contact in contacts:
+            if not contact.is_locked:
+                self._errors[contact.id] = str(ContactAlreadyUnlocked().detail)
+            elif contact.lifecycle_status == Lifecycle.CUSTOMER:
+                self._errors[contact.id] = str(CustomerNotLockable().detail)
+            else:
+                eligible.append(contact)
+        if not eligible:
+            return
+
+        Contact.objects.filter(id__in=[contact.id for contact in eligible]).update(
+            is_locked=False, locked_by=None
+        )
+        self.apply_locked_deltas(eligible)
+        for contact in eligible:
+            self.add_event(contact, f"Contact unlocked by: {self._user.__str__()}")
+
+    def convert_to_customer(self, contacts: List[Contact], now: datetime) -> None:
+        eligible = [c for c in contacts if c.lifecycle_status != Lifecycle.CUSTOMER]
+        if not eligible:
+            return
+
+        Contact.objects.filter(id__in=[contact.id for contact in eligible]).update(
+            customer_of=self._user,
+            is_locked=True,
+            locked_by=None,
+            lifecycle_status=Lifecycle.CUSTOMER,
+            lifecycle_updated_on=now,
+        )
+        self.apply_locked_deltas([contact for contact in eligible if contact.is_locked])
+        apply_counter_deltas(self._user.id, total_customers=len(eligible))
+        for contact in eligible:
+            self.add_event(
+                contact,
+                f"Contact updated from {contact.lifecycle_status} to {Lifecycle.CUSTOMER}",
+            )
+            self._funnel.add_transition(
+                self._user.id, contact.lifecycle_status, Lifecycle.CUSTOMER, now
+            )
+
+    def convert_to_prospect(self, contacts: List[Contact], now: datetime) -> None:
+        eligible = [c for c in contacts if c.lifecycle_status != Lifecycle.PROSPECT]
+        if not eligible:
+            return
+
+        customers = [c for c in eligible if c.lifecycle_status == Lifecycle.CUSTOMER]
+        Contact.objects.filter(id__in=[contact.id for contact in customers]).update(
+            customer_of=None
+        )
+        Contact.objects.filter(id__in=[contact.id for contact in eligible]).update(
+            lifecycle_status=Lifecycle.PROSPECT, lifecycle_updated_on=now
+        )
+        customer_deltas = Counter(contact.customer_of_id for contact in customers)
+        for user_id, count in customer_deltas.items():
+            apply_counter_deltas(user_id, total_customers=-count)
+        for contact in eligible:
+            self.add_event(
+                contact,
+                f"Contact updated from {contact.lifecycle_status} to {Lifecycle.PROSPECT}",
+            )
+            self._funnel.add_transition(
+                self._user.id, contact.lifecycle_status, Lifecycle.PROSPECT, now
+            )
+
+    def apply_locked_deltas(self, contacts: List[Contact]) -> None:
+        locked_deltas = Counter(contact.locked_by_id for contact in contacts)
+        for user_id, count in locked_deltas.items():
+            apply_counter_deltas(user_id, total_contacts_locked=-count)
+
+
+class ProspectExpiryController:
+    """Unlocks a tenant's expired prospect locks with a fixed number of set-based queries"""
+
+    def __init__(self, tenant: Tenant) -> None:
+        self._tenant: Tenant = tenant
+
+    def unlock_expired_prospects(self) -> int:
+        now = timezone.now()
+        expired_before = now - timedelta(days=self._tenant.prospect_cooldown_days)
+        with transaction.atomic():
+            expired = list(
+                Contact.objects.select_for_update(skip_locked=True)
+                .filter(
+                    tenant=self._tenant,
+                    is_locked=True,
+                    locked_by__isnull=False,
+                    locked_on__lte=expired_before,
+                )
+                .exclude(lifecycle_status=Lifecycle.CUSTOMER)
+                .values_list("id", "locked_by_id")
+            )
+            if not expired:
+                return 0
+            contact_ids = [contact_id for contact_id, _ in expired]
+            # Back to the pool for everyone but the last owner, see get_cooldown_remaining
+            Contact.objects.filter(id__in=contact_ids).update(
+                is_locked=False, locked_by=None, last_locked_by=F("locked_by"), unlocked_on=now
+            )
+            ContactTimeline.objects.bulk_create(
+                [
+                    ContactTimeline(
+                        tenant=self._tenant,
+                        contact_id=contact_id,
+                        title=f"Contact unlocked after {self._tenant.prospect_cooldown_days} days",
+                    )
+                    for contact_id in contact_ids
+                ]
+            )
+            recompute_locked_counts(user_ids={user_id for _, user_id in expired})
+            invalidate_responses(self._tenant.id, CONTACTS, USERS)
+            invalidate_timelines(self._tenant.id, contact_ids)
+        return len(expired)
+
@@ -0,0 +1,97 @@
+from typing import Iterable, Optional
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.profiles.models import UserProfile
+from apps.utils.response_cache import USERS, invalidate_responses
+
+from .models import Contact, Lifecycle
+
+# The denormalised per-user counters on UserProfile. They are only ever written
+# through this module, so concurrent lifecycle changes cannot lose updates.
+COUNTER_FIELDS = UserProfile.COUNTER_FIELDS
+
+
+def apply_counter_deltas(user_id: Optional[int], **deltas: int) -> None:
+    """Atomically add deltas to a user's counters, e.g. total_customers=1"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if user_id is None or not deltas:
+        return
+    UserProfile.objects.filter(id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def claim_locked_slot(user_id: int, max_locked: int) -> bool:
+    """
+    Increment total_contacts_locked only while it is below max_locked, the
+    tenant's max_prospects_per_user.
+
+    The cap is passed as a literal so the UPDATE stays on the profile table: a
+    condition joining the tenant compiles to an id IN (subquery), which a
+    blocked UPDATE does not re-check once the concurrent claim commits.
+    """
+    return bool(
+        UserProfile.objects.filter(id=user_id, total_contacts_locked__lt=max_locked).update(
+            total_contacts_locked=F("total_contacts_locked") + 1
+        )
+    )
+
+
+def _count_subquery(**filters) -> Coalesce:
+    key = next(iter(filters))
+    counts = (
+        Contact.objects.filter(**filters)
+        .order_by()
+        .values(key)
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def actual_locked_count() -> Coalesce:
+    return _count_subquery(locked_by=OuterRef("pk"), is_locked=True)
+
+
+def actual_customer_count() -> Coalesce:
+    return _count_subquery(
+        customer_of=OuterRef("pk"), lifecycle_status=Lifecycle.CUSTOMER
+    )
+
+
+def recompute_locked_counts(user_ids: Iterable[int]) -> None:
+    """Recompute total_contacts_locked for the given users in one UPDATE"""
+    UserProfile.objects.filter(id__in=user_ids).update(
+        total_contacts_locked=actual_locked_count()
+    )
+
+
+def reconcile_counters(tenant_id: int, batch_size: int = 1000) -> int:
+    """
+    Recompute every counter of a tenant's users from Contact aggregates and
+    write back only the rows that drifted. Returns the number of corrected users.
+
+    Each batch is one UPDATE setting the counters to correlated COUNT
+    subqueries, so increments committed between finding the drifted users and
+    correcting them are counted rather than overwritten.
+    """
+    drifted = list(
+        UserProfile.objects.filter(tenant_id=tenant_id)
+        .annotate(actual_locked=actual_locked_count(), actual_customers=actual_customer_count())
+        .filter(
+            ~Q(total_contacts_locked=F("actual_locked"))
+            | ~Q(total_customers=F("actual_customers"))
+        )
+        .values_list("id", flat=True)
+    )
+    corrected = 0
+    for start in range(0, len(drifted), batch_size):
+        corrected += UserProfile.objects.filter(id__in=drifted[start:start + batch_size]).update(
+            total_contacts_locked=actual_locked_count(),
+            total_customers=actual_customer_count(),
+        )
+    if corrected:
+        invalidate_responses(tenant_id, USERS)
+    return corrected
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from apps.profiles.models import UserProfile
+
+from .models import ContactAssociate, ContactNote
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+LATEST_NOTES_LIMIT = 3
+
+ASSOCIATE_FIELDS = ["id", "name", "phone_number", "phone_number_ext", "designation", "email"]
+NOTE_FIELDS = ["id", "created_on", "body"]
+LOCKED_BY_FIELDS = ["id", "first_name", "last_name", "email"]
+
+
+def parse_list_param(request, name: str, allowed: Iterable[str]) -> List[str]:
+    """Comma separated query parameter, e.g. ?fields=id,name. Unknown names are a 400"""
+    value = request.query_params.get(name, "")
+    names = list(dict.fromkeys(item.strip() for item in value.split(",") if item.strip()))
+    unknown = [item for item in names if item not in allowed]
+    if unknown:
+        raise ValidationError({name: [f"Unknown values: {', '.join(unknown)}"]})
+    return names
+
+
+def narrow_fields(serializer, fields: List[str]):
+    """Drop every field of a serializer instance that was not asked for"""
+    if fields:
+        for name in set(serializer.fields) - set(fields):
+            serializer.fields.pop(name)
+    return serializer
+
+
+class ContactExpander:
+    """
+    Adds related data to serialized contacts for ?expand=associates,latest_notes,locked_by.
+
+    Each expansion runs one query for the whole page, keyed on the contact
+    (or locking user) ids of its rows, so an expanded page costs the same
+    number of queries whatever its size.
+    """
+
+    expansions = ("associates", "latest_notes", "locked_by")
+    # Columns the expansions read from each contact row
+    required_columns = ("id", "locked_by")
+
+    def __init__(self, expand: Iterable[str] = ()) -> None:
+        self.expand = list(expand)
+
+    @classmethod
+    def from_request(cls, request) -> "ContactExpander":
+        return cls(parse_list_param(request, EXPAND_PARAM, cls.expansions))
+
+    def expand_rows(self, rows: List[Dict], data: List[Dict]) -> None:
+        """rows are the contacts' values() rows, data their serialized output in the same order"""
+        if not self.expand or not rows:
+            return
+        contact_ids = [row["id"] for row in rows]
+        if "associates" in self.expand:
+            associates = self.get_associates(contact_ids)
+            for row, item in zip(rows, data):
+                item["associates"] = associates.get(row["id"], [])
+        if "latest_notes" in self.expand:
+            notes = self.get_latest_notes(contact_ids)
+            for row, item in zip(rows, data):
+                item["latest_notes"] = notes.get(row["id"], [])
+        if "locked_by" in self.expand:
+            users = self.get_users({row["locked_by"] for row in rows if row["locked_by"]})
+            for row, item in zip(rows, data):
+                item["locked_by"] = users.get(row["locked_by"])
+
+    def get_associates(self, contact_ids: List[int]) -> Dict[int, List[Dict]]:
+        associates = defaultdict(list)
+        rows = (
+            ContactAssociate.objects.filter(contact_id__in=contact_ids)
+            .order_by("contact_id", "id")
+            .values("contact_id", *ASSOCIATE_FIELDS)
+        )
+        for row in rows:
+            if row["phone_number"] is not None:
+                row["phone_number"] = str(row["phone_number"])
+            associates[row.pop("contact_id")].append(row)
+        return associates
+
+    def get_latest_notes(self, contact_ids: List[int]) -> Dict[int, List[Dict]]:
+        # Top N per contact in one query: the notes of the page's contacts are
+        # numbered per contact along the (contact, -created_on, -id) index and
+        # only the first N of each are kept. Django 4.0 cannot filter on a
+        # window function, so the numbered rows are wrapped in a subquery.
+        ranked = (
+            ContactNote.objects.filter(contact_id__in=contact_ids)
+            .annotate(
+                note_rank=Window(
+                    RowNumber(),
+                    partition_by=[F("contact_id")],
+                    order_by=[F("created_on").desc(), F("id").desc()],
+                )
+            )
+            .order_by()
+            .values("id", "note_rank")
+        )
+        sql, params = ranked.query.sql_with_params()
+        latest_ids = RawSQL(
+            f"SELECT ranked.id FROM ({sql}) ranked WHERE ranked.note_rank <= %s",
+            (*params, LATEST_NOTES_LIMIT),
+        )
+        notes = defaultdict(list)
+        rows = (
+            ContactNote.objects.filter(id__in=latest_ids)
+            .order_by("contact_id", "-created_on", "-id")
+            .values("contact_id", *NOTE_FIELDS)
+        )
+        for row in rows:
+            notes[row.pop("contact_id")].append(row)
+        return notes
+
+    def get_users(self, user_ids: Iterable[int]) -> Dict[int, Dict]:
+        if not user_ids:
+            return {}
+        rows = UserProfile.objects.filter(id__in=user_ids).values(*LOCKED_BY_FIELDS)
+        return {row["id"]: row for row in rows}
@@ -0,0 +1,130 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+from .models import (Contact, ContactAssociate, ContactNote, ContactTimeline,
+                     ImportFormat)
+
+EXPORT_CHUNK_SIZE = 2000
+
+CONTACT_EXPORT_FIELDS = [
+    field.attname
+    for field in Contact._meta.concrete_fields
+    if field.name not in ("tenant", "search_vector")
+]
+
+# include name -> (model, fields exported for each child row)
+EXPORT_RELATIONS = {
+    "associates": (
+        ContactAssociate,
+        ["id", "name", "phone_number", "phone_number_ext", "designation", "email"],
+    ),
+    "notes": (ContactNote, ["id", "created_on", "body"]),
+    "timeline": (ContactTimeline, ["id", "created_on", "title"]),
+}
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            # e.g. PhoneNumber values
+            return str(o)
+
+
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ContactExporter:
+    """
+    Streams a tenant's contacts, optionally with their associates, notes and
+    timeline, as CSV or NDJSON.
+
+    Contacts are read through a server-side cursor in chunks and each chunk's
+    children are fetched with one query per relation, so memory stays constant
+    no matter how many contacts the tenant has.
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        file_format: str = ImportFormat.CSV,
+        include: Iterable[str] = (),
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> None:
+        self._queryset = queryset
+        self._file_format = file_format
+        self._include = [name for name in EXPORT_RELATIONS if name in set(include)]
+        self._chunk_size = chunk_size
+
+    @property
+    def content_type(self) -> str:
+        if self._file_format == ImportFormat.NDJSON:
+            return "application/x-ndjson"
+        return "text/csv"
+
+    @property
+    def file_extension(self) -> str:
+        return self._file_format.lower()
+
+    def iter_chunks(self) -> Iterator[List[Dict]]:
+        rows = (
+            self._queryset.order_by("id")
+            .values(*CONTACT_EXPORT_FIELDS)
+            .iterator(chunk_size=self._chunk_size)
+        )
+        while True:
+            chunk = list(islice(rows, self._chunk_size))
+            if not chunk:
+                return
+            self.attach_relations(chunk)
+            yield chunk
+
+    def attach_relations(self, chunk: List[Dict]) -> None:
+        contact_ids = [row["id"] for row in chunk]
+        for name in self._include:
+            model, fields = EXPORT_RELATIONS[name]
+            children: Dict[int, List[Dict]] = defaultdict(list)
+            child_rows = (
+                model.objects.filter(contact_id__in=contact_ids)
+                .order_by("contact_id", "id")
+                .values("contact_id", *fields)
+            )
+            for child in child_rows:
+                children[child.pop("contact_id")].append(child)
+            for row in chunk:
+                row[name] = children.get(row["id"], [])
+
+    def __iter__(self) -> Iterator[str]:
+        if self._file_format == ImportFormat.NDJSON:
+            return self.iter_ndjson()
+        return self.iter_csv()
+
+    def iter_ndjson(self) -> Iterator[str]:
+        for chunk in self.iter_chunks():
+            yield "".join(
+                json.dumps(row, cls=ExportJSONEncoder) + "\n" for row in chunk
+            )
+
+    def iter_csv(self) -> Iterator[str]:
+        writer = csv.writer(Echo())
+        yield writer.writerow(CONTACT_EXPORT_FIELDS + self._include)
+        for chunk in self.iter_chunks():
+            yield "".join(
+                writer.writerow(
+                    [row[field] for field in CONTACT_EXPORT_FIELDS]
+                    # Related rows are nested as a JSON list per column
+                    + [json.dumps(row[name], cls=ExportJSONEncoder) for name in self._include]
+                )
+                for row in chunk
+            )
@@ -0,0 +1,242 @@
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.tenants.models import Tenant
+
+from .archive import archive_reader
+from .models import (ArchiveKind, ArchiveSegment, Contact, ContactTimeline,
+                     FunnelCounts, Lifecycle, TenantFunnelDay, UserFunnelDay)
+
+COUNTER_FIELDS = FunnelCounts.COUNTER_FIELDS
+
+# (from, to) lifecycle status -> counter
+TRANSITION_FIELDS = {
+    (Lifecycle.LEAD, Lifecycle.PROSPECT): "lead_to_prospect",
+    (Lifecycle.LEAD, Lifecycle.CUSTOMER): "lead_to_customer",
+    (Lifecycle.PROSPECT, Lifecycle.CUSTOMER): "prospect_to_customer",
+    (Lifecycle.CUSTOMER, Lifecycle.PROSPECT): "customer_to_prospect",
+}
+# The timeline title of every lifecycle change, see ContactLifecycleController
+TRANSITION_TITLE = re.compile(r"^Contact updated from (\w+) to (\w+)$")
+
+
+class FunnelDeltas:
+    """
+    Funnel counter changes of one tenant, summed per user and day.
+
+    save() adds them to the rollup tables with one conditional F() UPDATE per
+    row, inserting rows that do not exist yet. User rows are written before the
+    tenant row and in a fixed order, so concurrent writers cannot deadlock.
+    Changes without a user only count towards the tenant.
+    """
+
+    def __init__(self, tenant_id: int) -> None:
+        self.tenant_id = tenant_id
+        # (user id, day) -> counter -> delta
+        self._deltas: Dict[Tuple[Optional[int], date], Counter] = defaultdict(Counter)
+
+    def add(self, user_id: Optional[int], when: datetime, field: str, count: int = 1) -> None:
+        self._deltas[(user_id, timezone.localdate(when))][field] += count
+
+    def add_leads(self, user_id: Optional[int], when: datetime, count: int = 1) -> None:
+        self.add(user_id, when, "leads_created", count)
+
+    def add_transition(self, user_id: Optional[int], old_status: str, new_status: str, when: datetime) -> None:
+        field = TRANSITION_FIELDS.get((old_status, new_status))
+        if field is not None:
+            self.add(user_id, when, field)
+
+    def tenant_deltas(self) -> Dict[date, Counter]:
+        days = defaultdict(Counter)
+        for (_, day), deltas in self._deltas.items():
+            days[day].update(deltas)
+        return days
+
+    def save(self) -> None:
+        """Add the deltas to the rollups, called inside the transaction of the change"""
+        for (user_id, day), deltas in sorted(self._deltas.items(), key=lambda item: (item[0][0] or 0, item[0][1])):
+            if user_id is not None:
+                upsert_counts(UserFunnelDay, {"tenant_id": self.tenant_id, "user_id": user_id, "day": day}, deltas)
+        for day, deltas in sorted(self.tenant_deltas().items()):
+            upsert_counts(TenantFunnelDay, {"tenant_id": self.tenant_id, "day": day}, deltas)
+        self._deltas.clear()
+
+    def replace(self) -> int:
+        """
+        Replace the tenant's rollups with these deltas, returns the number of rows written.
+
+        The deltas were read before this transaction, so lifecycle changes and
+        new contacts saved in between are lost or counted twice: run it while
+        the tenant is quiet.
+        """
+        with transaction.atomic():
+            UserFunnelDay.objects.filter(tenant_id=self.tenant_id).delete()
+            TenantFunnelDay.objects.filter(tenant_id=self.tenant_id).delete()
+            user_days = [
+                UserFunnelDay(tenant_id=self.tenant_id, user_id=user_id, day=day, **deltas)
+                for (user_id, day), deltas in self._deltas.items()
+                if user_id is not None
+            ]
+            tenant_days = [
+                TenantFunnelDay(tenant_id=self.tenant_id, day=day, **deltas)
+                for day, deltas in self.tenant_deltas().items()
+            ]
+            UserFunnelDay.objects.bulk_create(user_days, batch_size=1000)
+            TenantFunnelDay.objects.bulk_create(tenant_days, batch_size=1000)
+        self._deltas.clear()
+        return len(user_days) + len(tenant_days)
+
+
+def upsert_counts(model, lookup: Dict, deltas: Counter) -> None:
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently since the UPDATE above
+        model.objects.filter(**lookup).update(**updates)
+
+
+class FunnelBackfill:
+    """
+    Rebuilds a tenant's funnel rollups from contacts and their timelines, archived entries included.
+
+    The timeline does not record who changed a lifecycle status, so changes to
+    customer are attributed to the contact's customer_of and changes to prospect
+    to its locked_by, as long as the contact is still in that status. Others
+    only count towards the tenant. Meant for a quiet window, see FunnelDeltas.replace.
+    """
+
+    def __init__(self, tenant: Tenant) -> None:
+        self._tenant = tenant
+        self.deltas = FunnelDeltas(tenant.id)
+
+    def run(self) -> int:
+        """Returns the number of rollup rows written"""
+        self.add_leads()
+        owners = self.get_owners()
+        for contact_id, created_on, title in self.iter_transition_events():
+            match = TRANSITION_TITLE.match(title)
+            if match is None:
+                continue
+            old_status, new_status = match.groups()
+            owner_status, owner_id = owners.get(contact_id, (None, None))
+            user_id = owner_id if owner_status == new_status else None
+            self.deltas.add_transition(user_id, old_status, new_status, created_on)
+        return self.deltas.replace()
+
+    def add_leads(self) -> None:
+        leads = (
+            Contact.objects.filter(tenant=self._tenant)
+            .annotate(day=TruncDate("created_on"))
+            .order_by()
+            .values("created_by_id", "day")
+            .annotate(count=Count("id"))
+        )
+        for row in leads:
+            day = datetime.combine(row["day"], datetime.min.time(), tzinfo=timezone.get_current_timezone())
+            self.deltas.add_leads(row["created_by_id"], day, row["count"])
+
+    def get_owners(self) -> Dict[int, Tuple[str, int]]:
+        """contact id -> (lifecycle status, owner id) of the tenant's owned prospects and customers"""
+        owners = {}
+        rows = (
+            Contact.objects.filter(tenant=self._tenant)
+            .exclude(lifecycle_status=Lifecycle.LEAD)
+            .values_list("id", "lifecycle_status", "customer_of_id", "locked_by_id")
+            .iterator(chunk_size=5000)
+        )
+        for contact_id, status, customer_of_id, locked_by_id in rows:
+            owner_id = customer_of_id if status == Lifecycle.CUSTOMER else locked_by_id
+            if owner_id is not None:
+                owners[contact_id] = (status, owner_id)
+        return owners
+
+    def iter_transition_events(self) -> Iterable[Tuple[int, datetime, str]]:
+        yield from (
+            ContactTimeline.objects.filter(tenant=self._tenant, title__startswith="Contact updated from")
+            .values_list("contact_id", "created_on", "title")
+            .iterator(chunk_size=5000)
+        )
+        segments = ArchiveSegment.objects.filter(tenant=self._tenant, kind=ArchiveKind.TIMELINE)
+        for path in segments.values_list("path", flat=True).iterator():
+            for contact_id, rows in archive_reader.read_segment(path).items():
+                for _, created_on, title in rows:
+                    yield int(contact_id), datetime.fromisoformat(created_on), title
+
+
+def backfill_tenant(tenant_id: int) -> int:
+    return FunnelBackfill(Tenant.objects.get(id=tenant_id)).run()
+
+
+def get_rate(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def with_rates(counts: Dict) -> Dict:
+    """
+    Counters plus conversion rates of a period, None where nothing entered a stage.
+    Rates compare the flows of the same period, so they are not cohort rates.
+    """
+    counts = {field: counts.get(field) or 0 for field in COUNTER_FIELDS}
+    prospects = counts["lead_to_prospect"]
+    customers = counts["lead_to_customer"] + counts["prospect_to_customer"]
+    return {
+        **counts,
+        "new_customers": customers,
+        "net_customers": customers - counts["customer_to_prospect"],
+        "lead_to_prospect_rate": get_rate(prospects + counts["lead_to_customer"], counts["leads_created"]),
+        "prospect_to_customer_rate": get_rate(counts["prospect_to_customer"], prospects),
+        "lead_to_customer_rate": get_rate(customers, counts["leads_created"]),
+    }
+
+
+class FunnelReport:
+    """
+    Funnel counters and conversion rates of a date range, read from the rollups.
+
+    Each query is a range scan of one index: (tenant, day) for the whole
+    tenant, (user, day) for a set of users. user_ids may be a subquery.
+    """
+
+    def __init__(self, tenant_id: int, start: date, end: date, user_ids=None) -> None:
+        self.tenant_id = tenant_id
+        self.start = start
+        self.end = end
+        self.user_ids = user_ids
+
+    def get_queryset(self, model):
+        queryset = model.objects.filter(tenant_id=self.tenant_id, day__range=(self.start, self.end))
+        if model is UserFunnelDay and self.user_ids is not None:
+            queryset = queryset.filter(user_id__in=self.user_ids)
+        return queryset.order_by()
+
+    @property
+    def model(self):
+        return TenantFunnelDay if self.user_ids is None else UserFunnelDay
+
+    def sums(self) -> Dict:
+        return {field: Sum(field) for field in COUNTER_FIELDS}
+
+    def totals(self) -> Dict:
+        return with_rates(self.get_queryset(self.model).aggregate(**self.sums()))
+
+    def by_day(self) -> List[Dict]:
+        rows = self.get_queryset(self.model).values("day").annotate(**self.sums()).order_by("day")
+        return [{"day": row["day"], **with_rates(row)} for row in rows]
+
+    def by_user(self) -> List[Dict]:
+        rows = self.get_queryset(UserFunnelDay).values("user_id").annotate(**self.sums()).order_by("user_id")
+        return [{"user": row["user_id"], **with_rates(row)} for row in rows]
@@ -0,0 +1,353 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework import serializers
+
+from apps.utils.response_cache import CONTACTS, invalidate_responses
+
+from .caller_id import caller_id_index
+from .funnel import FunnelDeltas
+from .models import (Contact, ContactAssociate, ContactImport, ImportFormat,
+                     ImportStatus, TimeZone)
+from .search import get_search_backend
+
+IMPORT_BATCH_SIZE = 1000
+# Only the first errors are kept so a broken file cannot bloat the import row
+MAX_REPORTED_ERRORS = 1000
+
+CONTACT_IMPORT_FIELDS = [
+    "address_1",
+    "address_2",
+    "city",
+    "state",
+    "zip_code",
+    "email",
+    "logo",
+    "timezone",
+    "rating",
+]
+ASSOCIATE_IMPORT_FIELDS = [
+    "name",
+    "phone_number",
+    "phone_number_ext",
+    "designation",
+    "email",
+]
+# Flat CSV columns for a single associate, e.g. associate_name
+ASSOCIATE_COLUMN_PREFIX = "associate_"
+
+
+class AssociateImportRowSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    phone_number = PhoneNumberField(required=False, allow_null=True)
+    phone_number_ext = serializers.IntegerField(required=False, allow_null=True)
+    designation = serializers.CharField(max_length=100)
+    email = serializers.EmailField(max_length=255, required=False, allow_null=True)
+
+
+class ContactImportRowSerializer(serializers.Serializer):
+    """Validates a single import row without touching the database"""
+
+    name = serializers.CharField(max_length=255)
+    address_1 = serializers.CharField(max_length=255)
+    address_2 = serializers.CharField(
+        max_length=255, required=False, allow_null=True, allow_blank=True
+    )
+    city = serializers.CharField(max_length=100)
+    state = serializers.CharField(max_length=2)
+    zip_code = serializers.CharField(max_length=10)
+    email = serializers.EmailField(max_length=255, required=False, allow_null=True)
+    logo = serializers.CharField(
+        max_length=255, required=False, allow_null=True, allow_blank=True
+    )
+    # No defaults: a row without these columns must not reset them on an existing
+    # contact, new contacts get the model's defaults
+    timezone = serializers.ChoiceField(choices=TimeZone.choices, required=False)
+    rating = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    associates = AssociateImportRowSerializer(many=True, required=False)
+
+
+def _clean_csv_row(row: Dict[str, str]) -> Dict:
+    data = {key: value for key, value in row.items() if key and value not in ("", None)}
+    associate = {
+        key[len(ASSOCIATE_COLUMN_PREFIX):]: data.pop(key)
+        for key in list(data)
+        if key.startswith(ASSOCIATE_COLUMN_PREFIX)
+    }
+    if associate:
+        data["associates"] = [associate]
+    return data
+
+
+def apply_row(contact: Contact, data: Dict) -> None:
+    """Sets the columns present in the validated row, others keep their value"""
+    for field in CONTACT_IMPORT_FIELDS:
+        if field in data:
+            setattr(contact, field, data[field])
+
+
+def iter_csv_rows(stream) -> Iterator[Dict]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        yield _clean_csv_row(row)
+
+
+def iter_ndjson_rows(stream) -> Iterator[Dict]:
+    for line in io.TextIOWrapper(stream, encoding="utf-8"):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Reported as a row error by the validator
+            yield None
+
+
+ROW_READERS = {
+    ImportFormat.CSV: iter_csv_rows,
+    ImportFormat.NDJSON: iter_ndjson_rows,
+}
+
+
+class ContactImporter:
+    """
+    Streams a ContactImport file and upserts its rows on (tenant, name).
+
+    Rows are validated in memory and written one batch at a time, so the number
+    of queries grows with the number of batches rather than the number of rows.
+    """
+
+    def __init__(self, contact_import: ContactImport, batch_size: int = IMPORT_BATCH_SIZE) -> None:
+        self._import: ContactImport = contact_import
+        self._batch_size = batch_size
+        self._errors: List[Dict] = list(contact_import.errors)
+
+    def run(self) -> ContactImport:
+        ContactImport.objects.filter(id=self._import.id).update(status=ImportStatus.RUNNING)
+        read_rows = ROW_READERS[self._import.file_format]
+        try:
+            with self._import.file.open("rb") as stream:
+                rows = enumerate(read_rows(stream), start=1)
+                while True:
+                    batch = list(islice(rows, self._batch_size))
+                    if not batch:
+                        break
+                    self.import_batch(batch)
+        except Exception as error:
+            self.add_error(row=None, errors={"file": [str(error)]})
+            self.finish(ImportStatus.FAILED)
+            raise
+        finally:
+            get_search_backend().invalidate_tenant(self._import.tenant_id)
+            caller_id_index.invalidate_tenant(self._import.tenant_id)
+            invalidate_responses(self._import.tenant_id, CONTACTS)
+        self.finish(ImportStatus.COMPLETED)
+        return self._import
+
+    def finish(self, status: ImportStatus) -> None:
+        self._import.refresh_from_db()
+        self._import.status = status
+        self._import.finished_on = timezone.now()
+        self._import.errors = self._errors
+        self._import.save(update_fields=["status", "finished_on", "errors"])
+
+    def add_error(self, row, errors) -> None:
+        if len(self._errors) < MAX_REPORTED_ERRORS:
+            self._errors.append({"row": row, "errors": errors})
+
+    def validate_batch(self, batch: List[Tuple[int, Dict]]) -> Tuple[Dict[str, Tuple[int, Dict]], int]:
+        valid_rows: Dict[str, Tuple[int, Dict]] = {}
+        failed = 0
+        for row_number, row in batch:
+            if not isinstance(row, dict):
+                self.add_error(row=row_number, errors={"row": ["Row is not a JSON object"]})
+                failed += 1
+                continue
+            serializer = ContactImportRowSerializer(data=row)
+            if serializer.is_valid():
+                # A later row with the same name wins, as it would row by row
+                valid_rows[serializer.validated_data["name"]] = (
+                    row_number,
+                    serializer.validated_data,
+                )
+            else:
+                self.add_error(row=row_number, errors=serializer.errors)
+                failed += 1
+        return valid_rows, failed
+
+    def import_batch(self, batch: List[Tuple[int, Dict]]) -> None:
+        valid_rows, failed = self.validate_batch(batch)
+        created, updated = 0, 0
+        if valid_rows:
+            with transaction.atomic():
+                created, updated = self.upsert_contacts(valid_rows)
+        ContactImport.objects.filter(id=self._import.id).update(
+            processed_rows=F("processed_rows") + len(batch),
+            created_rows=F("created_rows") + created,
+            updated_rows=F("updated_rows") + updated,
+            failed_rows=F("failed_rows") + failed,
+            errors=self._errors,
+        )
+
+    def upsert_contacts(self, valid_rows: Dict[str, Tuple[int, Dict]]) -> Tuple[int, int]:
+        tenant_id = self._import.tenant_id
+        existing = {
+            contact.name: contact
+            for contact in Contact.objects.filter(tenant_id=tenant_id, name__in=valid_rows)
+        }
+        new_contacts, changed_contacts = [], []
+        for name, (_, data) in valid_rows.items():
+            contact = existing.get(name)
+            if contact is None:
+                contact = Contact(
+                    tenant_id=tenant_id, name=name, created_by_id=self._import.created_by_id
+                )
+                new_contacts.append(contact)
+            else:
+                changed_contacts.append(contact)
+            apply_row(contact, data)
+
+        # ignore_conflicts covers contacts created concurrently since the lookup above
+        started = timezone.now()
+        Contact.objects.bulk_create(new_contacts, ignore_conflicts=True)
+        inserted = self.get_inserted_names(new_contacts, started)
+        # Contacts that lost the race are updated with the row like any existing contact
+        raced = {contact.name: contact for contact in new_contacts if contact.name not in inserted}
+        for contact in Contact.objects.filter(tenant_id=tenant_id, name__in=raced):
+            apply_row(contact, valid_rows[contact.name][1])
+            changed_contacts.append(contact)
+        # Only the columns the rows carry, so other columns of concurrent updates are kept
+        update_fields = [
+            field
+            for field in CONTACT_IMPORT_FIELDS
+            if any(field in valid_rows[contact.name][1] for contact in changed_contacts)
+        ]
+        if update_fields:
+            Contact.objects.bulk_update(changed_contacts, update_fields)
+        if inserted:
+            funnel = FunnelDeltas(tenant_id)
+            funnel.add_leads(self._import.created_by_id, timezone.now(), len(inserted))
+            funnel.save()
+
+        contact_ids = dict(
+            Contact.objects.filter(tenant_id=tenant_id, name__in=valid_rows).values_list(
+                "name", "id"
+            )
+        )
+        self.upsert_associates(valid_rows, contact_ids)
+        return len(inserted), len(changed_contacts)
+
+    def get_inserted_names(self, new_contacts: List[Contact], started) -> set:
+        """Names of the new contacts this batch inserted, bulk_create does not tell with ignore_conflicts"""
+        if not new_contacts:
+            return set()
+        return set(
+            Contact.objects.filter(
+                tenant_id=self._import.tenant_id,
+                name__in=[contact.name for contact in new_contacts],
+                created_by_id=self._import.created_by_id,
+                created_on__gte=started,
+            ).values_list("name", flat=True)
+        )
+
+    def upsert_associates(
+        self, valid_rows: Dict[str, Tuple[int, Dict]], contact_ids: Dict[str, int]
+    ) -> None:
+        incoming: List[Tuple[int, ContactAssociate]] = []
+        for name, (row_number, data) in valid_rows.items():
+            for associate_data in data.get("associates", []):
+                associate = ContactAssociate(
+                    tenant_id=self._import.tenant_id,
+                    contact_id=contact_ids[name],
+                    created_by_id=self._import.created_by_id,
+                    **{field: associate_data.get(field) for field in ASSOCIATE_IMPORT_FIELDS},
+                )
+                incoming.append((row_number, associate))
+        if not incoming:
+            return
+
+        # Associates are matched on their (globally unique) email or phone number.
+        # Matches of another tenant cannot be updated and are reported instead.
+        emails = [a.email for _, a in incoming if a.email]
+        phone_numbers = [a.phone_number for _, a in incoming if a.phone_number]
+        existing_by_email, existing_by_phone = {}, {}
+        for associate in ContactAssociate.objects.filter(
+            Q(email__in=emails) | Q(phone_number__in=phone_numbers)
+        ):
+            if associate.email:
+                existing_by_email[associate.email] = associate
+            if associate.phone_number:
+                existing_by_phone[str(associate.phone_number)] = associate
+
+        new_associates, changed_associates = [], {}
+        touched = {associate.contact_id for _, associate in incoming}
+        for row_number, associate in incoming:
+            match = None
+            if associate.email:
+                match = existing_by_email.get(associate.email)
+            if match is None and associate.phone_number:
+                match = existing_by_phone.get(str(associate.phone_number))
+            if match is None:
+                new_associates.append((row_number, associate))
+                # A later row with the same email or phone number updates this one
+                if associate.email:
+                    existing_by_email[associate.email] = associate
+                if associate.phone_number:
+                    existing_by_phone[str(associate.phone_number)] = associate
+                continue
+            if match.tenant_id != self._import.tenant_id:
+                self.add_associate_error(row_number, associate)
+                continue
+            # The contact an existing associate moves away from changes too
+            if match.pk is not None:
+                touched.add(match.contact_id)
+            for field in ASSOCIATE_IMPORT_FIELDS + ["contact_id"]:
+                setattr(match, field, getattr(associate, field))
+            if match.pk is not None:
+                changed_associates[match.id] = match
+
+        # ignore_conflicts covers associates created concurrently since the lookup above
+        ContactAssociate.objects.bulk_create(
+            [associate for _, associate in new_associates], ignore_conflicts=True
+        )
+        ContactAssociate.objects.bulk_update(
+            changed_associates.values(), ASSOCIATE_IMPORT_FIELDS + ["contact"]
+        )
+        # Bulk writes send no signals, expanded contact responses are versioned by updated_on
+        Contact.objects.filter(id__in=touched).update(updated_on=timezone.now())
+        self.report_skipped_associates(new_associates)
+
+    def report_skipped_associates(self, new_associates: List[Tuple[int, ContactAssociate]]) -> None:
+        """Reports the new associates that a conflict kept out of the table"""
+        if not new_associates:
+            return
+        rows = ContactAssociate.objects.filter(
+            tenant_id=self._import.tenant_id,
+            contact_id__in={associate.contact_id for _, associate in new_associates},
+        ).values_list("contact_id", "email", "phone_number")
+        saved = {
+            (contact_id, email, str(phone_number) if phone_number else None)
+            for contact_id, email, phone_number in rows
+        }
+        for row_number, associate in new_associates:
+            phone_number = str(associate.phone_number) if associate.phone_number else None
+            if (associate.contact_id, associate.email, phone_number) not in saved:
+                self.add_associate_error(row_number, associate)
+
+    def add_associate_error(self, row_number: int, associate: ContactAssociate) -> None:
+        self.add_error(
+            row=row_number,
+            errors={
+                "associates": [
+                    f"{associate.name} was skipped, its email or phone number belongs to another associate"
+                ]
+            },
+        )
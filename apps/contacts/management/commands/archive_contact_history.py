@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.contacts.archive import ContactArchiver
+from apps.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Move timeline entries and notes older than each tenant's archive_after_days to the archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="Only archive this tenant")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by("id")
+        if options["tenant"]:
+            tenants = tenants.filter(id=options["tenant"])
+        for tenant in tenants:
+            archived = ContactArchiver(tenant).archive()
+            self.stdout.write(f"{tenant.name}: {archived}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.contacts.funnel import FunnelBackfill
+from apps.tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily sales funnel rollups from contacts and their timelines. "
+        "Existing rollups of a tenant are replaced, changes saved while a tenant is "
+        "rebuilt may be miscounted, so run it when the tenants are quiet"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, help="Only backfill this tenant")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by("id")
+        if options["tenant"]:
+            tenants = tenants.filter(id=options["tenant"])
+        for tenant in tenants:
+            rows = FunnelBackfill(tenant).run()
+            self.stdout.write(f"{tenant.name}: {rows} rollup rows")
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.contacts.models import Contact
+from apps.contacts.serializers import ContactListSerializer, contact_list_rows
+
+
+class Command(BaseCommand):
+    help = "Compare ContactListSerializer with the values() fast path on one page of contacts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, required=True)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def timed(self, render, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            data = render()
+        return (time.perf_counter() - started) / repeat * 1000, data
+
+    def handle(self, *args, **options):
+        queryset = Contact.objects.filter(tenant_id=options["tenant"]).order_by("name", "id")
+        page = queryset[: options["page_size"]]
+        if not page.exists():
+            raise CommandError("Tenant has no contacts")
+        repeat = options["repeat"]
+
+        # Both paths include fetching the page, as the endpoints do
+        serializer_ms, expected = self.timed(
+            lambda: ContactListSerializer(list(page), many=True).data, repeat
+        )
+        rows_ms, data = self.timed(
+            lambda: contact_list_rows.serialize(contact_list_rows.values(page)), repeat
+        )
+        if [dict(row) for row in expected] != data:
+            raise CommandError("Fast path output differs from ContactListSerializer")
+
+        self.stdout.write(f"ContactListSerializer: {serializer_ms:.2f} ms per page")
+        self.stdout.write(f"RowSerializer:         {rows_ms:.2f} ms per page")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {serializer_ms / rows_ms:.1f}x"))
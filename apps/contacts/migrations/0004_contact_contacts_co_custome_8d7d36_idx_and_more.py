@@ -0,0 +1,29 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0003_remove_contact_contact_of_contact_customer_of_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['customer_of', 'name', 'id'], name='contacts_co_custome_8d7d36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['locked_by', 'name', 'id'], name='contacts_co_locked__9e7718_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactnote',
+            index=models.Index(fields=['contact', '-created_on', '-id'], name='contacts_co_contact_8a4119_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacttimeline',
+            index=models.Index(fields=['contact', '-created_on', '-id'], name='contacts_co_contact_841e6f_idx'),
+        ),
+    ]
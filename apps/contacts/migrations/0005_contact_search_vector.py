@@ -0,0 +1,69 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:53
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}email, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({row}city, '') || ' ' || coalesce({row}state, '')), 'C')
+"""
+
+CREATE_SEARCH_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION contacts_contact_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row="NEW.")};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER contacts_contact_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, email, city, state ON contacts_contact
+    FOR EACH ROW EXECUTE PROCEDURE contacts_contact_search_vector_update();
+    """,
+    f"UPDATE contacts_contact SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};",
+    "CREATE INDEX contacts_contact_search_vector_idx ON contacts_contact USING gin (search_vector);",
+    "CREATE INDEX contacts_contact_name_trgm_idx ON contacts_contact USING gin (name gin_trgm_ops);",
+    "CREATE INDEX contacts_contact_email_trgm_idx ON contacts_contact USING gin (UPPER(email::text) gin_trgm_ops);",
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX IF EXISTS contacts_contact_email_trgm_idx;",
+    "DROP INDEX IF EXISTS contacts_contact_name_trgm_idx;",
+    "DROP INDEX IF EXISTS contacts_contact_search_vector_idx;",
+    "DROP TRIGGER IF EXISTS contacts_contact_search_vector_trigger ON contacts_contact;",
+    "DROP FUNCTION IF EXISTS contacts_contact_search_vector_update();",
+]
+
+
+def run_on_postgres(statements):
+    # Other backends (SQLite in tests) use the in-memory search index instead
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0004_contact_contacts_co_custome_8d7d36_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='contact',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_on_postgres(CREATE_SEARCH_SQL), run_on_postgres(DROP_SEARCH_SQL)
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0006_contactimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='contactassociate',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='contactnote',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='contacttimeline',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['tenant', 'updated_on'], name='contacts_co_tenant__e0d9fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactnote',
+            index=models.Index(fields=['contact', 'updated_on'], name='contacts_co_contact_adbddf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contacttimeline',
+            index=models.Index(fields=['contact', 'updated_on'], name='contacts_co_contact_421936_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0007_versioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contacttimeline',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='contacttimeline',
+            constraint=models.UniqueConstraint(fields=('tenant', 'external_id'), name='unique_timeline_external_id'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_archive_after_days'),
+        ('contacts', '0008_timeline_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('TIMELINE', 'Timeline'), ('NOTES', 'Notes')], max_length=20)),
+                ('period', models.DateField(verbose_name='period')),
+                ('path', models.CharField(max_length=255, verbose_name='path')),
+                ('row_count', models.IntegerField(default=0)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('TIMELINE', 'Timeline'), ('NOTES', 'Notes')], max_length=20)),
+                ('row_count', models.IntegerField(default=0)),
+                ('newest_created_on', models.DateTimeField()),
+                ('oldest_created_on', models.DateTimeField()),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_segments', to='contacts.contact')),
+                ('segment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contacts', to='contacts.archivesegment')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedcontact',
+            index=models.Index(fields=['contact', 'kind', '-newest_created_on'], name='contacts_ar_contact_e98547_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_archive_after_days'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contacts', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFunnelDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('leads_created', models.IntegerField(default=0)),
+                ('lead_to_prospect', models.IntegerField(default=0)),
+                ('lead_to_customer', models.IntegerField(default=0)),
+                ('prospect_to_customer', models.IntegerField(default=0)),
+                ('customer_to_prospect', models.IntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funnel_days', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TenantFunnelDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('leads_created', models.IntegerField(default=0)),
+                ('lead_to_prospect', models.IntegerField(default=0)),
+                ('lead_to_customer', models.IntegerField(default=0)),
+                ('prospect_to_customer', models.IntegerField(default=0)),
+                ('customer_to_prospect', models.IntegerField(default=0)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='userfunnelday',
+            index=models.Index(fields=['tenant', 'day'], name='contacts_us_tenant__b92843_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userfunnelday',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='unique_user_funnel_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='tenantfunnelday',
+            constraint=models.UniqueConstraint(fields=('tenant', 'day'), name='unique_tenant_funnel_day'),
+        ),
+    ]
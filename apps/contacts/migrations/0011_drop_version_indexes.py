@@ -0,0 +1,25 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0010_funnel_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contacts_co_tenant__e0d9fd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contactnote',
+            name='contacts_co_contact_adbddf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contacttimeline',
+            name='contacts_co_contact_421936_idx',
+        ),
+    ]
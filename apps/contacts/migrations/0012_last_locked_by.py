@@ -0,0 +1,35 @@
+# Generated by Django 4.0.6 on 2026-10-18 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def release_expired_locks(apps, schema_editor):
+    # Expired locks used to keep locked_by, which kept the contacts owner-only
+    Contact = apps.get_model('contacts', 'Contact')
+    Contact.objects.filter(is_locked=False, locked_by__isnull=False).exclude(lifecycle_status='CUSTOMER').update(
+        last_locked_by=models.F('locked_by'), unlocked_on=models.F('locked_on'), locked_by=None
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contacts', '0011_drop_version_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='last_locked_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='unlocked_on',
+            field=models.DateTimeField(null=True, verbose_name='unlocked_on'),
+        ),
+        migrations.RunPython(release_expired_locks, migrations.RunPython.noop),
+    ]
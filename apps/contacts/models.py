@@ -1,10 +1,12 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
 from apps.tenants.models import TenantAwareModel
+from apps.utils.models import VersionedModel
 
 
 class Lifecycle(models.TextChoices):
@@ -13,13 +15,32 @@ class Lifecycle(models.TextChoices):
     CUSTOMER = "CUSTOMER", _("Customer")
 
 
+class LifecycleAction(models.TextChoices):
+    LOCK = "lock", _("Lock")
+    UNLOCK = "unlock", _("Unlock")
+    CONVERT_TO_CUSTOMER = "convert_to_customer", _("Convert to customer")
+    CONVERT_TO_PROSPECT = "convert_to_prospect", _("Convert to prospect")
+
+
 class TimeZone(models.TextChoices):
     EST = "EST"
     CST = "CST"
     PST = "PST"
 
 
-class Contact(TenantAwareModel):
+class ImportFormat(models.TextChoices):
+    CSV = "CSV"
+    NDJSON = "NDJSON"
+
+
+class ImportStatus(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    RUNNING = "RUNNING", _("Running")
+    COMPLETED = "COMPLETED", _("Completed")
+    FAILED = "FAILED", _("Failed")
+
+
+class Contact(TenantAwareModel, VersionedModel):
 
     # Contact Info
     name = models.CharField("name", max_length=255)
@@ -70,9 +91,24 @@ class Contact(TenantAwareModel):
         null=True,
         related_name="locked_contacts",
     )
+    # Whose lock expired last and when, they cannot lock the contact again during the cooldown
+    last_locked_by = models.ForeignKey(
+        "profiles.UserProfile",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+    )
+    unlocked_on = models.DateTimeField("unlocked_on", null=True)
+
+    # Search Info: maintained by a database trigger on Postgres (see migration 0005)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         unique_together = ("tenant", "name")
+        indexes = [
+            models.Index(fields=["customer_of", "name", "id"]),
+            models.Index(fields=["locked_by", "name", "id"]),
+        ]
 
     def __str__(self) -> str:
         return f"{self.name}"
@@ -81,7 +117,7 @@ class Contact(TenantAwareModel):
 # TODO: Ensure that each Contact has at least 1 ContactAssociate
 # TODO: Create the initial contact when contact created
 # TODO: Do not allow deletion if only 1 ContactAssociate exists
-class ContactAssociate(TenantAwareModel):
+class ContactAssociate(TenantAwareModel, VersionedModel):
     name = models.CharField("name", max_length=255)
     phone_number = PhoneNumberField(null=True, unique=True)
     phone_number_ext = models.IntegerField(null=True)
@@ -101,23 +137,152 @@ class ContactAssociate(TenantAwareModel):
         return f"{self.name} <{self.email}> <{self.phone_number}>"
 
 
-class ContactNote(TenantAwareModel):
+class ContactNote(TenantAwareModel, VersionedModel):
     contact = models.ForeignKey(
         "Contact", on_delete=models.CASCADE, related_name="notes"
     )
     created_on = models.DateTimeField(auto_now_add=True)
     body = models.TextField(null=False, blank=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["contact", "-created_on", "-id"]),
+        ]
+
     def __str__(self) -> str:
         return f"<{self.contact.name} <{self.created_on}> <{self.body}>"
 
 
-class ContactTimeline(TenantAwareModel):
+class ContactTimeline(TenantAwareModel, VersionedModel):
     contact = models.ForeignKey(
         "Contact", on_delete=models.CASCADE, related_name="timeline"
     )
     created_on = models.DateTimeField(auto_now_add=True)
     title = models.CharField(max_length=255, null=False, blank=False)
+    # Id of the upstream event an entry was recorded from, so redelivered events are skipped
+    external_id = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["contact", "-created_on", "-id"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "external_id"], name="unique_timeline_external_id"
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"<{self.contact.name} <{self.created_on}> <{self.title}>"
+
+
+class ContactImport(TenantAwareModel):
+    file = models.FileField(upload_to="contact_imports/")
+    file_format = models.CharField(choices=ImportFormat.choices, max_length=10)
+    status = models.CharField(
+        choices=ImportStatus.choices, max_length=20, default=ImportStatus.PENDING
+    )
+    created_by = models.ForeignKey(
+        "profiles.UserProfile", on_delete=models.SET_NULL, null=True
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+    finished_on = models.DateTimeField(null=True)
+
+    # Progress Info
+    processed_rows = models.IntegerField(default=0)
+    created_rows = models.IntegerField(default=0)
+    updated_rows = models.IntegerField(default=0)
+    failed_rows = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+
+    def __str__(self) -> str:
+        return f"<{self.file.name} <{self.status}> <{self.processed_rows}>"
+
+
+class ArchiveKind(models.TextChoices):
+    TIMELINE = "TIMELINE"
+    NOTES = "NOTES"
+
+
+class ArchiveSegment(TenantAwareModel):
+    """A compressed file of one tenant's timeline entries or notes created in one month"""
+
+    kind = models.CharField(choices=ArchiveKind.choices, max_length=20)
+    period = models.DateField("period")
+    path = models.CharField("path", max_length=255)
+    row_count = models.IntegerField(default=0)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"<{self.path} <{self.row_count}>"
+
+
+class ArchivedContact(models.Model):
+    """Which segments hold rows of a contact, and the time range of those rows"""
+
+    segment = models.ForeignKey(
+        "ArchiveSegment", on_delete=models.CASCADE, related_name="contacts"
+    )
+    contact = models.ForeignKey(
+        "Contact", on_delete=models.CASCADE, related_name="archived_segments"
+    )
+    kind = models.CharField(choices=ArchiveKind.choices, max_length=20)
+    row_count = models.IntegerField(default=0)
+    newest_created_on = models.DateTimeField()
+    oldest_created_on = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["contact", "kind", "-newest_created_on"]),
+        ]
+
+
+class FunnelCounts(models.Model):
+    """Sales funnel counters of one day, see apps.contacts.funnel"""
+
+    day = models.DateField("day")
+    leads_created = models.IntegerField(default=0)
+    lead_to_prospect = models.IntegerField(default=0)
+    lead_to_customer = models.IntegerField(default=0)
+    prospect_to_customer = models.IntegerField(default=0)
+    customer_to_prospect = models.IntegerField(default=0)
+
+    COUNTER_FIELDS = (
+        "leads_created",
+        "lead_to_prospect",
+        "lead_to_customer",
+        "prospect_to_customer",
+        "customer_to_prospect",
+    )
+
+    class Meta:
+        abstract = True
+
+
+class TenantFunnelDay(TenantAwareModel, FunnelCounts):
+    """A tenant's funnel counters of one day, including changes not attributed to a user"""
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tenant", "day"], name="unique_tenant_funnel_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"<{self.tenant_id}> <{self.day}>"
+
+
+class UserFunnelDay(TenantAwareModel, FunnelCounts):
+    """A user's funnel counters of one day"""
+
+    user = models.ForeignKey(
+        "profiles.UserProfile", on_delete=models.CASCADE, related_name="funnel_days"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="unique_user_funnel_day"),
+        ]
+        indexes = [models.Index(fields=["tenant", "day"])]
+
+    def __str__(self) -> str:
+        return f"<{self.user_id}> <{self.day}>"
@@ -0,0 +1,229 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, QuerySet, Value, When
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from apps.utils.pagination import RANK_ANNOTATION
+from apps.utils.tenants import get_tenant_from_request
+from routers.db_routers import read_from_primary
+
+from .models import Contact
+
+# Weight of each searchable column, highest first (Postgres weights A-D)
+SEARCH_FIELD_WEIGHTS = {"name": 1.0, "email": 0.6, "city": 0.4, "state": 0.4}
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class ContactSearchBackend:
+    """Filters a tenant's contact queryset by a search term and annotates a relevance rank"""
+
+    def search(self, queryset: QuerySet, term: str, tenant_id: int) -> QuerySet:
+        raise NotImplementedError
+
+    def index_contact(self, contact: Contact) -> None:
+        pass
+
+    def remove_contact(self, contact: Contact) -> None:
+        pass
+
+    def invalidate_tenant(self, tenant_id: int) -> None:
+        """Called after bulk writes that bypass the Contact signals"""
+
+
+class PostgresContactSearchBackend(ContactSearchBackend):
+    """
+    Uses the trigger-maintained Contact.search_vector (GIN indexed) for prefix
+    token matches plus pg_trgm indexes on name/email for fuzzy and infix matches.
+    """
+
+    def search(self, queryset: QuerySet, term: str, tenant_id: int) -> QuerySet:
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+        query = SearchQuery(
+            " & ".join(f"{token}:*" for token in tokens),
+            search_type="raw",
+            config="simple",
+        )
+        return queryset.filter(
+            Q(search_vector=query)
+            | Q(name__trigram_similar=term)
+            | Q(email__icontains=term)
+        ).annotate(
+            **{
+                RANK_ANNOTATION: SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("name", term)
+            }
+        )
+
+
+class TenantIndex:
+    """Inverted index of token -> {contact_id: weight} for a single tenant"""
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.documents: Dict[int, List[str]] = {}
+        self.sorted_tokens: List[str] = []
+
+    @classmethod
+    def build(cls, rows) -> "TenantIndex":
+        index = cls()
+        for row in rows:
+            index.add(row["id"], row, keep_sorted=False)
+        index.sorted_tokens = sorted(index.postings)
+        return index
+
+    def add(self, contact_id: int, values: Dict[str, str], keep_sorted: bool = True) -> None:
+        self.remove(contact_id)
+        tokens = []
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(values.get(field)):
+                if keep_sorted and token not in self.postings:
+                    bisect.insort(self.sorted_tokens, token)
+                posting = self.postings[token]
+                posting[contact_id] = max(posting.get(contact_id, 0.0), weight)
+                tokens.append(token)
+        self.documents[contact_id] = tokens
+
+    def remove(self, contact_id: int) -> None:
+        for token in self.documents.pop(contact_id, []):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(contact_id, None)
+            if not posting:
+                del self.postings[token]
+                del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+
+    def prefix_matches(self, prefix: str) -> Dict[int, float]:
+        matches: Dict[int, float] = {}
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            # Exact token matches outrank prefix matches
+            boost = 1.0 if token == prefix else 0.5
+            for contact_id, weight in self.postings[token].items():
+                matches[contact_id] = max(matches.get(contact_id, 0.0), weight * boost)
+        return matches
+
+    def search(self, tokens: List[str], limit: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for position, token in enumerate(tokens):
+            matches = self.prefix_matches(token)
+            if position == 0:
+                scores = matches
+            else:
+                scores = {
+                    contact_id: score + matches[contact_id]
+                    for contact_id, score in scores.items()
+                    if contact_id in matches
+                }
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+class InMemoryContactSearchBackend(ContactSearchBackend):
+    """
+    Process-local inverted index, built lazily per tenant and kept current by
+    the Contact save/delete signals. Meant for SQLite, local development and tests.
+    """
+
+    max_results = 1000
+
+    def __init__(self) -> None:
+        self._indexes: Dict[int, TenantIndex] = {}
+        self._lock = threading.Lock()
+
+    def get_index(self, tenant_id: int) -> TenantIndex:
+        with self._lock:
+            index = self._indexes.get(tenant_id)
+            if index is None:
+                rows = Contact.objects.filter(tenant_id=tenant_id).values(
+                    "id", *SEARCH_FIELD_WEIGHTS
+                )
+                # Kept current by signals from here on, so it must start from the latest rows
+                with read_from_primary():
+                    index = TenantIndex.build(rows.iterator(chunk_size=2000))
+                self._indexes[tenant_id] = index
+            return index
+
+    def index_contact(self, contact: Contact) -> None:
+        with self._lock:
+            index = self._indexes.get(contact.tenant_id)
+            if index is not None:
+                values = {field: getattr(contact, field) for field in SEARCH_FIELD_WEIGHTS}
+                index.add(contact.id, values)
+
+    def remove_contact(self, contact: Contact) -> None:
+        with self._lock:
+            index = self._indexes.get(contact.tenant_id)
+            if index is not None:
+                index.remove(contact.id)
+
+    def invalidate_tenant(self, tenant_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(tenant_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def search(self, queryset: QuerySet, term: str, tenant_id: int) -> QuerySet:
+        tokens = tokenize(term)
+        if not tokens:
+            return queryset.none()
+        index = self.get_index(tenant_id)
+        with self._lock:
+            ranked = index.search(tokens, self.max_results)
+        if not ranked:
+            return queryset.none()
+        rank = Case(
+            *[When(id=contact_id, then=Value(score)) for contact_id, score in ranked],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=[contact_id for contact_id, _ in ranked]).annotate(
+            **{RANK_ANNOTATION: rank}
+        )
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> ContactSearchBackend:
+    backend_path = getattr(settings, "CONTACT_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == "postgresql":
+        return PostgresContactSearchBackend()
+    return InMemoryContactSearchBackend()
+
+
+class ContactSearchFilter(BaseFilterBackend):
+    """Relevance ranked replacement for SearchFilter backed by the configured search backend"""
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "").strip()
+        if not term:
+            return queryset
+        tenant = get_tenant_from_request(request)
+        return get_search_backend().search(queryset, term, tenant_id=tenant.id)
@@ -1,19 +1,36 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
 
-from apps.contacts.models import Contact, ContactNote, ContactTimeline
+from apps.contacts.models import (Contact, ContactImport, ContactNote,
+                                  ContactTimeline, ImportFormat,
+                                  LifecycleAction)
+from apps.utils.serializers import RowSerializer
 
 
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
-        read_only = ["created_by", "locked_by", "customer_of", "locked_on", "is_locked"]
-        exclude = ["tenant"]
+        read_only = [
+            "created_by",
+            "locked_by",
+            "customer_of",
+            "locked_on",
+            "is_locked",
+            "last_locked_by",
+            "unlocked_on",
+        ]
+        exclude = ["tenant", "search_vector"]
 
 class ContactListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
         read_only = ['created_by']
-        fields = '__all__'
+        exclude = ['search_vector']
+
+# Fast path used by the contact list endpoints, see RowSerializer
+contact_list_rows = RowSerializer(ContactListSerializer)
 
 class ContactTimelineSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,3 +43,55 @@ class ContactNoteSerializer(serializers.ModelSerializer):
         model = ContactNote
         read_only = ['created_on', 'body']
         fields = ['created_on', 'body']
+
+
+class ContactImportSerializer(serializers.ModelSerializer):
+    file_format = serializers.ChoiceField(choices=ImportFormat.choices, required=False)
+
+    class Meta:
+        model = ContactImport
+        exclude = ['tenant']
+        read_only_fields = [
+            'status', 'created_by', 'created_on', 'finished_on', 'processed_rows',
+            'created_rows', 'updated_rows', 'failed_rows', 'errors',
+        ]
+
+    def validate(self, data):
+        if "file_format" not in data:
+            extension = data["file"].name.rsplit(".", 1)[-1].upper()
+            if extension not in ImportFormat.values:
+                raise serializers.ValidationError(
+                    {"file_format": "Could not detect file format, pass CSV or NDJSON"}
+                )
+            data["file_format"] = extension
+        return data
+
+
+class BulkLifecycleSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    action = serializers.ChoiceField(choices=LifecycleAction.choices)
+
+
+class FunnelReportSerializer(serializers.Serializer):
+    """Query parameters of the funnel report, the range defaults to the last 30 days"""
+
+    MAX_DAYS = 3660
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    user = serializers.IntegerField(min_value=1, required=False)
+    team = serializers.IntegerField(min_value=1, required=False)
+    group_by = serializers.ChoiceField(choices=["day", "user"], required=False)
+
+    def validate(self, data):
+        data.setdefault("end", timezone.localdate())
+        data.setdefault("start", data["end"] - timedelta(days=29))
+        if data["start"] > data["end"]:
+            raise serializers.ValidationError({"start": "start must not be after end"})
+        if (data["end"] - data["start"]).days >= self.MAX_DAYS:
+            raise serializers.ValidationError({"start": f"The range is limited to {self.MAX_DAYS} days"})
+        if "user" in data and "team" in data:
+            raise serializers.ValidationError("Pass either user or team")
+        return data
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.contacts.caller_id import caller_id_index
+from apps.contacts.models import Contact, ContactAssociate
+
+
+@receiver(post_save, sender=ContactAssociate)
+def index_associate(sender, instance: ContactAssociate, **kwargs):
+    caller_id_index.index_associate(instance)
+
+
+@receiver(post_delete, sender=ContactAssociate)
+def remove_associate_from_index(sender, instance: ContactAssociate, **kwargs):
+    caller_id_index.remove_associate(instance)
+
+
+@receiver(post_save, sender=Contact)
+def rename_contact_in_index(sender, instance: Contact, update_fields=None, **kwargs):
+    # Lifecycle changes save a few columns only, the name is what the index holds
+    if not kwargs.get("created") and (update_fields is None or "name" in update_fields):
+        caller_id_index.rename_contact(instance)
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.contacts.funnel import FunnelDeltas
+from apps.contacts.models import Contact
+
+
+@receiver(post_save, sender=Contact)
+def count_new_lead(sender, instance: Contact, created: bool, **kwargs):
+    # Imported contacts are bulk created and counted by the importer
+    if created:
+        funnel = FunnelDeltas(instance.tenant_id)
+        funnel.add_leads(instance.created_by_id, instance.created_on)
+        funnel.save()
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.contacts.models import (Contact, ContactAssociate, ContactNote,
+                                  ContactTimeline)
+from apps.utils.response_cache import (CONTACTS, invalidate_responses,
+                                       invalidate_timelines)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_save, sender=ContactAssociate)
+@receiver(post_delete, sender=ContactAssociate)
+@receiver(post_save, sender=ContactNote)
+@receiver(post_delete, sender=ContactNote)
+def contact_changed(sender, instance, **kwargs):
+    # Associates and notes are part of expanded contact lists
+    invalidate_responses(instance.tenant_id, CONTACTS)
+
+
+@receiver(post_save, sender=ContactTimeline)
+@receiver(post_delete, sender=ContactTimeline)
+def timeline_changed(sender, instance: ContactTimeline, **kwargs):
+    invalidate_timelines(instance.tenant_id, [instance.contact_id])
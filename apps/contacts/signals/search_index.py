@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.contacts.models import Contact
+from apps.contacts.search import get_search_backend
+
+
+@receiver(post_save, sender=Contact)
+def index_contact(sender, instance: Contact, **kwargs):
+    get_search_backend().index_contact(instance)
+
+
+@receiver(post_delete, sender=Contact)
+def remove_contact_from_index(sender, instance: Contact, **kwargs):
+    get_search_backend().remove_contact(instance)
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.contacts.models import (Contact, ContactAssociate, ContactNote,
+                                  ContactTimeline)
+
+
+@receiver(post_save, sender=ContactAssociate)
+@receiver(post_save, sender=ContactNote)
+@receiver(post_save, sender=ContactTimeline)
+def touch_contact(sender, instance, **kwargs):
+    # Expanded contact responses embed their children, so a child write is a new contact version
+    Contact.objects.filter(id=instance.contact_id).update(updated_on=instance.updated_on)
+
+
+@receiver(post_delete, sender=ContactAssociate)
+@receiver(post_delete, sender=ContactNote)
+@receiver(post_delete, sender=ContactTimeline)
+def touch_contact_on_delete(sender, instance, **kwargs):
+    # Matches no row when the child went with its contact
+    Contact.objects.filter(id=instance.contact_id).update(updated_on=timezone.now())
@@ -1,9 +1,18 @@
-from celery import shared_task
+import logging
+
+from celery import group, shared_task
 from celery.schedules import crontab
 from logistics_crm.celery import app
 
+from apps.contacts.archive import archive_tenant
+from apps.contacts.controllers import ProspectExpiryController
+from apps.contacts.counters import reconcile_counters
+from apps.contacts.importer import ContactImporter
+from apps.contacts.models import ContactImport
 from apps.tenants.models import Tenant
 
+logger = logging.getLogger(__name__)
+
 
 @app.on_after_finalize.connect
 def setup_prospect_unlock(sender, **kwargs):
@@ -14,9 +23,67 @@ def setup_prospect_unlock(sender, **kwargs):
         unlock_prospects.s(),
     )
 
+@app.on_after_finalize.connect
+def setup_counter_reconciliation(sender, **kwargs):
+    # Executes every day at 1:00 a.m. PST
+    sender.add_periodic_task(
+        crontab(hour=1, minute=0),
+        reconcile_user_counters.s(),
+    )
+
+
+@app.on_after_finalize.connect
+def setup_history_archival(sender, **kwargs):
+    # Executes every day at 2:00 a.m. PST
+    sender.add_periodic_task(
+        crontab(hour=2, minute=0),
+        archive_contact_history.s(),
+    )
+
+
 @app.task
 def unlock_prospects():
-    # TODO: Implement this
-    tenants = Tenant.objects.all()
-    for tenant in tenants:
-        print(f"Unlocking contacts for tenant: {tenant.name}")
+    # Fan out one task per tenant so large tenants unlock in parallel
+    tenant_ids = Tenant.objects.values_list("id", flat=True)
+    group(unlock_tenant_prospects.s(tenant_id) for tenant_id in tenant_ids).apply_async()
+
+
+@app.task
+def unlock_tenant_prospects(tenant_id: int):
+    tenant = Tenant.objects.get(id=tenant_id)
+    unlocked = ProspectExpiryController(tenant).unlock_expired_prospects()
+    logger.info(f"Unlocked {unlocked} prospects for tenant: {tenant.name}")
+    return unlocked
+
+
+@app.task
+def reconcile_user_counters():
+    tenant_ids = Tenant.objects.values_list("id", flat=True)
+    group(reconcile_tenant_counters.s(tenant_id) for tenant_id in tenant_ids).apply_async()
+
+
+@app.task
+def reconcile_tenant_counters(tenant_id: int):
+    corrected = reconcile_counters(tenant_id=tenant_id)
+    if corrected:
+        logger.warning(f"Corrected drifted counters of {corrected} users for tenant: {tenant_id}")
+    return corrected
+
+
+@app.task
+def archive_contact_history():
+    tenant_ids = Tenant.objects.values_list("id", flat=True)
+    group(archive_tenant_history.s(tenant_id) for tenant_id in tenant_ids).apply_async()
+
+
+@app.task
+def archive_tenant_history(tenant_id: int):
+    archived = archive_tenant(tenant_id)
+    logger.info(f"Archived {archived} rows for tenant: {tenant_id}")
+    return archived
+
+
+@app.task
+def import_contacts(contact_import_id: int):
+    contact_import = ContactImport.objects.get(id=contact_import_id)
+    ContactImporter(contact_import).run()
@@ -1,3 +1,66 @@
 from django.test import TestCase
 
-# Create your tests here.
+from apps.contacts.models import Contact
+from apps.contacts.search import InMemoryContactSearchBackend
+from apps.tenants.models import Tenant
+from apps.utils.pagination import RANK_ANNOTATION
+
+
+class InMemoryContactSearchBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme Logistics", subdomain_prefix="acme")
+        cls.other_tenant = Tenant.objects.create(name="Other", subdomain_prefix="other")
+
+    def setUp(self):
+        self.backend = InMemoryContactSearchBackend()
+
+    def create_contact(self, name, tenant=None, **fields):
+        fields = {"address_1": "1 Main St", "city": "Austin", "state": "TX", "zip_code": "73301", **fields}
+        return Contact.objects.create(tenant=tenant or self.tenant, name=name, **fields)
+
+    def search(self, term, tenant=None):
+        tenant = tenant or self.tenant
+        results = self.backend.search(Contact.objects.filter(tenant=tenant), term, tenant_id=tenant.id)
+        ranked = sorted(results, key=lambda contact: (-getattr(contact, RANK_ANNOTATION), contact.id))
+        return [contact.name for contact in ranked]
+
+    def test_ranks_by_field_weight_and_exact_token(self):
+        self.create_contact("Harbor Freight", city="Dallas")
+        self.create_contact("Harborside Storage")
+        self.create_contact("Blue Line", email="harbor@blueline.com")
+        self.create_contact("Red Line", city="Harbor")
+        self.assertEqual(
+            self.search("harbor"),
+            ["Harbor Freight", "Blue Line", "Harborside Storage", "Red Line"],
+        )
+
+    def test_every_token_must_match(self):
+        self.create_contact("Harbor Freight")
+        self.create_contact("Harbor Storage", city="Dallas")
+        self.assertEqual(self.search("harbor dal"), ["Harbor Storage"])
+        self.assertEqual(self.search("harbor houston"), [])
+        self.assertEqual(self.search("  "), [])
+
+    def test_tenants_are_isolated(self):
+        self.create_contact("Harbor Freight")
+        self.create_contact("Harbor Freight", tenant=self.other_tenant)
+        self.create_contact("Harbor Storage", tenant=self.other_tenant)
+        self.assertEqual(self.search("harbor"), ["Harbor Freight"])
+        self.assertEqual(self.search("harbor", self.other_tenant), ["Harbor Freight", "Harbor Storage"])
+
+    def test_max_results_keeps_the_best_matches(self):
+        self.backend.max_results = 2
+        self.create_contact("Cargo Express", city="Harbor")
+        self.create_contact("Harbor Freight")
+        self.create_contact("Harbor Storage")
+        self.assertEqual(self.search("harbor"), ["Harbor Freight", "Harbor Storage"])
+
+    def test_follows_indexed_and_removed_contacts(self):
+        self.create_contact("Harbor Freight")
+        self.assertEqual(self.search("harbor"), ["Harbor Freight"])
+        contact = self.create_contact("Harbor Storage")
+        self.backend.index_contact(contact)
+        self.assertEqual(self.search("storage"), ["Harbor Storage"])
+        self.backend.remove_contact(contact)
+        self.assertEqual(self.search("storage"), [])
@@ -1,33 +1,57 @@
 from datetime import datetime, timedelta
+from functools import partial
+from typing import List
 
-from rest_framework import filters, status, viewsets
-from rest_framework.authentication import TokenAuthentication
+from django.http import StreamingHttpResponse
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.profiles.authentication import CachedTokenAuthentication
+from apps.profiles.hierarchy import is_in_team, team_ids
 from apps.profiles.models import UserProfile
+from apps.roles.models import DEFAULT_MANAGER_ROLE_NAME
+from apps.utils.conditional import ConditionalGetMixin
 from apps.utils.db_helper import save_models_in_transaction
+from apps.utils.pagination import NameKeysetPagination, paginate_response
+from apps.utils.phone_numbers import normalize_phone_number
+from apps.utils.response_cache import (CONTACTS, USERS, CachedResponseMixin,
+                                       timeline_namespace)
 from apps.utils.serializers import GetSerializerMixin
 from apps.utils.tenants import get_tenant_from_request
 
-from .controllers import ContactLifecycleController
-from .models import Contact, ContactNote, Lifecycle
+from .archive import ArchivedCreatedOnPagination
+from .caller_id import caller_id_index
+from .controllers import BulkLifecycleController, ContactLifecycleController
+from .expansions import (EXPAND_PARAM, FIELDS_PARAM, ContactExpander,
+                         narrow_fields, parse_list_param)
+from .exporter import ContactExporter
+from .funnel import FunnelReport
+from .models import (ArchiveKind, Contact, ContactImport, ContactNote,
+                     ImportFormat, Lifecycle)
 from .permissions import ViewContactPermissions
-from .serializers import (ContactListSerializer, ContactNoteSerializer,
-                          ContactSerializer, ContactTimelineSerializer)
+from .search import ContactSearchFilter
+from .serializers import (BulkLifecycleSerializer, ContactImportSerializer,
+                          ContactListSerializer, ContactNoteSerializer,
+                          ContactSerializer, ContactTimelineSerializer,
+                          FunnelReportSerializer, contact_list_rows)
+from .tasks import import_contacts
 
 
-class ContactViewSet(GetSerializerMixin, viewsets.ModelViewSet):
+class ContactViewSet(
+    ConditionalGetMixin, CachedResponseMixin, GetSerializerMixin, viewsets.ModelViewSet
+):
     serializer_class = ContactSerializer
     serializer_action_classes = {
         "list": ContactListSerializer,
     }
     queryset = Contact.objects.all()
-    authentication_classes = (TokenAuthentication,)
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("name", "email", "state", "city")
+    authentication_classes = (CachedTokenAuthentication,)
+    filter_backends = (ContactSearchFilter,)
     permission_classes = (ViewContactPermissions,)
+    pagination_class = NameKeysetPagination
 
     def get_queryset(self):
         tenant = get_tenant_from_request(self.request)
@@ -35,7 +59,86 @@ class ContactViewSet(GetSerializerMixin, viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         tenant = get_tenant_from_request(self.request)
-        return serializer.save(tenant=tenant)
+        # Attributes the new lead to its creator in the funnel rollups
+        return serializer.save(tenant=tenant, created_by=self.request.user)
+
+    def get_versioned_object(self) -> Contact:
+        """The contact with only the columns its permission check and version need"""
+        queryset = self.get_queryset()
+        fields = ["id", "tenant", "locked_by", "updated_on"]
+        if self.expands_locked_by():
+            queryset = queryset.select_related("locked_by")
+            fields.append("locked_by__updated_at")
+        contact: Contact = get_object_or_404(queryset.only(*fields), pk=self.kwargs["pk"])
+        self.check_object_permissions(self.request, contact)
+        return contact
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_generation_response(
+            self.list_namespaces(), lambda: self.cached_list_rows(queryset)
+        )
+
+    def list_namespaces(self) -> List[str]:
+        namespaces = [CONTACTS]
+        if self.expands_locked_by():
+            namespaces.append(USERS)
+        return namespaces
+
+    def expands_locked_by(self) -> bool:
+        return "locked_by" in self.request.query_params.get(EXPAND_PARAM, "")
+
+    def cached_list_rows(self, queryset, scope: str = "tenant"):
+        return self.cached_response(
+            lambda: self.list_rows(queryset), self.list_namespaces(), scope=scope
+        )
+
+    def list_rows(self, queryset):
+        # Same output as ContactListSerializer, read from values() rows
+        row_serializer = contact_list_rows
+        fields = parse_list_param(self.request, FIELDS_PARAM, row_serializer.field_names)
+        if fields:
+            row_serializer = row_serializer.only(fields)
+        expander = ContactExpander.from_request(self.request)
+        ordering = [field.lstrip("-") for field in getattr(self.paginator, "ordering", ())]
+        rows = row_serializer.values(queryset, *expander.required_columns, *ordering)
+
+        page = self.paginate_queryset(rows)
+        rows = list(rows) if page is None else page
+        data = row_serializer.serialize(rows)
+        expander.expand_rows(rows, data)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        contact = self.get_versioned_object()
+        # Writes and deletes of associates and notes touch the contact's updated_on,
+        # see signals.versioning. The expanded owner is versioned by its own row.
+        # A deleted contact is a 404, so the latest of them also answers If-Modified-Since.
+        versions = [contact.updated_on]
+        if self.expands_locked_by() and contact.locked_by_id is not None:
+            versions.append(contact.locked_by.updated_at)
+        return self.conditional_response(
+            [version.isoformat() for version in versions],
+            self.render_contact,
+            last_modified=max(versions),
+        )
+
+    def render_contact(self):
+        request = self.request
+        fields = parse_list_param(request, FIELDS_PARAM, ContactSerializer().fields)
+        expander = ContactExpander.from_request(request)
+        queryset = self.get_queryset()
+        if fields:
+            # tenant and locked_by are read by ViewContactPermissions
+            queryset = queryset.only(*fields, *expander.required_columns, "tenant")
+        contact: Contact = get_object_or_404(queryset, pk=self.kwargs["pk"])
+        self.check_object_permissions(request, contact)
+
+        data = narrow_fields(self.get_serializer(contact), fields).data
+        expander.expand_rows([{"id": contact.id, "locked_by": contact.locked_by_id}], [data])
+        return Response(data)
 
     @action(detail=True, methods=["patch"])
     def lock(self, request, pk=None):
@@ -69,6 +172,17 @@ class ContactViewSet(GetSerializerMixin, viewsets.ModelViewSet):
         controller.update_lifecycle_status(user=user, status=Lifecycle.PROSPECT)
         return Response({"message": "Converted to prospect"}, status=status.HTTP_202_ACCEPTED)
 
+    @action(detail=False, methods=["post"])
+    def bulk_lifecycle(self, request: Request, pk=None):
+        serializer = BulkLifecycleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        controller = BulkLifecycleController(user=request.user)
+        results = controller.apply(
+            contact_ids=serializer.validated_data["ids"],
+            action=serializer.validated_data["action"],
+        )
+        return Response({"results": results})
+
     @action(detail=True, methods=["post"])
     def add_note(self, request: Request, pk=None):
         contact: Contact = self.get_object()
@@ -79,40 +193,155 @@ class ContactViewSet(GetSerializerMixin, viewsets.ModelViewSet):
         note.save()
         return Response({"message": "Added note"})
 
-    # TODO: Add pagination?
     @action(detail=True, methods=["get"])
     def timeline(self, request: Request, pk=None):
-        contact: Contact = self.get_object()
-        timeline = contact.timeline.all().order_by("-created_on")
-        data = [ContactTimelineSerializer(event).data for event in timeline]
-        return Response(data)
+        contact = self.get_versioned_object()
+        queryset = contact.timeline.all()
+        return self.conditional_generation_response(
+            [timeline_namespace(contact.id)],
+            lambda: self.cached_response(
+                lambda: paginate_response(
+                    self,
+                    queryset,
+                    ContactTimelineSerializer,
+                    partial(ArchivedCreatedOnPagination, ArchiveKind.TIMELINE, contact.id),
+                ),
+                [timeline_namespace(contact.id)],
+            ),
+        )
 
-    # TODO: Add pagination?
     @action(detail=True, methods=["get"])
     def notes(self, request: Request, pk=None):
-        contact: Contact = self.get_object()
-        notes = contact.notes.all().order_by("-created_on")
-        data = [ContactNoteSerializer(note).data for note in notes]
-        return Response(data)
+        contact = self.get_versioned_object()
+        queryset = contact.notes.all()
+        # Note changes start a new CONTACTS generation, see signals.response_cache
+        return self.conditional_generation_response(
+            [CONTACTS],
+            lambda: paginate_response(
+                self,
+                queryset,
+                ContactNoteSerializer,
+                partial(ArchivedCreatedOnPagination, ArchiveKind.NOTES, contact.id),
+            ),
+        )
 
     @action(detail=False, methods=["get"])
     def my_customers(self, request: Request, pk=None):
         user: UserProfile = request.user
-        queryset = user.my_customers.all().order_by("name")
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = ContactListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = ContactListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = user.my_customers.all()
+        return self.conditional_generation_response(
+            self.list_namespaces(), lambda: self.cached_list_rows(queryset, scope=f"user:{user.id}")
+        )
 
     @action(detail=False, methods=["get"])
     def my_prospects(self, request: Request, pk=None):
         user: UserProfile = request.user
-        queryset = user.locked_contacts.all().order_by("name")
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = ContactListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = ContactListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = user.locked_contacts.all()
+        return self.conditional_generation_response(
+            self.list_namespaces(), lambda: self.cached_list_rows(queryset, scope=f"user:{user.id}")
+        )
+
+    @action(detail=False, methods=["get"], url_path="caller-id")
+    def caller_id(self, request: Request, pk=None):
+        """Screen-pop lookup of an incoming call's number, served from the in-memory index"""
+        number = normalize_phone_number(request.query_params.get("number"))
+        if number is None:
+            return Response(
+                {"message": "number must be a valid phone number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        tenant = get_tenant_from_request(request)
+        match = caller_id_index.lookup(tenant.id, number)
+        if match is None:
+            return Response(
+                {"message": f"No contact found for {number}"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(match)
+
+    @action(detail=False, methods=["get"])
+    def funnel(self, request: Request, pk=None):
+        """Funnel counters and conversion rates of the tenant, a team or a rep, from the daily rollups"""
+        serializer = FunnelReportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        tenant = get_tenant_from_request(request)
+        user: UserProfile = request.user
+        is_manager = (
+            not user.is_staff
+            and user.role is not None
+            and user.role.name == f"{tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}"
+        )
+        sees_tenant = user.is_staff or (
+            user.has_perm("profiles.list_userprofile") and not is_manager
+        )
+
+        if "user" in params:
+            rep = UserProfile.objects.filter(tenant=tenant, id=params["user"]).first()
+            if rep is None or not (sees_tenant or is_in_team(rep.id, user.id)):
+                return Response({"message": "Not Found"}, status=status.HTTP_404_NOT_FOUND)
+            scope, user_ids = "user", [rep.id]
+        elif "team" in params:
+            if not sees_tenant and not is_in_team(params["team"], user.id):
+                return Response({"message": "Not Found"}, status=status.HTTP_404_NOT_FOUND)
+            scope, user_ids = "team", team_ids(params["team"])
+        elif sees_tenant:
+            scope, user_ids = "tenant", None
+        elif is_manager:
+            scope, user_ids = "team", team_ids(user.id)
+        else:
+            scope, user_ids = "user", [user.id]
+
+        report = FunnelReport(tenant.id, params["start"], params["end"], user_ids)
+        data = {
+            "scope": scope,
+            "start": params["start"],
+            "end": params["end"],
+            "totals": report.totals(),
+        }
+        if params.get("group_by") == "day":
+            data["days"] = report.by_day()
+        elif params.get("group_by") == "user":
+            data["users"] = report.by_user()
+        return Response(data)
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request: Request, pk=None):
+        user: UserProfile = request.user
+        if not user.is_staff and not user.has_perm("contacts.add_contact"):
+            return Response({"message": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        serializer = ContactImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        contact_import: ContactImport = serializer.save(
+            tenant=get_tenant_from_request(request), created_by=user
+        )
+        import_contacts.delay(contact_import.id)
+        return Response(
+            ContactImportSerializer(contact_import).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=False, methods=["get"], url_path=r"imports/(?P<import_id>\d+)")
+    def import_status(self, request: Request, import_id=None):
+        contact_import = get_object_or_404(
+            ContactImport, id=import_id, tenant=get_tenant_from_request(request)
+        )
+        return Response(ContactImportSerializer(contact_import).data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request: Request, pk=None):
+        user: UserProfile = request.user
+        if not user.is_staff and not user.has_perm("contacts.view_contact"):
+            return Response({"message": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        file_format = request.query_params.get("file_format", ImportFormat.CSV).upper()
+        if file_format not in ImportFormat.values:
+            return Response(
+                {"message": "file_format must be CSV or NDJSON"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        include = request.query_params.get("include", "").split(",")
+        exporter = ContactExporter(
+            queryset=Contact.objects.filter(tenant=get_tenant_from_request(request)),
+            file_format=file_format,
+            include=include,
+        )
+        response = StreamingHttpResponse(exporter, content_type=exporter.content_type)
+        response["Content-Disposition"] = f'attachment; filename="contacts.{exporter.file_extension}"'
+        return response
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GotoconnectConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.gotoconnect"
+
+    def ready(self):
+        from apps.gotoconnect.signals import tokens  # noqa: F401
@@ -0,0 +1,332 @@
+import base64
+import http.client
+import json
+import queue
+import random
+import socket
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Statuses after which the upstream did not act on the request, so a retry is safe
+RETRY_STATUSES = (429, 503)
+
+
+class GoToConnectError(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "GoToConnect request failed"
+
+    def __init__(self, detail=None, upstream_status: Optional[int] = None, body=None) -> None:
+        self.upstream_status = upstream_status
+        self.body = body
+        super().__init__(detail=detail)
+
+
+class GoToConnectUnavailable(GoToConnectError):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "GoToConnect is unavailable, try again later"
+
+
+class ConnectFailed(OSError):
+    """The connection could not be opened, so nothing was sent"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after failure_threshold consecutive failures. Once reset_timeout
+    seconds have passed a single trial request is let through (half open): it
+    closes the circuit on success and reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # A trial that never reported back (e.g. pool exhausted) expires too
+            if self._trial_running and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_running = True
+            self._trial_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+class ConnectionPool:
+    """
+    Bounded pool of keep-alive connections to one origin.
+
+    Waiting for a free connection is capped by pool_timeout, so a slow upstream
+    can occupy at most maxsize request threads at a time. Freed slots are handed
+    to waiters in arrival order, so a busy thread cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        maxsize: int = 4,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        pool_timeout: float = 2.0,
+    ) -> None:
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._free_slots = maxsize
+        self._waiters: Deque[threading.Event] = deque()
+        self._lock = threading.Lock()
+
+    def acquire_slot(self) -> bool:
+        with self._lock:
+            if self._free_slots and not self._waiters:
+                self._free_slots -= 1
+                return True
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(self.pool_timeout):
+            return True
+        with self._lock:
+            if waiter.is_set():
+                # A slot was handed over just as we timed out
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def release_slot(self) -> None:
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._free_slots += 1
+
+    def new_connection(self) -> http.client.HTTPConnection:
+        connection_class = (
+            http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        )
+        connection = connection_class(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            connection.connect()
+        except OSError as error:
+            raise ConnectFailed(str(error)) from error
+        # The connect timeout only covers the handshake, reads get their own
+        connection.sock.settimeout(self.read_timeout)
+        # http.client writes headers and body separately, Nagle would delay the body
+        connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Returns a connection and whether it is a reused keep-alive one"""
+        if not self.acquire_slot():
+            raise GoToConnectUnavailable("No free GoToConnect connection")
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        try:
+            return self.new_connection(), False
+        except BaseException:
+            self.release_slot()
+            raise
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool) -> None:
+        if reusable:
+            self._idle.put(connection)
+        else:
+            connection.close()
+        self.release_slot()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HttpClient:
+    """JSON over HTTP to one origin with pooling, timeouts, bounded retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        url: str,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        pool: Optional[ConnectionPool] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.pool = pool or ConnectionPool(url)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def request(
+        self, method: str, path: str, body: Optional[str] = None, headers: Optional[Dict] = None
+    ) -> Tuple[int, Dict]:
+        if not self.breaker.allow_request():
+            raise GoToConnectUnavailable()
+        attempt = 0
+        while True:
+            try:
+                upstream_status, data = self.send(method, path, body, headers or {})
+            except ConnectFailed as error:
+                failure = GoToConnectUnavailable(f"GoToConnect connection failed: {error}")
+                retry = True
+            except (OSError, http.client.HTTPException) as error:
+                # Timeouts and broken responses: the request may have been processed
+                self.breaker.record_failure()
+                raise GoToConnectUnavailable(f"GoToConnect request failed: {error}") from error
+            else:
+                if upstream_status < 500 and upstream_status != 429:
+                    # 4xx answers are the caller's problem, not an upstream failure
+                    self.breaker.record_success()
+                    return upstream_status, data
+                failure = GoToConnectUnavailable(upstream_status=upstream_status, body=data)
+                retry = upstream_status in RETRY_STATUSES
+
+            if not retry or attempt >= self.max_retries:
+                self.breaker.record_failure()
+                raise failure
+            attempt += 1
+            # Exponential backoff with full jitter
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def send(self, method: str, path: str, body: Optional[str], headers: Dict) -> Tuple[int, Dict]:
+        connection, reused = self.pool.acquire()
+        reusable = False
+        try:
+            try:
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server closed the idle keep-alive connection, the request never arrived
+                connection.close()
+                connection = self.pool.new_connection()
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+            raw = response.read()
+            reusable = not response.will_close
+        finally:
+            self.pool.release(connection, reusable)
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            data = {"body": raw.decode("utf-8", "replace")}
+        return response.status, data
+
+
+class GoToConnectClient:
+    """GoToConnect OAuth and Calls API"""
+
+    def __init__(self, auth: HttpClient, api: HttpClient) -> None:
+        self.auth = auth
+        self.api = api
+
+    @staticmethod
+    def check(upstream_status: int, data: Dict) -> Dict:
+        if upstream_status >= 400:
+            raise GoToConnectError(
+                f"GoToConnect responded with {upstream_status}",
+                upstream_status=upstream_status,
+                body=data,
+            )
+        return data
+
+    def token_request(self, client_id: str, client_secret: str, params: Dict) -> Dict:
+        # Documentation: https://developer.goto.com/Authentication#tag/Token
+        credentials = base64.b64encode(f"{client_id}:{client_secret}".encode("utf-8")).decode("ascii")
+        headers = {
+            "Authorization": f"Basic {credentials}",
+            "content-type": "application/x-www-form-urlencoded",
+        }
+        return self.check(
+            *self.auth.request("POST", "/oauth/token", urlencode(params), headers)
+        )
+
+    def exchange_code(self, client_id: str, client_secret: str, code: str, redirect_uri: str) -> Dict:
+        params = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": redirect_uri,
+            "client_id": client_id,
+        }
+        return self.token_request(client_id, client_secret, params)
+
+    def create_call(self, access_token: str, line_id: str, dial_string: str) -> Dict:
+        payload = {"dialString": dial_string, "from": {"lineId": line_id}}
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "content-type": "application/json",
+        }
+        return self.check(*self.api.request("POST", "/calls/v2/calls", json.dumps(payload), headers))
+
+
+def build_http_client(url: str) -> HttpClient:
+    options = getattr(settings, "GOTOCONNECT_HTTP", {})
+    pool = ConnectionPool(
+        url,
+        maxsize=options.get("POOL_SIZE", 4),
+        connect_timeout=options.get("CONNECT_TIMEOUT", 3.0),
+        read_timeout=options.get("READ_TIMEOUT", 10.0),
+        pool_timeout=options.get("POOL_TIMEOUT", 2.0),
+    )
+    breaker = CircuitBreaker(
+        failure_threshold=options.get("FAILURE_THRESHOLD", 5),
+        reset_timeout=options.get("RESET_TIMEOUT", 30.0),
+    )
+    return HttpClient(
+        url,
+        max_retries=options.get("MAX_RETRIES", 2),
+        backoff=options.get("BACKOFF", 0.2),
+        pool=pool,
+        breaker=breaker,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_client() -> GoToConnectClient:
+    """Process wide client, so every request thread shares the same pools"""
+    return GoToConnectClient(
+        auth=build_http_client(settings.GOTOCONNECT_AUTH_URL),
+        api=build_http_client(settings.GOTOCONNECT_API_URL),
+    )
@@ -0,0 +1,284 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Deque, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.contacts.caller_id import caller_id_index
+from apps.contacts.models import Contact, ContactTimeline
+from apps.utils.cache import TTLCache
+from apps.utils.phone_numbers import normalize_phone_number
+from apps.utils.response_cache import invalidate_timelines
+
+from .models import GoToConnectConfig
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("ringing", "answered", "hangup")
+
+# webhook token -> tenant id, 0 for unknown tokens
+webhook_tenants = TTLCache(maxsize=10000, ttl=60)
+
+
+def get_options() -> Dict:
+    options = {
+        "REDIS_URL": None,
+        "QUEUE_KEY": "gotoconnect:call-events",
+        "BATCH_SIZE": 500,
+        "MAX_WAIT": 1.0,
+        # Failed batches are retried this many times before their events are dead-lettered
+        "MAX_ATTEMPTS": 5,
+    }
+    options.update(getattr(settings, "GOTOCONNECT_EVENTS", {}))
+    return options
+
+
+def get_webhook_tenant(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    tenant_id = webhook_tenants.get(token)
+    if tenant_id is None:
+        config = GoToConnectConfig.objects.filter(webhook_token=token).values("tenant_id").first()
+        tenant_id = config["tenant_id"] if config else 0
+        webhook_tenants.set(token, tenant_id)
+    return tenant_id or None
+
+
+def parse_duration(value) -> Optional[int]:
+    """Call duration in whole seconds, None when missing or not a number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    if not 0 <= seconds < 10 ** 9:
+        # Also rejects nan and inf
+        return None
+    return int(seconds)
+
+
+def format_duration(seconds: int) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds}s" if minutes else f"{seconds}s"
+
+
+class CallEventProcessor:
+    """
+    Records call events on the timeline of the contact whose associate took part in the call.
+
+    Events are dicts such as
+    {"id": "...", "type": "hangup", "callId": "...", "direction": "inbound",
+     "number": "+15551234567", "duration": 192}
+    where number is the other party of the call. Numbers are matched through
+    the caller ID index, so a batch costs one insert per tenant. Events of
+    unknown numbers are dropped.
+    """
+
+    def parse(self, event) -> Optional[Dict]:
+        if not isinstance(event, dict) or event.get("type") not in EVENT_TYPES:
+            return None
+        number = normalize_phone_number(event.get("number"))
+        external_id = event.get("id") or (
+            f"{event['callId']}:{event['type']}" if event.get("callId") else None
+        )
+        if number is None or external_id is None:
+            return None
+        return {
+            "external_id": str(external_id)[:255],
+            "type": event["type"],
+            "direction": event.get("direction"),
+            "number": number,
+            "duration": parse_duration(event.get("duration")),
+        }
+
+    def get_title(self, event: Dict) -> str:
+        if event["type"] == "ringing":
+            if event["direction"] == "outbound":
+                return f"Outgoing call to {event['number']}"
+            return f"Incoming call from {event['number']}"
+        if event["type"] == "answered":
+            return f"Call with {event['number']} answered"
+        if event["duration"]:
+            return f"Call with {event['number']} ended after {format_duration(event['duration'])}"
+        return f"Call with {event['number']} ended"
+
+    def process(self, envelopes: Iterable[Dict]) -> int:
+        """envelopes are {"tenant_id": ..., "event": ...} as queued by the webhook"""
+        events = defaultdict(list)
+        for envelope in envelopes:
+            event = self.parse(envelope.get("event"))
+            if event is not None:
+                events[envelope["tenant_id"]].append(event)
+        return sum(self.write(tenant_id, tenant_events) for tenant_id, tenant_events in events.items())
+
+    def write(self, tenant_id: int, events: List[Dict]) -> int:
+        contacts = caller_id_index.lookup_contact_ids(tenant_id, {event["number"] for event in events})
+        entries = [
+            ContactTimeline(
+                tenant_id=tenant_id,
+                contact_id=contacts[event["number"]],
+                title=self.get_title(event),
+                external_id=event["external_id"],
+            )
+            for event in events
+            if event["number"] in contacts
+        ]
+        if not entries:
+            return 0
+        contact_ids = {entry.contact_id for entry in entries}
+        with transaction.atomic():
+            # Redelivered events hit the (tenant, external_id) constraint and are skipped
+            ContactTimeline.objects.bulk_create(entries, ignore_conflicts=True)
+            # bulk_create skips the touch_contact signal
+            Contact.objects.filter(id__in=contact_ids).update(updated_on=timezone.now())
+            invalidate_timelines(tenant_id, contact_ids)
+        return len(entries)
+
+
+class LocalEventQueue:
+    """In-process buffer for setups without Redis, drained by a thread of the same process"""
+
+    def __init__(self) -> None:
+        self._events: Deque[Dict] = deque()
+        self._ready = threading.Condition()
+        # Events that kept failing, the most recent ones are kept for inspection
+        self.dead_letters: Deque[Dict] = deque(maxlen=10000)
+
+    def push(self, envelopes: List[Dict]) -> None:
+        with self._ready:
+            self._events.extend(envelopes)
+            self._ready.notify()
+
+    def pop(self, count: int, timeout: float) -> List[Dict]:
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            return [self._events.popleft() for _ in range(min(count, len(self._events)))]
+
+    def requeue(self, envelopes: List[Dict]) -> None:
+        with self._ready:
+            self._events.extendleft(reversed(envelopes))
+            self._ready.notify()
+
+    def dead_letter(self, envelopes: List[Dict]) -> None:
+        self.dead_letters.extend(envelopes)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class RedisEventQueue:
+    """Redis list shared by every web process and worker. Popping several items needs Redis 6.2"""
+
+    def __init__(self, url: str, key: str) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+
+    def push(self, envelopes: List[Dict]) -> None:
+        self.client.rpush(self.key, *[json.dumps(envelope) for envelope in envelopes])
+
+    def pop(self, count: int, timeout: float) -> List[Dict]:
+        first = self.client.blpop(self.key, timeout=timeout)
+        if first is None:
+            return []
+        rest = self.client.lpop(self.key, count - 1) if count > 1 else None
+        return [json.loads(item) for item in [first[1], *(rest or [])]]
+
+    def requeue(self, envelopes: List[Dict]) -> None:
+        self.client.lpush(self.key, *[json.dumps(envelope) for envelope in reversed(envelopes)])
+
+    def dead_letter(self, envelopes: List[Dict]) -> None:
+        self.client.rpush(f"{self.key}:dead", *[json.dumps(envelope) for envelope in envelopes])
+
+    def __len__(self) -> int:
+        return self.client.llen(self.key)
+
+
+class CallEventWorker:
+    """
+    Drains the queue in micro-batches: it waits up to max_wait for the first
+    event, then takes whatever else is queued, up to batch_size, in one go.
+
+    Each tenant's events are written on their own, so a failure only sends
+    that tenant's events back to the queue. Events that failed max_attempts
+    times are moved to the queue's dead letters instead.
+    """
+
+    def __init__(
+        self,
+        queue,
+        processor: Optional[CallEventProcessor] = None,
+        batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        options = get_options()
+        self.queue = queue
+        self.processor = processor or CallEventProcessor()
+        self.batch_size = batch_size or options["BATCH_SIZE"]
+        self.max_wait = max_wait or options["MAX_WAIT"]
+        self.max_attempts = options["MAX_ATTEMPTS"]
+
+    def run_once(self) -> int:
+        envelopes = self.queue.pop(self.batch_size, self.max_wait)
+        if not envelopes:
+            return 0
+        by_tenant = defaultdict(list)
+        for envelope in envelopes:
+            by_tenant[envelope.get("tenant_id")].append(envelope)
+        failed, error = [], None
+        for tenant_envelopes in by_tenant.values():
+            try:
+                self.processor.process(tenant_envelopes)
+            except Exception as exc:
+                failed.extend(tenant_envelopes)
+                error = exc
+        if error is not None:
+            self.retry(failed)
+            raise error
+        return len(envelopes)
+
+    def retry(self, envelopes: List[Dict]) -> None:
+        """Keep the events for the next attempt, redelivery is deduplicated"""
+        retried, dead = [], []
+        for envelope in envelopes:
+            envelope = {**envelope, "attempts": envelope.get("attempts", 0) + 1}
+            (retried if envelope["attempts"] < self.max_attempts else dead).append(envelope)
+        if retried:
+            self.queue.requeue(retried)
+        if dead:
+            logger.error(f"Dead-lettered {len(dead)} GoToConnect call events after {self.max_attempts} attempts")
+            self.queue.dead_letter(dead)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Failed to record GoToConnect call events")
+                stop.wait(self.max_wait)
+
+    def start(self) -> threading.Event:
+        """Run in a daemon thread, returns the event that stops it"""
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(stop,), daemon=True, name="call-events").start()
+        return stop
+
+
+@lru_cache(maxsize=None)
+def get_event_queue():
+    options = get_options()
+    if options["REDIS_URL"]:
+        # Drained by the process_call_events command
+        return RedisEventQueue(options["REDIS_URL"], options["QUEUE_KEY"])
+    queue = LocalEventQueue()
+    CallEventWorker(queue).start()
+    return queue
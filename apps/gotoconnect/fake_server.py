@@ -0,0 +1,125 @@
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs
+
+
+class FakeGoToConnectHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive, like the real API
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "FakeGoToConnectServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.count("requests")
+        with self.server.track_active():
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            if random.random() < self.server.failure_rate:
+                return self.reply(503, {"message": "Service unavailable"})
+            if self.path == "/oauth/token":
+                return self.reply(*self.token(parse_qs(body.decode("utf-8"))))
+            if self.path == "/calls/v2/calls":
+                return self.reply(*self.call(json.loads(body or b"{}")))
+            return self.reply(404, {"message": "Not found"})
+
+    def token(self, form: Dict) -> Tuple[int, Dict]:
+        if not self.headers.get("Authorization", "").startswith("Basic "):
+            return 401, {"error": "invalid_client"}
+        if form.get("grant_type", [None])[0] not in ("authorization_code", "refresh_token"):
+            return 400, {"error": "unsupported_grant_type"}
+        if form.get("refresh_token", [None])[0] == "revoked":
+            return 400, {"error": "invalid_grant"}
+        return 200, {
+            "access_token": uuid.uuid4().hex,
+            "refresh_token": uuid.uuid4().hex,
+            "token_type": "Bearer",
+            "expires_in": self.server.token_lifetime,
+            "principal": "rep@example.com",
+        }
+
+    def call(self, payload: Dict) -> Tuple[int, Dict]:
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return 401, {"message": "Unauthorized"}
+        if not payload.get("dialString") or not payload.get("from", {}).get("lineId"):
+            return 400, {"message": "dialString and from.lineId are required"}
+        return 201, {"id": str(uuid.uuid4()), "dialString": payload["dialString"]}
+
+    def reply(self, status: int, data: Dict) -> None:
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class FakeGoToConnectServer(ThreadingHTTPServer):
+    """
+    Local stand-in for both the GoToConnect OAuth and Calls APIs, for tests and
+    load benchmarks. Latency and a share of 503 failures can be injected, and
+    connections, requests and peak concurrency are counted.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        token_lifetime: int = 3600,
+    ) -> None:
+        super().__init__(address, FakeGoToConnectHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.token_lifetime = token_lifetime
+        self.stats = {"connections": 0, "requests": 0, "active": 0, "peak_active": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @contextmanager
+    def track_active(self):
+        with self._stats_lock:
+            self.stats["active"] += 1
+            self.stats["peak_active"] = max(self.stats["peak_active"], self.stats["active"])
+        try:
+            yield
+        finally:
+            with self._stats_lock:
+                self.stats["active"] -= 1
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that time out and hang up are expected in benchmarks
+        pass
+
+    def start(self) -> "FakeGoToConnectServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
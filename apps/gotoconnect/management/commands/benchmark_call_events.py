@@ -0,0 +1,60 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.contacts.models import ContactAssociate, ContactTimeline
+from apps.gotoconnect.events import EVENT_TYPES, CallEventWorker, LocalEventQueue
+
+
+class Command(BaseCommand):
+    help = "Measure call event ingestion on a tenant's associates, the recorded entries are rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=int, required=True)
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        tenant_id = options["tenant"]
+        numbers = [
+            str(number)
+            for number in ContactAssociate.objects.filter(
+                tenant_id=tenant_id, phone_number__isnull=False
+            ).values_list("phone_number", flat=True)[:1000]
+        ]
+        if not numbers:
+            raise CommandError("Tenant has no associates with phone numbers")
+
+        queue = LocalEventQueue()
+        queue.push(
+            [
+                {
+                    "tenant_id": tenant_id,
+                    "event": {
+                        "id": uuid.uuid4().hex,
+                        "type": random.choice(EVENT_TYPES),
+                        "direction": "inbound",
+                        "number": random.choice(numbers),
+                        "duration": random.randint(1, 600),
+                    },
+                }
+                for _ in range(options["events"])
+            ]
+        )
+        worker = CallEventWorker(queue, batch_size=options["batch_size"], max_wait=0.01)
+
+        with transaction.atomic():
+            before = ContactTimeline.objects.filter(tenant_id=tenant_id).count()
+            started = time.perf_counter()
+            batches = 0
+            while worker.run_once():
+                batches += 1
+            elapsed = time.perf_counter() - started
+            recorded = ContactTimeline.objects.filter(tenant_id=tenant_id).count() - before
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Recorded {recorded} events in {batches} batches in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"{options['events'] / elapsed:.0f} events/s"))
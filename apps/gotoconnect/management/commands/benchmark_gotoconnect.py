@@ -0,0 +1,66 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.gotoconnect.client import (ConnectionPool, GoToConnectClient,
+                                     GoToConnectError, HttpClient)
+from apps.gotoconnect.fake_server import FakeGoToConnectServer
+
+
+class Command(BaseCommand):
+    help = "Initiate calls against a local fake GoToConnect and report latency and upstream concurrency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent request threads")
+        parser.add_argument("--pool-size", type=int, default=4)
+        parser.add_argument("--latency", type=float, default=0.005)
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument("--read-timeout", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        server = FakeGoToConnectServer(
+            latency=options["latency"], failure_rate=options["failure_rate"]
+        ).start()
+        pool = ConnectionPool(
+            server.url, maxsize=options["pool_size"], read_timeout=options["read_timeout"]
+        )
+        http_client = HttpClient(server.url, pool=pool, backoff=0.01)
+        client = GoToConnectClient(auth=http_client, api=http_client)
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def call(number):
+            started = time.perf_counter()
+            try:
+                client.create_call("token", "line-1", f"+1202555{number % 10000:04}")
+            except GoToConnectError as error:
+                with lock:
+                    errors.append(error)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            list(executor.map(call, range(options["calls"])))
+        elapsed = time.perf_counter() - started
+        server.stop()
+        pool.close()
+
+        latencies.sort()
+        percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+        self.stdout.write(f"Calls: {options['calls']} in {elapsed:.2f}s ({options['calls'] / elapsed:.0f}/s)")
+        self.stdout.write(
+            f"Latency ms: p50 {percentile(0.5):.1f}  p95 {percentile(0.95):.1f}  "
+            f"p99 {percentile(0.99):.1f}  max {latencies[-1] * 1000:.1f}  "
+            f"mean {statistics.mean(latencies) * 1000:.1f}"
+        )
+        self.stdout.write(f"Errors: {len(errors)}")
+        self.stdout.write(
+            f"Upstream connections opened: {server.stats['connections']}, "
+            f"peak concurrent upstream requests: {server.stats['peak_active']}"
+        )
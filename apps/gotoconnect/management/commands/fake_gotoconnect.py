@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.gotoconnect.fake_server import FakeGoToConnectServer
+
+
+class Command(BaseCommand):
+    help = "Run a local fake GoToConnect API, point GOTOCONNECT_AUTH_URL and GOTOCONNECT_API_URL at it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of 503 answers")
+
+    def handle(self, *args, **options):
+        server = FakeGoToConnectServer(
+            ("127.0.0.1", options["port"]),
+            latency=options["latency"],
+            failure_rate=options["failure_rate"],
+        )
+        self.stdout.write(f"Fake GoToConnect listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
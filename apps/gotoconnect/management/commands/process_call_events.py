@@ -0,0 +1,25 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.gotoconnect.events import CallEventWorker, get_event_queue
+
+
+class Command(BaseCommand):
+    help = "Record queued GoToConnect call events on contact timelines until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Defaults to GOTOCONNECT_EVENTS['BATCH_SIZE']")
+        parser.add_argument("--max-wait", type=float, help="Defaults to GOTOCONNECT_EVENTS['MAX_WAIT']")
+
+    def handle(self, *args, **options):
+        worker = CallEventWorker(
+            get_event_queue(), batch_size=options["batch_size"], max_wait=options["max_wait"]
+        )
+        stop = threading.Event()
+        # Finish the current batch on shutdown
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        signal.signal(signal.SIGINT, lambda *args: stop.set())
+        self.stdout.write(f"Processing call events in batches of up to {worker.batch_size}")
+        worker.run(stop)
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gotoconnect', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gotoconnectuser',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='expires_at'),
+        ),
+        migrations.AlterField(
+            model_name='gotoconnectuser',
+            name='access_token',
+            field=models.TextField(blank=True, verbose_name='access_token'),
+        ),
+        migrations.AlterField(
+            model_name='gotoconnectuser',
+            name='refresh_token',
+            field=models.TextField(blank=True, verbose_name='refresh_token'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:18
+
+import apps.gotoconnect.models
+from apps.gotoconnect.models import generate_webhook_token
+from django.db import migrations, models
+
+
+def generate_webhook_tokens(apps, schema_editor):
+    # A callable default is evaluated once for existing rows, give each its own token
+    GoToConnectConfig = apps.get_model('gotoconnect', 'GoToConnectConfig')
+    for config in GoToConnectConfig.objects.filter(webhook_token__isnull=True):
+        config.webhook_token = generate_webhook_token()
+        config.save(update_fields=['webhook_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gotoconnect', '0002_token_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gotoconnectconfig',
+            name='webhook_token',
+            field=models.CharField(max_length=64, null=True, verbose_name='webhook_token'),
+        ),
+        migrations.RunPython(generate_webhook_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='gotoconnectconfig',
+            name='webhook_token',
+            field=models.CharField(default=apps.gotoconnect.models.generate_webhook_token, max_length=64, unique=True, verbose_name='webhook_token'),
+        ),
+    ]
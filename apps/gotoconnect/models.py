@@ -1,17 +1,30 @@
+import secrets
+
 from django.db import models
 
 from apps.tenants.models import TenantAwareModel
 
 
+def generate_webhook_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
 class GoToConnectConfig(TenantAwareModel):
     client_id = models.CharField("client_id", max_length=255, blank=True, null=True)
     client_secret = models.CharField(
         "client_secret", max_length=255, blank=True, null=True
     )
+    # Identifies the tenant of call events posted to the webhook
+    webhook_token = models.CharField(
+        "webhook_token", max_length=64, unique=True, default=generate_webhook_token
+    )
 
 
 class GoToConnectUser(TenantAwareModel):
     user_profile = models.OneToOneField("profiles.UserProfile", on_delete=models.CASCADE)
-    access_token = models.CharField("access_token", max_length=255)
-    refresh_token = models.CharField("refresh_token", max_length=255)
+    # GoTo issues JWTs, which outgrow 255 characters
+    access_token = models.TextField("access_token", blank=True)
+    refresh_token = models.TextField("refresh_token", blank=True)
     line_id = models.CharField("line_id", max_length=255, blank=True, null=True)
+    # When access_token expires, refreshed ahead of time by apps.gotoconnect.tasks
+    expires_at = models.DateTimeField("expires_at", blank=True, null=True, db_index=True)
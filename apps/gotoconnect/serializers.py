@@ -7,3 +7,4 @@ class GoToConnectConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = GoToConnectConfig
         fields = "__all__"
+        read_only_fields = ["webhook_token"]
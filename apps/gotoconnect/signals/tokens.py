@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.gotoconnect.models import GoToConnectUser
+from apps.gotoconnect.tokens import token_manager
+
+
+@receiver(post_save, sender=GoToConnectUser)
+@receiver(post_delete, sender=GoToConnectUser)
+def go_to_connect_user_changed(sender, instance: GoToConnectUser, **kwargs):
+    # Other processes drop their in-process copy within LOCAL_TTL
+    token_manager.forget(instance.user_profile_id)
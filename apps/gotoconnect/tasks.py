@@ -0,0 +1,35 @@
+import logging
+
+from celery import group
+from logistics_crm.celery import app
+
+from apps.gotoconnect.tokens import token_manager
+
+logger = logging.getLogger(__name__)
+
+
+@app.on_after_finalize.connect
+def setup_token_refresh(sender, **kwargs):
+    # Runs more often than REFRESH_MARGIN, so every token is refreshed before it expires
+    sender.add_periodic_task(
+        token_manager.options["REFRESH_INTERVAL"],
+        refresh_expiring_tokens.s(),
+    )
+
+
+@app.task
+def refresh_expiring_tokens():
+    # Fan out one task per batch so a slow refresh does not hold up the rest
+    user_profile_ids = list(token_manager.due().values_list("user_profile_id", flat=True))
+    batch_size = token_manager.options["BATCH_SIZE"]
+    group(
+        refresh_tokens.s(user_profile_ids[start:start + batch_size])
+        for start in range(0, len(user_profile_ids), batch_size)
+    ).apply_async()
+
+
+@app.task
+def refresh_tokens(user_profile_ids):
+    refreshed = token_manager.refresh(user_profile_ids)
+    logger.info(f"Refreshed {refreshed} of {len(user_profile_ids)} GoToConnect tokens")
+    return refreshed
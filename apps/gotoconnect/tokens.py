@@ -0,0 +1,200 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from apps.utils.cache import TTLCache
+from routers.db_routers import read_from_primary
+
+from .client import GoToConnectError, GoToConnectUnavailable, get_client
+from .models import GoToConnectConfig, GoToConnectUser
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_ALIAS = "tokens"
+# Assumed lifetime when the token response does not state one
+DEFAULT_EXPIRES_IN = 3600
+# How long one worker may hold a user's refresh before another can start it
+REFRESH_LOCK_TIMEOUT = 60
+
+
+class TokenExpired(GoToConnectUnavailable):
+    default_detail = "GoToConnect session is being refreshed, try again shortly"
+
+
+def get_options() -> Dict:
+    options = {"REFRESH_MARGIN": 900, "REFRESH_INTERVAL": 300, "BATCH_SIZE": 100, "LOCAL_TTL": 30}
+    options.update(getattr(settings, "GOTOCONNECT_TOKENS", {}))
+    return options
+
+
+class TokenManager:
+    """
+    Stores GoToConnect OAuth tokens and serves access tokens without calling GoToConnect.
+
+    Tokens are persisted on GoToConnectUser and cached per user in the shared
+    "tokens" cache until they expire, with a short lived in-process copy in
+    front of it. Refreshing happens ahead of expiry in Celery (see
+    apps.gotoconnect.tasks), never in the request path.
+    """
+
+    def __init__(self, alias: str = TOKEN_CACHE_ALIAS) -> None:
+        self.alias = alias
+        self.options = get_options()
+        self.local = TTLCache(maxsize=10000, ttl=self.options["LOCAL_TTL"])
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def cache_key(self, user_profile_id: int) -> str:
+        return f"gotoconnect:token:{user_profile_id}"
+
+    @staticmethod
+    def is_valid(entry: Optional[Dict]) -> bool:
+        return entry is not None and entry["expires_at"] > time.time()
+
+    @staticmethod
+    def apply(go_to_connect_user: GoToConnectUser, tokens: Dict) -> None:
+        go_to_connect_user.access_token = tokens["access_token"]
+        # Refresh responses may omit it, the current refresh token then stays valid
+        if tokens.get("refresh_token"):
+            go_to_connect_user.refresh_token = tokens["refresh_token"]
+        expires_in = int(tokens.get("expires_in") or DEFAULT_EXPIRES_IN)
+        go_to_connect_user.expires_at = timezone.now() + timedelta(seconds=expires_in)
+
+    def store(self, tenant, user_profile, tokens: Dict) -> GoToConnectUser:
+        """Persist the tokens of an authorization code exchange"""
+        go_to_connect_user = GoToConnectUser.objects.filter(user_profile=user_profile).first()
+        if go_to_connect_user is None:
+            go_to_connect_user = GoToConnectUser(tenant=tenant, user_profile=user_profile)
+        self.apply(go_to_connect_user, tokens)
+        go_to_connect_user.save()
+        self.remember(go_to_connect_user)
+        return go_to_connect_user
+
+    def remember(self, go_to_connect_user: GoToConnectUser) -> Dict:
+        """Cache the user's access token until it expires, returns the cache entry"""
+        expires_at = go_to_connect_user.expires_at
+        entry = {
+            "user_profile_id": go_to_connect_user.user_profile_id,
+            "access_token": go_to_connect_user.access_token,
+            "line_id": go_to_connect_user.line_id,
+            "expires_at": expires_at.timestamp() if expires_at else 0,
+        }
+        timeout = int(entry["expires_at"] - time.time())
+        key = self.cache_key(go_to_connect_user.user_profile_id)
+        if go_to_connect_user.access_token and timeout > 0:
+            self.cache.set(key, entry, timeout=timeout)
+            self.local.set(key, entry)
+        else:
+            self.forget(go_to_connect_user.user_profile_id)
+        return entry
+
+    def forget(self, user_profile_id: int) -> None:
+        key = self.cache_key(user_profile_id)
+        self.local.delete(key)
+        self.cache.delete(key)
+
+    def get_token(self, user_profile_id: int) -> Optional[Dict]:
+        """
+        The user's access token entry, None if they never logged into GoToConnect.
+        An expired entry is returned as is, check it with is_valid().
+        """
+        key = self.cache_key(user_profile_id)
+        entry = self.local.get(key)
+        if self.is_valid(entry):
+            return entry
+        entry = self.cache.get(key)
+        if self.is_valid(entry):
+            self.local.set(key, entry)
+            return entry
+        # Cached for every worker, a replica could still hold an already redeemed token
+        with read_from_primary():
+            go_to_connect_user = GoToConnectUser.objects.filter(user_profile_id=user_profile_id).first()
+        if go_to_connect_user is None:
+            return None
+        return self.remember(go_to_connect_user)
+
+    def due(self) -> QuerySet:
+        """Users whose access token expires within REFRESH_MARGIN and can be refreshed"""
+        refresh_before = timezone.now() + timedelta(seconds=self.options["REFRESH_MARGIN"])
+        return GoToConnectUser.objects.exclude(refresh_token="").filter(
+            Q(expires_at__isnull=True) | Q(expires_at__lte=refresh_before)
+        )
+
+    def refresh_lock_key(self, user_profile_id: int) -> str:
+        return f"{self.cache_key(user_profile_id)}:refresh"
+
+    def refresh(self, user_profile_ids: Iterable[int]) -> int:
+        """Refresh the users' tokens one at a time, returns how many were refreshed"""
+        user_profile_ids = list(user_profile_ids)
+        tenant_ids = GoToConnectUser.objects.filter(user_profile_id__in=user_profile_ids).values("tenant_id")
+        configs = {config.tenant_id: config for config in GoToConnectConfig.objects.filter(tenant_id__in=tenant_ids)}
+        client = get_client()
+        refreshed = 0
+        for user_profile_id in user_profile_ids:
+            # A refresh token is single use, never redeem it twice at once. The
+            # lock only spans this user's exchange, so it cannot expire mid-batch
+            lock_key = self.refresh_lock_key(user_profile_id)
+            if not self.cache.add(lock_key, 1, REFRESH_LOCK_TIMEOUT):
+                continue
+            try:
+                refreshed += self.refresh_user(client, configs, user_profile_id)
+            except GoToConnectUnavailable as error:
+                # The rest of the batch would fail the same way, the next run retries it
+                logger.warning(f"Stopped refreshing GoToConnect tokens: {error}")
+                break
+            finally:
+                self.cache.delete(lock_key)
+        return refreshed
+
+    def refresh_user(self, client, configs: Dict, user_profile_id: int) -> bool:
+        # Read under the lock: another worker may have refreshed it since it was found due
+        user = self.due().filter(user_profile_id=user_profile_id).first()
+        if user is None:
+            return False
+        config = configs.get(user.tenant_id)
+        if config is None or not config.client_id:
+            return False
+        sent = user.refresh_token
+        params = {"grant_type": "refresh_token", "refresh_token": sent}
+        try:
+            tokens = client.token_request(config.client_id, config.client_secret, params)
+        except GoToConnectUnavailable:
+            # Stops the batch in refresh()
+            raise
+        except GoToConnectError as error:
+            if error.upstream_status == 400 and (error.body or {}).get("error") == "invalid_grant":
+                # Revoked or expired refresh token, the user has to log in again
+                user.access_token = ""
+                user.refresh_token = ""
+                user.expires_at = None
+                self.save_tokens(user, sent)
+            else:
+                logger.warning(f"Could not refresh GoToConnect token of user {user.user_profile_id}: {error}")
+            return False
+        self.apply(user, tokens)
+        return self.save_tokens(user, sent)
+
+    def save_tokens(self, user: GoToConnectUser, sent: str) -> bool:
+        """
+        Write the user's tokens only if the row still holds the refresh token
+        that was sent, so a login or refresh that happened meanwhile is kept.
+        """
+        saved = GoToConnectUser.objects.filter(id=user.id, refresh_token=sent).update(
+            access_token=user.access_token, refresh_token=user.refresh_token, expires_at=user.expires_at
+        )
+        if saved:
+            self.remember(user)
+        else:
+            self.forget(user.user_profile_id)
+        return bool(saved)
+
+
+token_manager = TokenManager()
@@ -1,16 +1,18 @@
-import base64
-import http.client
-import json
-
 from django.conf import settings
 from django.shortcuts import redirect
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import AllowAny
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.gotoconnect.client import get_client
+from apps.gotoconnect.events import get_event_queue, get_webhook_tenant
 from apps.gotoconnect.models import GoToConnectConfig, GoToConnectUser
+from apps.gotoconnect.tasks import refresh_tokens
+from apps.gotoconnect.tokens import TokenExpired, token_manager
+from apps.profiles.authentication import CachedTokenAuthentication
 from apps.profiles.models import UserProfile
 from apps.tenants.models import Tenant
 from apps.utils.tenants import get_tenant_from_request
@@ -18,10 +20,11 @@ from apps.utils.tenants import get_tenant_from_request
 from .serializers import GoToConnectConfigSerializer
 
 GO_TO_CONNECT_REDIRECT_URL = f"{settings.BASE_URL}/api/v1/gotoconnect/auth"
+GO_TO_CONNECT_WEBHOOK_URL = f"{settings.BASE_URL}/api/v1/gotoconnect/events"
 
 
 class GoToConnectView(viewsets.ViewSet):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     queryset = GoToConnectUser.objects.all()
 
     def get_queryset(self):
@@ -39,10 +42,15 @@ class GoToConnectView(viewsets.ViewSet):
         serializer.is_valid(raise_exception=True)
         config = GoToConnectConfig.objects.filter(tenant=tenant).first()
         if config is None:
-            serializer.save()
+            config = serializer.save()
         else:
-            serializer.update(instance=config, validated_data=serializer.validated_data)
-        return Response({"message": {"Added integration to GoToConnect"}})
+            config = serializer.update(instance=config, validated_data=serializer.validated_data)
+        return Response(
+            {
+                "message": {"Added integration to GoToConnect"},
+                "webhook_url": f"{GO_TO_CONNECT_WEBHOOK_URL}/?token={config.webhook_token}",
+            }
+        )
 
     @action(detail=False)
     def login(self, request: Request, pk=None):
@@ -54,50 +62,58 @@ class GoToConnectView(viewsets.ViewSet):
             )
         # Documentation: https://developer.goto.com/Authentication#tag/Authorize/paths/~1authorize/get
         login_request = f"oauth/authorize?response_type=code&client_id={client_id}&redirect_uri={GO_TO_CONNECT_REDIRECT_URL}"
-        return redirect(f"https://authentication.logmeininc.com/{login_request}")
+        return redirect(f"{settings.GOTOCONNECT_AUTH_URL}/{login_request}")
 
     @action(detail=False)
     def auth(self, request: Request, pk=None):
         tenant: Tenant = get_tenant_from_request(request)
-        client_id = GoToConnectConfig.objects.get(tenant=tenant).client_id
-        client_secret = GoToConnectConfig.objects.get(tenant=tenant).client_secret
-        auth_code = request.query_params.get("code")
-        auth_header = base64.b64encode(f"{client_id}:{client_secret}".encode("ascii"))
-
-        conn = http.client.HTTPSConnection("authentication.logmeininc.com")
-        payload = f"grant_type=authorization_code&code={auth_code}&redirect_uri={GO_TO_CONNECT_REDIRECT_URL}&client_id={client_id}"
-
-        headers = {
-            "Authorization": auth_header,
-            "content-type": "application/x-www-form-urlencoded",
-        }
-
-        conn.request("POST", "/oauth/token", payload, headers)
-
-        res = conn.getresponse()
-        data = res.read().decode("utf-8")
-        json_data = json.loads(data)
-        return Response(json_data)
+        config: GoToConnectConfig = GoToConnectConfig.objects.get(tenant=tenant)
+        tokens = get_client().exchange_code(
+            client_id=config.client_id,
+            client_secret=config.client_secret,
+            code=request.query_params.get("code"),
+            redirect_uri=GO_TO_CONNECT_REDIRECT_URL,
+        )
+        go_to_connect_user = token_manager.store(tenant, request.user, tokens)
+        return Response(
+            {
+                "message": "Logged into GoToConnect",
+                "expires_at": go_to_connect_user.expires_at,
+            }
+        )
 
     @action(detail=False, url_path="call")
     def initiate_call(self, request: Request, pk=None):
 
         call_to = request.query_params.get("call_to")
         user: UserProfile = request.user
-        go_to_connect_user: GoToConnectUser = GoToConnectUser.objects.filter(
-            user=user
-        ).first()
-        if go_to_connect_user is None:
+        token = token_manager.get_token(user.id)
+        if token is None or not token["access_token"]:
             return Response({"message": "User has not logged into GoToConnect"})
-        payload = {
-            "dialString": call_to,
-            "from": {"lineId": go_to_connect_user.line_id},
-        }
-        payload_str = json.dumps(payload)
-        headers = {"content-type": "application/json"}
-
-        conn = http.client.HTTPSConnection("api.jive.com")
-        conn.request("POST", "/calls/v2/calls", payload_str, headers)
-        res = conn.getresponse()
-        data = res.read()
-        return Response(json.loads(data))
+        if not token_manager.is_valid(token):
+            # The scheduled refresh missed it, never exchange tokens in the request path
+            refresh_tokens.delay([user.id])
+            raise TokenExpired()
+        call = get_client().create_call(
+            access_token=token["access_token"],
+            line_id=token["line_id"],
+            dial_string=call_to,
+        )
+        return Response(call)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        authentication_classes=(),
+        permission_classes=(AllowAny,),
+    )
+    def events(self, request: Request, pk=None):
+        """Call event webhook, events are queued and recorded on contact timelines in batches"""
+        tenant_id = get_webhook_tenant(request.query_params.get("token"))
+        if tenant_id is None:
+            raise PermissionDenied("Invalid webhook token")
+        events = request.data if isinstance(request.data, list) else [request.data]
+        if not all(isinstance(event, dict) for event in events):
+            raise ValidationError("Expected an event object or a list of them")
+        get_event_queue().push([{"tenant_id": tenant_id, "event": event} for event in events])
+        return Response(status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxStatus(models.TextChoices):
+    QUEUED = "QUEUED", _("Queued")
+    SENDING = "SENDING", _("Sending")
+    SENT = "SENT", _("Sent")
+    FAILED = "FAILED", _("Failed")
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be sent, or sent, by apps.outbox.sender"""
+
+    to_email = models.EmailField("to_email", max_length=255)
+    subject = models.CharField("subject", max_length=255)
+    body = models.TextField("body")
+    status = models.CharField(
+        choices=OutboxStatus.choices, max_length=20, default=OutboxStatus.QUEUED
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+    sent_on = models.DateTimeField(null=True)
+
+    # Delivery Info
+    attempts = models.IntegerField(default=0)
+    # While SENDING, when the claim expires and another run may take the message over
+    next_attempt_on = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # The sender's batch query: queued messages that are due, oldest first
+            models.Index(fields=["status", "next_attempt_on", "id"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"<{self.to_email} <{self.subject}> <{self.status}>"
@@ -0,0 +1,161 @@
+import logging
+import random
+import smtplib
+import socket
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_FIELDS = ["status", "sent_on", "attempts", "next_attempt_on", "last_error"]
+
+
+def get_options() -> Dict:
+    options = {
+        "BATCH_SIZE": 100,
+        "MAX_BATCHES": 50,
+        "MAX_ATTEMPTS": 5,
+        "RETRY_BACKOFF": 30,
+        "MAX_BACKOFF": 3600,
+        "SEND_INTERVAL": 60,
+        "LEASE_SECONDS": 600,
+    }
+    options.update(getattr(settings, "EMAIL_OUTBOX", {}))
+    return options
+
+
+class OutboxSender:
+    """
+    Sends due outbox emails in batches over one SMTP connection.
+
+    A batch is claimed in a short transaction with SELECT ... FOR UPDATE SKIP
+    LOCKED and marked SENDING for LEASE_SECONDS, so several workers can drain
+    the outbox at once without sending a message twice. It is sent outside of
+    any transaction and the results are written in a second one. Messages of a
+    run that died while sending are taken over once their lease expires, so
+    they may be sent twice but are never lost.
+
+    Failed messages are retried with exponential backoff and jitter until
+    MAX_ATTEMPTS, permanent (5xx) rejections are not retried. Connection failures
+    reschedule the rest of the batch and end the run.
+    """
+
+    def __init__(self, batch_size: int = None, max_batches: int = None) -> None:
+        self.options = get_options()
+        self.batch_size = batch_size or self.options["BATCH_SIZE"]
+        self.max_batches = max_batches or self.options["MAX_BATCHES"]
+
+    def get_backoff(self, attempts: int) -> timedelta:
+        delay = min(self.options["RETRY_BACKOFF"] * 2 ** (attempts - 1), self.options["MAX_BACKOFF"])
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def claim_batch(self) -> List[OutboxEmail]:
+        now = timezone.now()
+        with transaction.atomic():
+            queryset = OutboxEmail.objects.filter(
+                status__in=[OutboxStatus.QUEUED, OutboxStatus.SENDING], next_attempt_on__lte=now
+            ).order_by("next_attempt_on", "id")
+            if db_connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            batch = list(queryset[: self.batch_size])
+            lease_until = now + timedelta(seconds=self.options["LEASE_SECONDS"])
+            OutboxEmail.objects.filter(id__in=[email.id for email in batch]).update(
+                status=OutboxStatus.SENDING, next_attempt_on=lease_until
+            )
+        for email in batch:
+            email.status = OutboxStatus.SENDING
+            email.next_attempt_on = lease_until
+        return batch
+
+    def send(self) -> int:
+        """Send every due message, up to max_batches batches. Returns the number sent"""
+        sent = 0
+        mail_connection = get_connection(fail_silently=False)
+        try:
+            for _ in range(self.max_batches):
+                batch = self.claim_batch()
+                if not batch:
+                    break
+                try:
+                    batch_sent, connection_lost = self.send_batch(mail_connection, batch)
+                finally:
+                    # Also releases the unsent rest of a batch interrupted by an error
+                    for email in batch:
+                        if email.status == OutboxStatus.SENDING:
+                            email.status = OutboxStatus.QUEUED
+                            email.next_attempt_on = timezone.now()
+                    OutboxEmail.objects.bulk_update(batch, DELIVERY_FIELDS)
+                sent += batch_sent
+                if connection_lost:
+                    # The rest of the batch was rescheduled, the next run reconnects
+                    break
+        finally:
+            mail_connection.close()
+        return sent
+
+    def send_batch(self, mail_connection, batch: List[OutboxEmail]) -> Tuple[int, bool]:
+        """Returns the number of messages sent and whether the SMTP connection was lost"""
+        try:
+            # Opened explicitly: the backend closes connections it opens itself after each call
+            mail_connection.open()
+        except (smtplib.SMTPException, OSError) as error:
+            self.reschedule(batch, error)
+            return 0, True
+
+        sent = 0
+        for position, email in enumerate(batch):
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                to=[email.to_email],
+                from_email=settings.EMAIL_HOST_USER,
+                connection=mail_connection,
+            )
+            try:
+                mail_connection.send_messages([message])
+            except smtplib.SMTPRecipientsRefused as error:
+                self.record_failure(email, error, retry=False)
+            except smtplib.SMTPResponseException as error:
+                # 5xx replies are permanent, 4xx ones temporary
+                self.record_failure(email, error, retry=error.smtp_code < 500)
+            except (smtplib.SMTPServerDisconnected, socket.timeout, ConnectionError) as error:
+                # The message may be what broke the connection, so it uses up an attempt
+                self.record_failure(email, error, retry=True)
+                # Every remaining message would fail the same way
+                self.reschedule(batch[position + 1:], error)
+                return sent, True
+            except Exception as error:
+                self.record_failure(email, error, retry=True)
+            else:
+                email.status = OutboxStatus.SENT
+                email.sent_on = timezone.now()
+                email.attempts += 1
+                email.last_error = ""
+                sent += 1
+        return sent, False
+
+    def record_failure(self, email: OutboxEmail, error: Exception, retry: bool) -> None:
+        email.attempts += 1
+        email.last_error = str(error)[:1000]
+        if retry and email.attempts < self.options["MAX_ATTEMPTS"]:
+            email.status = OutboxStatus.QUEUED
+            email.next_attempt_on = timezone.now() + self.get_backoff(email.attempts)
+        else:
+            email.status = OutboxStatus.FAILED
+            logger.error(f"Giving up on email {email.id} to {email.to_email}: {error}")
+
+    def reschedule(self, emails: List[OutboxEmail], error: Exception) -> None:
+        """Retry later without using up attempts, the mail server rather than the messages failed"""
+        logger.warning(f"SMTP connection failed, rescheduled {len(emails)} emails: {error}")
+        for email in emails:
+            email.status = OutboxStatus.QUEUED
+            email.last_error = str(error)[:1000]
+            email.next_attempt_on = timezone.now() + self.get_backoff(max(email.attempts, 1))
@@ -0,0 +1,39 @@
+import logging
+
+from django.core.cache import cache
+from logistics_crm.celery import app
+
+from apps.outbox.sender import OutboxSender, get_options
+
+logger = logging.getLogger(__name__)
+
+# Emails queued by a process within this many seconds are sent by one run
+SCHEDULE_WINDOW = 1
+SCHEDULED_KEY = "outbox:scheduled"
+
+
+@app.on_after_finalize.connect
+def setup_outbox_retries(sender, **kwargs):
+    # Picks up retries whose backoff has passed and anything a crashed run left queued
+    sender.add_periodic_task(
+        get_options()["SEND_INTERVAL"],
+        send_outbox.s(),
+    )
+
+
+def schedule_send() -> None:
+    if cache.add(SCHEDULED_KEY, 1, timeout=SCHEDULE_WINDOW):
+        # Runs once the window has closed, so it finds the whole burst queued
+        send_outbox.apply_async(countdown=SCHEDULE_WINDOW)
+
+
+@app.task
+def send_outbox():
+    sender = OutboxSender()
+    sent = sender.send()
+    if sent:
+        logger.info(f"Sent {sent} emails")
+    if sent >= sender.batch_size * sender.max_batches:
+        # Hit the per-run limit, carry on with the backlog in a new run
+        send_outbox.delay()
+    return sent
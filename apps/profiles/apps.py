@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ProfilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.profiles'
+
+    def ready(self):
+        from apps.profiles.signals import (auth_cache,  # noqa: F401
+                                           hierarchy, reset_password,
+                                           response_cache)
@@ -0,0 +1,56 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from apps.utils.cache import TTLCache
+
+# token key -> Token with user, user.tenant and user.role already loaded
+token_cache = TTLCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves token -> user + tenant + role in one joined
+    query and keeps the result in a short-lived in-process cache.
+
+    Entries are invalidated by the signals in apps.profiles.signals.auth_cache when
+    the token, user, tenant or role changes; the TTL bounds staleness in other
+    processes. Every request gets its own copy of the cached user.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related(
+                    "user", "user__tenant", "user__role"
+                ).get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            token_cache.set(key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        # Views mutate the user (counters, permission caches), never share it
+        user = copy.copy(token.user)
+        return (user, token)
+
+
+def invalidate_user(user_id: int) -> None:
+    token_cache.delete_where(lambda token: token.user_id == user_id)
+
+
+def invalidate_tenant(tenant_id: int) -> None:
+    token_cache.delete_where(lambda token: token.user.tenant_id == tenant_id)
+
+
+def invalidate_role(role_id: int) -> None:
+    token_cache.delete_where(lambda token: token.user.role_id == role_id)
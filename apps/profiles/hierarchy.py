@@ -0,0 +1,102 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.tenants.models import Tenant
+
+from .models import UserHierarchy, UserProfile
+
+
+class ManagerCycle(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+
+    def __init__(self, detail="A user cannot be managed by someone in their own team") -> None:
+        self._detail = detail
+        super().__init__(detail=self._detail)
+
+
+def add_user(user: UserProfile) -> None:
+    """The depth 0 link of a new user, who starts without a manager"""
+    UserHierarchy.objects.get_or_create(
+        tenant_id=user.tenant_id, ancestor_id=user.id, descendant_id=user.id
+    )
+
+
+def team_ids(manager_id: int, include_self: bool = True) -> QuerySet:
+    """Ids of everyone under the manager at any depth, for use as an id__in subquery"""
+    links = UserHierarchy.objects.filter(ancestor_id=manager_id)
+    if not include_self:
+        links = links.filter(depth__gt=0)
+    return links.values("descendant_id")
+
+
+def team_members(manager_id: int, include_self: bool = True) -> QuerySet:
+    """Everyone under the manager at any depth, one join with the closure table"""
+    members = UserProfile.objects.filter(ancestor_links__ancestor_id=manager_id)
+    if not include_self:
+        members = members.filter(ancestor_links__depth__gt=0)
+    return members
+
+
+def is_in_team(user_id: int, manager_id: int) -> bool:
+    """Whether the user is the manager or anywhere under them"""
+    return UserHierarchy.objects.filter(ancestor_id=manager_id, descendant_id=user_id).exists()
+
+
+def set_manager(user: UserProfile, manager: Optional[UserProfile]) -> None:
+    """Assign the user, with their team, to the manager, or to nobody"""
+    with transaction.atomic():
+        move_subtree(user, manager.id if manager is not None else None)
+        user.manager = manager
+        user.save(update_fields=["manager", "updated_at"])
+
+
+def sync_manager(user: UserProfile) -> None:
+    """Follow a manager change saved without set_manager, e.g. from the admin"""
+    current = UserHierarchy.objects.filter(descendant_id=user.id, depth=1).values_list("ancestor_id", flat=True).first()
+    if current != user.manager_id:
+        move_subtree(user, user.manager_id)
+
+
+def move_subtree(user: UserProfile, manager_id: Optional[int]) -> None:
+    """
+    Move the user, with everyone under them, below the manager or to the top
+    when manager_id is None, rewriting the closure rows of the moved subtree.
+
+    Hierarchy changes of a tenant are serialised on the tenant row, so two
+    concurrent moves cannot form a cycle between them.
+    """
+    with transaction.atomic():
+        Tenant.objects.select_for_update().filter(id=user.tenant_id).first()
+        add_user(user)
+        if manager_id is not None and is_in_team(manager_id, user.id):
+            raise ManagerCycle()
+
+        subtree = list(
+            UserHierarchy.objects.filter(ancestor_id=user.id).values_list("descendant_id", "depth")
+        )
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        # Links from the old managers into the subtree, links inside it are kept
+        UserHierarchy.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+        if manager_id is not None:
+            ancestors = UserHierarchy.objects.filter(descendant_id=manager_id).values_list(
+                "ancestor_id", "depth"
+            )
+            UserHierarchy.objects.bulk_create(
+                [
+                    UserHierarchy(
+                        tenant_id=user.tenant_id,
+                        ancestor_id=ancestor_id,
+                        descendant_id=descendant_id,
+                        depth=ancestor_depth + descendant_depth + 1,
+                    )
+                    for ancestor_id, ancestor_depth in ancestors
+                    for descendant_id, descendant_depth in subtree
+                ],
+                batch_size=1000,
+            )
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.6 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0008_usernote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usernote',
+            index=models.Index(fields=['user', '-created_on', '-id'], name='profiles_us_user_id_156c22_idx'),
+        ),
+    ]
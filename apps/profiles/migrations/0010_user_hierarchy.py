@@ -0,0 +1,52 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_user_hierarchy(apps, schema_editor):
+    UserProfile = apps.get_model('profiles', 'UserProfile')
+    UserHierarchy = apps.get_model('profiles', 'UserHierarchy')
+    users = {user_id: (tenant_id, manager_id) for user_id, tenant_id, manager_id in UserProfile.objects.values_list('id', 'tenant_id', 'manager_id')}
+    links = []
+    for user_id, (tenant_id, manager_id) in users.items():
+        links.append(UserHierarchy(tenant_id=tenant_id, ancestor_id=user_id, descendant_id=user_id, depth=0))
+        depth, seen = 1, {user_id}
+        # seen stops at cycles, which the manager FK alone does not prevent
+        while manager_id is not None and manager_id not in seen:
+            links.append(UserHierarchy(tenant_id=tenant_id, ancestor_id=manager_id, descendant_id=user_id, depth=depth))
+            seen.add(manager_id)
+            manager_id = users[manager_id][1]
+            depth += 1
+    UserHierarchy.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_archive_after_days'),
+        ('profiles', '0009_usernote_profiles_us_user_id_156c22_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.IntegerField(default=0)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tenants.tenant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='userhierarchy',
+            index=models.Index(fields=['descendant', 'depth'], name='profiles_us_descend_dafca2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userhierarchy',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_user_hierarchy_link'),
+        ),
+        migrations.RunPython(build_user_hierarchy, migrations.RunPython.noop),
+    ]
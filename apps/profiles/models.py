@@ -46,6 +46,8 @@ class UserProfile(AbstractBaseUser, TenantAwareModel, PermissionsMixin):
     role = models.ForeignKey("roles.Role", on_delete=models.DO_NOTHING, null=True)
     manager = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, related_name="manager_of")
 
+    COUNTER_FIELDS = ("total_contacts_locked", "total_customers")
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["tenant", "first_name", "last_name"]
 
@@ -57,8 +59,40 @@ class UserProfile(AbstractBaseUser, TenantAwareModel, PermissionsMixin):
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name} <{self.email}>"
 
+    def save(self, *args, **kwargs):
+        # Counters are maintained with F() updates (apps.contacts.counters), so a
+        # full-row save of a stale instance must not overwrite them
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class UserNote(TenantAwareModel):
     user = models.ForeignKey("profiles.UserProfile", on_delete=models.CASCADE, related_name="notes")
     created_on = models.DateTimeField(auto_now_add=True)
     note = models.TextField(null=False, blank=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-created_on", "-id"])]
+
+
+class UserHierarchy(TenantAwareModel):
+    """
+    Closure table of the manager hierarchy: one row per user and each of their
+    managers up the chain, plus a depth 0 row linking every user to themselves.
+    Maintained by apps.profiles.hierarchy.
+    """
+
+    ancestor = models.ForeignKey("profiles.UserProfile", on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey("profiles.UserProfile", on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="unique_user_hierarchy_link"),
+        ]
+        indexes = [models.Index(fields=["descendant", "depth"])]
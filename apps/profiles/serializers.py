@@ -10,7 +10,8 @@ from .models import UserNote, UserProfile
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
-        read_only_fields = ["tenant", "role"]
+        # manager changes go through assign_manager, which maintains UserHierarchy
+        read_only_fields = ["tenant", "role", "manager", *UserProfile.COUNTER_FIELDS]
         exclude = ["password"]
 
 
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from apps.profiles.authentication import (invalidate_role, invalidate_tenant,
+                                          invalidate_user, token_cache)
+from apps.profiles.models import UserProfile
+from apps.roles.models import Role
+from apps.tenants.models import Tenant
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance: Token, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_changed(sender, instance: UserProfile, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def tenant_changed(sender, instance: Tenant, **kwargs):
+    invalidate_tenant(instance.id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance: Role, **kwargs):
+    invalidate_role(instance.id)
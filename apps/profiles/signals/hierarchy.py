@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.profiles.hierarchy import add_user, set_manager, sync_manager
+from apps.profiles.models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+def update_hierarchy(sender, instance: UserProfile, created: bool, update_fields=None, **kwargs):
+    if created:
+        add_user(instance)
+        if instance.manager_id is None:
+            return
+    if update_fields is None or "manager" in update_fields:
+        sync_manager(instance)
+
+
+@receiver(pre_delete, sender=UserProfile)
+def detach_direct_reports(sender, instance: UserProfile, **kwargs):
+    # manager is SET_NULL, their teams would otherwise stay linked to the managers above
+    for report in UserProfile.objects.filter(manager=instance):
+        set_manager(report, None)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.profiles.models import UserProfile
+from apps.utils.response_cache import USERS, invalidate_responses
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_changed(sender, instance: UserProfile, **kwargs):
+    invalidate_responses(instance.tenant_id, USERS)
@@ -1,6 +1,5 @@
 from django.contrib.auth.models import Group
 from rest_framework import status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -8,9 +7,13 @@ from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 from apps.profiles import serializers
+from apps.profiles.authentication import CachedTokenAuthentication
+from apps.profiles.hierarchy import is_in_team, set_manager, team_ids
 from apps.profiles.models import UserNote, UserProfile, UserProfileManager
 from apps.roles.models import (DEFAULT_MANAGER_ROLE_NAME,
                                DEFAULT_SALES_ROLE_NAME, Role)
+from apps.utils.pagination import CreatedOnKeysetPagination, paginate_response
+from apps.utils.response_cache import USERS, CachedResponseMixin
 from apps.utils.serializers import GetSerializerMixin
 
 NOT_FOUND_RESPONSE = Response({"message": "Not Found"}, status=status.HTTP_404_NOT_FOUND)
@@ -20,13 +23,13 @@ class UserLoginApiView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class UserProfileViewSet(viewsets.ModelViewSet, GetSerializerMixin):
+class UserProfileViewSet(CachedResponseMixin, viewsets.ModelViewSet, GetSerializerMixin):
     serializer_class = serializers.UserProfileSerializer
     serializer_action_classes = {
         "create": serializers.CreateUserProfileSerializer,
     }
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     queryset = UserProfile.objects.all()
     
     def create_user(self, email, first_name, last_name, password=None):
@@ -49,8 +52,14 @@ class UserProfileViewSet(viewsets.ModelViewSet, GetSerializerMixin):
             return NOT_FOUND_RESPONSE
         
         queryset = self.filter_queryset(self.get_queryset())
+        scope = "tenant"
         if not request.user.is_staff and request.user.role.name == f"{request.user.tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}":
-            queryset = queryset.filter(manager=request.user)
+            # Everyone under the manager, at any depth of the org chart
+            queryset = queryset.filter(id__in=team_ids(request.user.id, include_self=False))
+            scope = f"user:{request.user.id}"
+        return self.cached_response(lambda: self.render_list(queryset), [USERS], scope=scope)
+
+    def render_list(self, queryset):
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -63,7 +72,7 @@ class UserProfileViewSet(viewsets.ModelViewSet, GetSerializerMixin):
         user_to_get: UserProfile = self.get_object()
         if request.user.has_perm("profiles.view_userprofile"):
             return super().retrieve(request, *args, **kwargs)
-        if user_to_get.id == request.user.id or request.user == user_to_get.manager:
+        if is_in_team(user_to_get.id, request.user.id):
             return super().retrieve(request, *args, **kwargs)
         return NOT_FOUND_RESPONSE
     
@@ -116,33 +125,32 @@ class UserProfileViewSet(viewsets.ModelViewSet, GetSerializerMixin):
     def assign_manager(self, request, pk=None):
         if not request.user.has_perm("profiles.change_userprofile"):
             return NOT_FOUND_RESPONSE
-        manager: UserProfile = UserProfile.objects.get(id=request.data["manager_id"])
-        if manager.role.name != f"{request.user.tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}":
+        manager: UserProfile = self.get_queryset().filter(id=request.data["manager_id"]).first()
+        if manager is None:
+            return NOT_FOUND_RESPONSE
+        if manager.role is None or manager.role.name != f"{request.user.tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}":
             return Response({"message": "Only users with Manager role can be assigned as managers"}, status=status.HTTP_400_BAD_REQUEST)
         user: UserProfile = self.get_object()
-        if user.role.name != f"{request.user.tenant.id}_{DEFAULT_SALES_ROLE_NAME}":
-            return Response({"message": "Managers can only be assigned to sales users"}, status=status.HTTP_400_BAD_REQUEST)
-        user.manager = manager
-        user.save()
+        # Managers may report to other managers, e.g. directors over team leads
+        team_roles = [f"{request.user.tenant.id}_{name}" for name in (DEFAULT_SALES_ROLE_NAME, DEFAULT_MANAGER_ROLE_NAME)]
+        if user.role is None or user.role.name not in team_roles:
+            return Response({"message": "Managers can only be assigned to sales users and managers"}, status=status.HTTP_400_BAD_REQUEST)
+        set_manager(user, manager)
         return Response({"message": "Assigned to a manager"}, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=["get"])
     def get_notes(self, request, pk=None):
         user: UserProfile = self.get_object()
-        if not request.user.is_staff and request.user != user and request.user != user.manager:
+        if not request.user.is_staff and not is_in_team(user.id, request.user.id):
             return NOT_FOUND_RESPONSE
-        queryset = user.notes.all().order_by("-created_on")
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = serializers.UserNoteSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = serializers.UserNoteSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return paginate_response(
+            self, user.notes.all(), serializers.UserNoteSerializer, CreatedOnKeysetPagination
+        )
 
     @action(detail=True, methods=["post"])
     def add_note(self, request, pk=None):
         user: UserProfile = self.get_object()
-        if not request.user.is_staff and request.user != user and request.user != user.manager:
+        if not request.user.is_staff and not is_in_team(user.id, request.user.id):
             return NOT_FOUND_RESPONSE
         note: UserNote = UserNote(tenant=user.tenant, user=user, note=request.data["note"])
         note.save()
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RolesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.roles'
+
+    def ready(self):
+        from apps.roles import registry
+        from apps.roles.signals import (permission_cache,  # noqa: F401
+                                        permission_registry, response_cache)
+
+        # Every CRM model is registered by now, see PermissionRegistry.build
+        registry.permission_registry.build()
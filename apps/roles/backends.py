@@ -0,0 +1,110 @@
+import time
+from typing import FrozenSet
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.db import transaction
+
+from apps.utils.cache import TTLCache
+from apps.utils.response_cache import response_cache
+from routers.db_routers import read_from_primary
+
+PERMISSION_CACHE_TTL = getattr(settings, "PERMISSION_CACHE_TTL", 300)
+
+# Entries are keyed on (generation, id), see get_permission_generation
+# group id -> permission strings granted to the group (i.e. to a Role)
+group_permission_cache = TTLCache(maxsize=10000, ttl=PERMISSION_CACHE_TTL)
+# user id -> ids of the groups the user belongs to
+user_group_cache = TTLCache(maxsize=100000, ttl=PERMISSION_CACHE_TTL)
+# user id -> permission strings granted directly to the user
+user_permission_cache = TTLCache(maxsize=100000, ttl=PERMISSION_CACHE_TTL)
+ALL_PERMISSIONS_KEY = "__all__"
+PERMISSION_GENERATION_KEY = "generation:permissions"
+
+
+def get_permission_generation() -> str:
+    """
+    The current generation of all permission sets, kept in the shared response
+    cache so a change made by any process orphans the entries of every process.
+    """
+    cache = response_cache.cache
+    generation = cache.get(PERMISSION_GENERATION_KEY)
+    if generation is None:
+        cache.add(PERMISSION_GENERATION_KEY, str(time.time_ns()), timeout=None)
+        generation = cache.get(PERMISSION_GENERATION_KEY)
+    return str(generation)
+
+
+def invalidate_permissions() -> None:
+    """Start a new generation once the current transaction commits"""
+    transaction.on_commit(lambda: response_cache.cache.delete(PERMISSION_GENERATION_KEY))
+
+
+def _as_perm_strings(permissions) -> FrozenSet[str]:
+    perms = permissions.values_list("content_type__app_label", "codename").order_by()
+    return frozenset(f"{app_label}.{codename}" for app_label, codename in perms)
+
+
+def get_group_permissions(group_id, generation: str) -> FrozenSet[str]:
+    perms = group_permission_cache.get((generation, group_id))
+    if perms is None:
+        if group_id == ALL_PERMISSIONS_KEY:
+            perms = _as_perm_strings(Permission.objects.all())
+        else:
+            perms = _as_perm_strings(Permission.objects.filter(group__id=group_id))
+        group_permission_cache.set((generation, group_id), perms)
+    return perms
+
+
+def get_user_group_ids(user_obj, generation: str) -> FrozenSet[int]:
+    group_ids = user_group_cache.get((generation, user_obj.pk))
+    if group_ids is None:
+        group_ids = frozenset(user_obj.groups.values_list("id", flat=True))
+        user_group_cache.set((generation, user_obj.pk), group_ids)
+    return group_ids
+
+
+def get_user_permissions(user_obj, generation: str) -> FrozenSet[str]:
+    perms = user_permission_cache.get((generation, user_obj.pk))
+    if perms is None:
+        perms = _as_perm_strings(user_obj.user_permissions.all())
+        user_permission_cache.set((generation, user_obj.pk), perms)
+    return perms
+
+
+class RolePermissionBackend(ModelBackend):
+    """
+    ModelBackend whose permission sets are shared across requests.
+
+    Permissions are attached to each tenant Role's group, so group -> permissions
+    is cached once per role instead of being rebuilt from the database for every
+    request's user object. The signals in apps.roles.signals.permission_cache
+    start a new generation on every change, which every process sees through the
+    shared cache; the TTL only evicts entries of old generations.
+    """
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+
+        perm_cache_name = "_%s_perm_cache" % from_name
+        if not hasattr(user_obj, perm_cache_name):
+            generation = get_permission_generation()
+            # Sets read now are cached for every request under this generation
+            with read_from_primary():
+                perms = self._get_cached_permissions(user_obj, from_name, generation)
+            setattr(user_obj, perm_cache_name, set(perms))
+        return getattr(user_obj, perm_cache_name)
+
+    def _get_cached_permissions(self, user_obj, from_name: str, generation: str) -> FrozenSet[str]:
+        if user_obj.is_superuser:
+            return get_group_permissions(ALL_PERMISSIONS_KEY, generation)
+        if from_name == "group":
+            return frozenset().union(
+                *(
+                    get_group_permissions(group_id, generation)
+                    for group_id in get_user_group_ids(user_obj, generation)
+                )
+            )
+        return get_user_permissions(user_obj, generation)
@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.apps import apps
+from django.contrib.auth.models import Permission
+
+# Only models of the project's own apps can be granted through roles
+CRM_APP_PREFIX = "apps."
+
+
+class MissingPermissions(Exception):
+    pass
+
+
+def model_codenames(model) -> List[str]:
+    """The codenames Django creates for a model: its default and Meta.permissions"""
+    opts = model._meta
+    codenames = [f"{action}_{opts.model_name}" for action in opts.default_permissions]
+    codenames.extend(codename for codename, _ in opts.permissions)
+    return codenames
+
+
+class PermissionRegistry:
+    """
+    Maps permission codenames of every CRM model to Permission ids.
+
+    The codenames are collected from model metadata once the app registry is
+    ready, so new models and Meta.permissions are picked up without code
+    changes. Their ids are loaded with a single query on first use and reloaded
+    when migrations or Permission changes may have altered them.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # codename -> (app_label, model_name)
+        self._codenames: Dict[str, Tuple[str, str]] = {}
+        self._ids: Optional[Dict[Tuple[str, str, str], int]] = None
+
+    def build(self) -> None:
+        codenames: Dict[str, Tuple[str, str]] = {}
+        ambiguous = set()
+        for app_config in apps.get_app_configs():
+            if not app_config.name.startswith(CRM_APP_PREFIX):
+                continue
+            for model in app_config.get_models():
+                key = (model._meta.app_label, model._meta.model_name)
+                for codename in model_codenames(model):
+                    codenames[f"{key[0]}.{codename}"] = key
+                    if codename in codenames:
+                        ambiguous.add(codename)
+                    codenames[codename] = key
+        # Codenames shared by several apps must be given as app_label.codename
+        for codename in ambiguous:
+            del codenames[codename]
+        with self._lock:
+            self._codenames = codenames
+            self._ids = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ids = None
+
+    def load_ids(self) -> Dict[Tuple[str, str, str], int]:
+        app_labels = {app_label for app_label, _ in self._codenames.values()}
+        rows = Permission.objects.filter(content_type__app_label__in=app_labels).values_list(
+            "content_type__app_label", "content_type__model", "codename", "id"
+        )
+        return {(app_label, model, codename): id for app_label, model, codename, id in rows}
+
+    def _lookup(self, codenames: List[str], ids) -> Tuple[Dict[str, int], List[str]]:
+        resolved, missing = {}, []
+        for codename in codenames:
+            key = self._codenames.get(codename)
+            permission_id = None
+            if key is not None:
+                permission_id = ids.get((*key, codename.rsplit(".", 1)[-1]))
+            if permission_id is None:
+                missing.append(codename)
+            else:
+                resolved[codename] = permission_id
+        return resolved, missing
+
+    def resolve(self, codenames: Iterable[str]) -> Dict[str, int]:
+        """Map codenames to Permission ids, raising MissingPermissions for unknown ones"""
+        codenames = list(dict.fromkeys(codenames))
+        with self._lock:
+            ids = self._ids
+        cached = ids is not None
+        if not cached:
+            ids = self.load_ids()
+        resolved, missing = self._lookup(codenames, ids)
+        if cached and any(codename in self._codenames for codename in missing):
+            # The Permission rows may have been created since the ids were loaded
+            ids = self.load_ids()
+            resolved, missing = self._lookup(codenames, ids)
+        with self._lock:
+            self._ids = ids
+        if missing:
+            raise MissingPermissions(f"Unknown permissions: {', '.join(sorted(missing))}")
+        return resolved
+
+    def __contains__(self, codename: str) -> bool:
+        return codename in self._codenames
+
+
+permission_registry = PermissionRegistry()
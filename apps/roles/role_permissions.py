@@ -1,44 +1,53 @@
-from django.contrib.auth.models import Permission
+from typing import Dict, Iterable, List
 
+from apps.roles.models import (DEFAULT_ADMIN_ROLE_NAME,
+                               DEFAULT_MANAGER_ROLE_NAME,
+                               DEFAULT_SALES_ROLE_NAME)
+from apps.roles.registry import permission_registry
 
-def get_sales_permissions():
-    sales_permissions = []
-    return sales_permissions
+SALES_PERMISSIONS: List[str] = []
 
-def get_manager_permissions():
-    manager_permissions = []
-    manager_permissions.append(Permission.objects.get(codename='list_userprofile'))
-    return manager_permissions
-    
-def get_admin_permissions():
-    admin_permissions = []
-    # Allow access to Role model
-    admin_permissions.append(Permission.objects.get(codename='add_role'))
-    admin_permissions.append(Permission.objects.get(codename='change_role'))
-    admin_permissions.append(Permission.objects.get(codename='delete_role'))
-    admin_permissions.append(Permission.objects.get(codename='view_role'))
+MANAGER_PERMISSIONS = ["list_userprofile"]
 
+ADMIN_PERMISSIONS = [
+    # Allow access to Role model
+    "add_role",
+    "change_role",
+    "delete_role",
+    "view_role",
     # Allow access to UserProfile model
-    admin_permissions.append(Permission.objects.get(codename='add_userprofile'))
-    admin_permissions.append(Permission.objects.get(codename='change_userprofile'))
-    admin_permissions.append(Permission.objects.get(codename='view_userprofile'))
-    admin_permissions.append(Permission.objects.get(codename='list_userprofile'))
-    
+    "add_userprofile",
+    "change_userprofile",
+    "view_userprofile",
+    "list_userprofile",
     # Allow access to Contacts model
-    admin_permissions.append(Permission.objects.get(codename='add_contact'))
-    admin_permissions.append(Permission.objects.get(codename='change_contact'))
-    admin_permissions.append(Permission.objects.get(codename='delete_contact'))
-    admin_permissions.append(Permission.objects.get(codename='view_contact'))
+    "add_contact",
+    "change_contact",
+    "delete_contact",
+    "view_contact",
     # Allow access to Contact Associate model
-    admin_permissions.append(Permission.objects.get(codename='add_contactassociate'))
-    admin_permissions.append(Permission.objects.get(codename='change_contactassociate'))
-    admin_permissions.append(Permission.objects.get(codename='delete_contactassociate'))
-    admin_permissions.append(Permission.objects.get(codename='view_contactassociate'))
+    "add_contactassociate",
+    "change_contactassociate",
+    "delete_contactassociate",
+    "view_contactassociate",
     # Allow access to Contact Note model
-    admin_permissions.append(Permission.objects.get(codename='add_contactnote'))
-    admin_permissions.append(Permission.objects.get(codename='change_contactnote'))
-    admin_permissions.append(Permission.objects.get(codename='delete_contactnote'))
-    admin_permissions.append(Permission.objects.get(codename='view_contactnote'))
+    "add_contactnote",
+    "change_contactnote",
+    "delete_contactnote",
+    "view_contactnote",
     # Allow access to Contact Timeline model
-    admin_permissions.append(Permission.objects.get(codename='view_contacttimeline'))
-    return admin_permissions
+    "view_contacttimeline",
+]
+
+# Permission codenames of the roles every tenant is provisioned with
+DEFAULT_ROLE_PERMISSIONS: Dict[str, List[str]] = {
+    DEFAULT_ADMIN_ROLE_NAME: ADMIN_PERMISSIONS,
+    DEFAULT_MANAGER_ROLE_NAME: MANAGER_PERMISSIONS,
+    DEFAULT_SALES_ROLE_NAME: SALES_PERMISSIONS,
+}
+
+
+def resolve_permission_ids(codenames: Iterable[str]) -> Dict[str, int]:
+    """Map codenames to Permission ids, raising MissingPermissions for unknown ones"""
+    return permission_registry.resolve(codenames)
+
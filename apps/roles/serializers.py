@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from apps.roles.constants import MAX_ROLE_NAME_LENGTH
 from apps.roles.models import Role
+from apps.roles.registry import MissingPermissions, permission_registry
 
 
 class RoleSerializer(serializers.ModelSerializer):
@@ -11,7 +12,18 @@ class RoleSerializer(serializers.ModelSerializer):
         read_only_fields = ["name"]
 
 
-class CreateRoleSerializer(serializers.Serializer):
-    name = serializers.CharField(max_length=MAX_ROLE_NAME_LENGTH)
+class RolePermissionsSerializer(serializers.Serializer):
+    # Comma separated codenames, validated to a list of Permission ids
     permissions = serializers.CharField()
-    
+
+    def validate_permissions(self, value):
+        codenames = [codename.strip() for codename in value.split(",") if codename.strip()]
+        try:
+            return list(permission_registry.resolve(codenames).values())
+        except MissingPermissions as error:
+            raise serializers.ValidationError(str(error))
+
+
+class CreateRoleSerializer(RolePermissionsSerializer):
+    name = serializers.CharField(max_length=MAX_ROLE_NAME_LENGTH)
+
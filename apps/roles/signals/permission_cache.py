@@ -0,0 +1,47 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.profiles.models import UserProfile
+from apps.roles.backends import invalidate_permissions
+
+CHANGE_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in CHANGE_ACTIONS:
+        invalidate_permissions()
+
+
+@receiver(m2m_changed, sender=UserProfile.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in CHANGE_ACTIONS:
+        invalidate_permissions()
+
+
+@receiver(m2m_changed, sender=UserProfile.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in CHANGE_ACTIONS:
+        invalidate_permissions()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance: Group, **kwargs):
+    # Memberships are removed by cascade, which sends no m2m_changed
+    invalidate_permissions()
+
+
+@receiver(post_save, sender=Permission)
+def permission_created(sender, instance: Permission, **kwargs):
+    invalidate_permissions()
+
+
+@receiver(post_delete, sender=Permission)
+def permission_deleted(sender, instance: Permission, **kwargs):
+    invalidate_permissions()
+
+
+@receiver(post_delete, sender=UserProfile)
+def user_deleted(sender, instance: UserProfile, **kwargs):
+    invalidate_permissions()
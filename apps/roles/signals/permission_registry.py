@@ -0,0 +1,17 @@
+from django.contrib.auth.models import Permission
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from apps.roles.registry import permission_registry
+
+
+@receiver(post_migrate)
+def migrated(sender, **kwargs):
+    # Migrations may add or remove Permission rows for new or deleted models
+    permission_registry.reset()
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def permission_changed(sender, instance: Permission, **kwargs):
+    permission_registry.reset()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.roles.models import Role
+from apps.utils.response_cache import ROLES, invalidate_responses
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance: Role, **kwargs):
+    invalidate_responses(instance.tenant_id, ROLES)
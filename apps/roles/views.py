@@ -1,50 +1,42 @@
+from functools import partial
 
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.models import Group
+from django.db import transaction
 from rest_framework import status, viewsets
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.contacts.models import Contact, ContactNote
+from apps.profiles.authentication import CachedTokenAuthentication
 from apps.profiles.models import UserProfile
 from apps.roles.models import (DEFAULT_ADMIN_ROLE_NAME,
                                DEFAULT_MANAGER_ROLE_NAME,
                                DEFAULT_SALES_ROLE_NAME, Role)
-from apps.roles.serializers import CreateRoleSerializer, RoleSerializer
+from apps.roles.serializers import (CreateRoleSerializer,
+                                    RolePermissionsSerializer, RoleSerializer)
+from apps.utils.response_cache import ROLES, CachedResponseMixin
 from apps.utils.serializers import GetSerializerMixin
 
 
-class RoleViewSet(viewsets.ModelViewSet, GetSerializerMixin):
-    authentication_classes = [TokenAuthentication]
+class RoleViewSet(CachedResponseMixin, viewsets.ModelViewSet, GetSerializerMixin):
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
     queryset = Role.objects.all()
     serializer_class = RoleSerializer
     serializer_action_classes = {
-        "create": CreateRoleSerializer
+        "create": CreateRoleSerializer,
+        "update": RolePermissionsSerializer,
+        "partial_update": RolePermissionsSerializer,
     }
 
-    def get_content_type(self, permission: str):
-        permission_model = permission.split("_")[1]
-        if "userprofile" == permission_model:
-            return ContentType.objects.get_for_model(UserProfile)
-        if "contact" == permission_model:
-            return ContentType.objects.get_for_model(Contact)
-        if "contactnote" == permission_model:
-            return ContentType.objects.get_for_model(ContactNote)
-        if "role" == permission_model:
-            return ContentType.objects.get_for_model(Role)
-        # TODO: Add for all models
-        return None
-
-    def extract_permissions(self, permissions_str: str):
-        return [Permission.objects.get(codename=p, content_type=self.get_content_type(p)) for p in permissions_str.split(",")]
+    def get_queryset(self):
+        # Roles are per tenant, which also keeps cached role lists tenant scoped
+        return super().get_queryset().filter(tenant=self.request.user.tenant_id)
 
     def list(self, request, *args, **kwargs):
         user : UserProfile = request.user
         if not user.is_staff and not user.has_perm("roles.view_role"):
             return Response({"message": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
-        return super().list(request, *args, **kwargs)
+        return self.cached_response(partial(super().list, request, *args, **kwargs), [ROLES])
 
     def create(self, request, *args, **kwargs):
         user : UserProfile = request.user
@@ -56,12 +48,11 @@ class RoleViewSet(viewsets.ModelViewSet, GetSerializerMixin):
         role_name = serializer.validated_data["name"]
         if self.get_queryset().filter(name=role_name, tenant=request.user.tenant).exists():
             return Response({"message": "Role already exists"}, status=status.HTTP_400_BAD_REQUEST)
-        group: Group = Group.objects.create(name=f"{user.tenant.id}_{role_name}")
-        permissions = self.extract_permissions(serializer.validated_data["permissions"])
-        group.permissions.set(permissions)
-        group.save()
-        role: Role = Role(name=role_name, group=group, tenant=user.tenant)
-        role.save()
+        with transaction.atomic():
+            group: Group = Group.objects.create(name=f"{user.tenant.id}_{role_name}")
+            group.permissions.add(*serializer.validated_data["permissions"])
+            role: Role = Role(name=role_name, group=group, tenant=user.tenant)
+            role.save()
         return Response({"message": f"Created new role {role_name}"}, status=status.HTTP_201_CREATED)
     
     def retrieve(self, request, *args, **kwargs):
@@ -77,7 +68,10 @@ class RoleViewSet(viewsets.ModelViewSet, GetSerializerMixin):
         role: Role = self.get_object()
         if role.name == DEFAULT_ADMIN_ROLE_NAME:
             return Response({"message": "Cannot update admin role"}, status=status.HTTP_400_BAD_REQUEST)
-        return super().update(request, *args, **kwargs)
+        serializer = RolePermissionsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        role.group.permissions.set(serializer.validated_data["permissions"])
+        return Response(RoleSerializer(role).data)
 
     def destroy(self, request, *args, **kwargs):
         user : UserProfile = request.user
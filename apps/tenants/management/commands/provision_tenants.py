@@ -0,0 +1,38 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.roles.registry import MissingPermissions
+from apps.tenants.provisioning import (PROVISIONING_BATCH_SIZE,
+                                       DuplicateTenants, TenantProvisioner)
+from apps.tenants.serializers import BulkTenantSerializer
+
+
+class Command(BaseCommand):
+    help = "Create tenants with their default roles from a CSV or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV with a header row, or a JSON list of tenants")
+        parser.add_argument("--batch-size", type=int, default=PROVISIONING_BATCH_SIZE)
+
+    def read_tenants(self, path):
+        with open(path, encoding="utf-8-sig", newline="") as file:
+            if path.endswith(".json"):
+                return json.load(file)
+            return [
+                {key: value for key, value in row.items() if value != ""}
+                for row in csv.DictReader(file)
+            ]
+
+    def handle(self, *args, **options):
+        serializer = BulkTenantSerializer(data=self.read_tenants(options["path"]), many=True)
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        try:
+            tenants = TenantProvisioner().create_tenants(
+                serializer.validated_data, batch_size=options["batch_size"]
+            )
+        except (DuplicateTenants, MissingPermissions) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Provisioned {len(tenants)} tenants"))
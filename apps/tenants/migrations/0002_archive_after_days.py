@@ -0,0 +1,18 @@
+# Generated by Django 4.0.6 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='archive_after_days',
+            field=models.IntegerField(default=365),
+        ),
+    ]
@@ -8,6 +8,8 @@ class Tenant(models.Model):
     max_prospects_per_user = models.IntegerField(default=10)
     # How long before user can re-lock an unlocked prospect
     prospect_cooldown_days = models.IntegerField(default=3)
+    # Timeline entries and notes older than this move to the archive (see apps.contacts.archive)
+    archive_after_days = models.IntegerField(default=365)
 
 
 class TenantAwareModel(models.Model):
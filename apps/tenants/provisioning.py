@@ -0,0 +1,85 @@
+from typing import Dict, Iterable, List
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+from apps.roles.models import Role
+from apps.roles.role_permissions import (DEFAULT_ROLE_PERMISSIONS,
+                                         resolve_permission_ids)
+from apps.tenants.models import Tenant
+
+PROVISIONING_BATCH_SIZE = 500
+
+
+class DuplicateTenants(Exception):
+    pass
+
+
+class TenantProvisioner:
+    """
+    Creates tenants together with their default Admin, Manager and Sales roles.
+
+    Permission codenames are resolved once, then every batch of tenants is
+    written with one bulk_create per table (tenants, groups, roles and the
+    group-permission rows) inside a single transaction.
+    """
+
+    def __init__(self, role_permissions: Dict[str, List[str]] = DEFAULT_ROLE_PERMISSIONS) -> None:
+        self._role_permissions = role_permissions
+        self._permission_ids = resolve_permission_ids(
+            codename for codenames in role_permissions.values() for codename in codenames
+        )
+
+    def create_tenants(
+        self, tenants_data: Iterable[Dict], batch_size: int = PROVISIONING_BATCH_SIZE
+    ) -> List[Tenant]:
+        tenants = [Tenant(**data) for data in tenants_data]
+        prefixes = [tenant.subdomain_prefix for tenant in tenants]
+        seen = set()
+        duplicates = {prefix for prefix in prefixes if prefix in seen or seen.add(prefix)}
+        duplicates |= set(
+            Tenant.objects.filter(subdomain_prefix__in=prefixes).values_list(
+                "subdomain_prefix", flat=True
+            )
+        )
+        if duplicates:
+            raise DuplicateTenants(
+                f"Subdomain prefixes already in use: {', '.join(sorted(duplicates))}"
+            )
+
+        created = []
+        for start in range(0, len(tenants), batch_size):
+            batch = tenants[start:start + batch_size]
+            with transaction.atomic():
+                Tenant.objects.bulk_create(batch)
+                self.create_roles(batch)
+            created.extend(batch)
+        return created
+
+    def create_roles(self, tenants: List[Tenant]) -> List[Role]:
+        """Create the default roles of already saved tenants"""
+        with transaction.atomic():
+            groups = Group.objects.bulk_create(
+                [
+                    Group(name=f"{tenant.id}_{role_name}")
+                    for tenant in tenants
+                    for role_name in self._role_permissions
+                ]
+            )
+            groups_by_name = {group.name: group for group in groups}
+            roles = []
+            group_permissions = []
+            for tenant in tenants:
+                for role_name, codenames in self._role_permissions.items():
+                    name = f"{tenant.id}_{role_name}"
+                    group = groups_by_name[name]
+                    roles.append(Role(name=name, group=group, tenant=tenant))
+                    group_permissions.extend(
+                        Group.permissions.through(
+                            group_id=group.id, permission_id=self._permission_ids[codename]
+                        )
+                        for codename in codenames
+                    )
+            Role.objects.bulk_create(roles)
+            Group.permissions.through.objects.bulk_create(group_permissions)
+        return roles
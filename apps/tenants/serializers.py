@@ -7,3 +7,17 @@ class TenantSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tenant
         fields = "__all__"
+
+
+class BulkTenantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tenant
+        fields = [
+            "name",
+            "subdomain_prefix",
+            "max_prospects_per_user",
+            "prospect_cooldown_days",
+            "archive_after_days",
+        ]
+        # Uniqueness is checked for the whole batch in one query by TenantProvisioner
+        extra_kwargs = {"subdomain_prefix": {"validators": []}}
@@ -1,22 +1,18 @@
-from django.contrib.auth.models import Group
+from django.db import transaction
 from rest_framework import status, viewsets
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from apps.roles.models import (DEFAULT_ADMIN_ROLE_NAME,
-                               DEFAULT_MANAGER_ROLE_NAME,
-                               DEFAULT_SALES_ROLE_NAME, Role)
-from apps.roles.role_permissions import (get_admin_permissions,
-                                         get_manager_permissions,
-                                         get_sales_permissions)
+from apps.profiles.authentication import CachedTokenAuthentication
 from apps.tenants.models import Tenant
-from apps.tenants.serializers import TenantSerializer
+from apps.tenants.provisioning import DuplicateTenants, TenantProvisioner
+from apps.tenants.serializers import BulkTenantSerializer, TenantSerializer
 
 
 class TenantViewSet(viewsets.ModelViewSet):
     serializer_class = TenantSerializer
     queryset = Tenant.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
 
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -30,31 +26,6 @@ class TenantViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
-    # Add a default Admin Role which has access to everything for the tenant
-    def create_admin_role(self, tenant: Tenant):
-        admin_group, _ = Group.objects.get_or_create(name=f"{tenant.id}_{DEFAULT_ADMIN_ROLE_NAME}")
-        admin_permissions = get_admin_permissions()
-        admin_group.permissions.set(admin_permissions)
-        admin_role: Role = Role(name=f"{tenant.id}_{DEFAULT_ADMIN_ROLE_NAME}", group=admin_group, tenant=tenant)
-        admin_group.save()
-        admin_role.save()
-    
-    def create_manager_role(self, tenant: Tenant):
-        manager_group, _ = Group.objects.get_or_create(name=f"{tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}")
-        manager_permissions = get_manager_permissions()
-        manager_group.permissions.set(manager_permissions)
-        manager_role: Role = Role(name=f"{tenant.id}_{DEFAULT_MANAGER_ROLE_NAME}", group=manager_group, tenant=tenant)
-        manager_group.save()
-        manager_role.save()
-    
-    def create_sales_role(self, tenant: Tenant):
-        sales_group, _ = Group.objects.get_or_create(name=f"{tenant.id}_{DEFAULT_SALES_ROLE_NAME}")
-        sales_permissions = get_sales_permissions()
-        sales_group.permissions.set(sales_permissions)
-        sales_role: Role = Role(name=f"{tenant.id}_{DEFAULT_SALES_ROLE_NAME}", group=sales_group, tenant=tenant)
-        sales_group.save()
-        sales_role.save()
-
     def create(self, request, *args, **kwargs):
         # Only staff is allowed to create new tenants
         #if not request.user.is_staff:
@@ -63,13 +34,23 @@ class TenantViewSet(viewsets.ModelViewSet):
         # Create the Tenant
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-
-        tenant: Tenant = Tenant.objects.get(name=serializer.validated_data["name"])
-        self.create_admin_role(tenant=tenant)
-        self.create_manager_role(tenant=tenant)
-        self.create_sales_role(tenant=tenant)
+        with transaction.atomic():
+            self.perform_create(serializer)
+            tenant: Tenant = serializer.instance
+            TenantProvisioner().create_roles([tenant])
 
         # Return success response
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_provision(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return Response({"message": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        serializer = BulkTenantSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tenants = TenantProvisioner().create_tenants(serializer.validated_data)
+        except DuplicateTenants as error:
+            return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(TenantSerializer(tenants, many=True).data, status=status.HTTP_201_CREATED)
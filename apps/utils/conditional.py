@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .response_cache import response_cache
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag headers for read actions of a viewset.
+
+    Lists are versioned by the tenant's response cache generations of the
+    namespaces they are built from, which every write path already starts
+    anew, so an unchanged list is answered with a 304 without any query.
+    Last-Modified is only sent for single rows: a list's latest change time
+    does not move when a row is deleted.
+    """
+
+    def get_etag(self, version: Iterable) -> str:
+        request = self.request
+        # The same rows render differently per URL (page, fields, expand), user and format
+        key = "|".join(
+            str(part)
+            for part in (
+                request.get_full_path(),
+                request.user.pk,
+                getattr(request.accepted_renderer, "format", ""),
+                *version,
+            )
+        )
+        return quote_etag(hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def conditional_response(
+        self, version: Iterable, render: Callable, last_modified: Optional[datetime] = None
+    ):
+        etag = self.get_etag(version)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def conditional_generation_response(self, namespaces: Iterable[str], render: Callable):
+        tenant_id = getattr(self.request.user, "tenant_id", None)
+        if tenant_id is None:
+            return render()
+        generations = response_cache.get_generations(tenant_id, namespaces)
+        return self.conditional_response(generations, render)
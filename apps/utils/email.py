@@ -1,12 +1,27 @@
-from django.core.mail import EmailMessage
-from logistics_crm.settings import EMAIL_HOST_USER
+from typing import Dict, Iterable
+
+from django.db import transaction
+
+from apps.outbox.models import OutboxEmail
+from apps.outbox.tasks import schedule_send
 
 
 def send_email(data):
-    email = EmailMessage(
-        subject=data["email_subject"],
-        body=data["email_body"],
-        to=[data["to_email"]],
-        from_email=EMAIL_HOST_USER,
+    """Queue an email, {"email_subject", "email_body", "to_email"}, for the outbox sender"""
+    send_emails([data])
+
+
+def send_emails(messages: Iterable[Dict]) -> None:
+    OutboxEmail.objects.bulk_create(
+        [
+            OutboxEmail(
+                subject=data["email_subject"],
+                body=data["email_body"],
+                to_email=data["to_email"],
+            )
+            for data in messages
+        ]
     )
-    email.send()
+    # Celery must not look for the rows before they are committed
+    transaction.on_commit(schedule_send)
+
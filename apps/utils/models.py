@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils import timezone
+
+
+class UpdatedOnQuerySet(models.QuerySet):
+    """Keeps updated_on current for set-based writes, which skip auto_now"""
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_on", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_on = now
+        if "updated_on" not in fields:
+            fields = [*fields, "updated_on"]
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class VersionedModel(models.Model):
+    """
+    Rows carry the time of their last write, used as their version for ETags.
+
+    save(update_fields=...) callers must list updated_on to bump it.
+    """
+
+    updated_on = models.DateTimeField(auto_now=True)
+
+    objects = UpdatedOnQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,192 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import date
+from functools import partial
+from typing import List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+# Querysets annotated with this (see apps.contacts.search) page by relevance
+RANK_ANNOTATION = "search_rank"
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on every column of a stable ordering, e.g. (name, id).
+
+    Each page is fetched with a row-value comparison against the last row of the
+    previous page, so page N costs the same as page 1 and no COUNT query runs.
+    Cursors carry the tenant they were issued for and are rejected elsewhere.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering: Tuple[str, ...] = ("-created_on", "-id")
+    ranked_ordering: Tuple[str, ...] = (f"-{RANK_ANNOTATION}", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.tenant_id = getattr(request.user, "tenant_id", None)
+        self.ordering = self.get_ordering(queryset)
+
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            position = self.clean_position(queryset, position)
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        results = self.fetch_results(queryset, ordering, position)
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def fetch_results(self, queryset: QuerySet, ordering: Tuple[str, ...], position) -> List:
+        """Up to page_size + 1 rows after position, the extra row tells whether there are more"""
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, position))
+        return list(queryset[: self.page_size + 1])
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_ordering(self, queryset: QuerySet) -> Tuple[str, ...]:
+        if RANK_ANNOTATION in queryset.query.annotations:
+            return self.ranked_ordering
+        return self.ordering
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(reverse=False, instance=self.page[-1])
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(reverse=True, instance=self.page[0])
+
+    def reversed_ordering(self) -> Tuple[str, ...]:
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def get_position_filter(self, ordering: Tuple[str, ...], position: List) -> Q:
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal_prefix & Q(**{f"{name}__{lookup}": value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+    def get_position(self, instance) -> List:
+        # Pages may hold model instances or QuerySet.values() rows
+        get = instance.get if isinstance(instance, dict) else partial(getattr, instance)
+        position = [get(field.lstrip("-")) for field in self.ordering]
+        # Keep full microsecond precision, DjangoJSONEncoder truncates to millis
+        return [v.isoformat() if isinstance(v, date) else v for v in position]
+
+    def encode_cursor(self, reverse: bool, instance) -> str:
+        payload = {"t": self.tenant_id, "r": reverse, "p": self.get_position(instance)}
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            reverse, position = bool(payload["r"]), list(payload["p"])
+            tenant_id = payload["t"]
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if tenant_id != self.tenant_id or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def get_ordering_field(self, queryset: QuerySet, name: str):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def clean_position(self, queryset: QuerySet, position: List) -> List:
+        """Convert cursor values to their column types, anything else is an invalid cursor"""
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+            if isinstance(value, int) and not -(2 ** 63) <= value < 2 ** 63:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                ordering_field = self.get_ordering_field(queryset, field.lstrip("-"))
+                value = ordering_field.to_python(value)
+            except (FieldDoesNotExist, ValidationError, TypeError, ValueError, OverflowError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+
+class NameKeysetPagination(KeysetPagination):
+    ordering = ("name", "id")
+
+
+class CreatedOnKeysetPagination(KeysetPagination):
+    ordering = ("-created_on", "-id")
+
+
+def paginate_response(view, queryset: QuerySet, serializer_class, pagination_class):
+    """Paginate a detail action's queryset with a paginator other than the view's"""
+    paginator = pagination_class()
+    page = paginator.paginate_queryset(queryset, view.request, view=view)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Optional
+
+import phonenumbers
+from django.conf import settings
+
+
+def normalize_phone_number(number, region: Optional[str] = None) -> Optional[str]:
+    """
+    E.164 form of a phone number in any common format, e.g. "(202) 555-0101" ->
+    "+12025550101". Numbers without a country code are read in region, by
+    default PHONENUMBER_DEFAULT_REGION. Returns None for invalid input.
+    """
+    if not number:
+        return None
+    region = region or getattr(settings, "PHONENUMBER_DEFAULT_REGION", None) or "US"
+    return _normalize(str(number), region)
+
+
+@lru_cache(maxsize=10000)
+def _normalize(number: str, region: str) -> Optional[str]:
+    # Parsing dominates a lookup, and the same numbers keep calling
+    try:
+        parsed = phonenumbers.parse(number, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(parsed):
+        return None
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from routers.db_routers import read_from_primary
+
+RESPONSE_CACHE_ALIAS = "responses"
+
+# Invalidation namespaces, each versioned per tenant
+CONTACTS = "contacts"
+USERS = "users"
+ROLES = "roles"
+# Not a response namespace: versions the in-process caller ID indexes (apps.contacts.caller_id)
+CALLER_ID = "caller_id"
+
+
+def timeline_namespace(contact_id: int) -> str:
+    return f"timeline:{contact_id}"
+
+
+class ResponseCache:
+    """
+    Caches the data of successful GET responses per tenant, endpoint, query
+    parameters and permission scope.
+
+    Every key embeds the current generation of the tenant's namespaces it
+    depends on. Invalidating a namespace deletes its generation key, so all the
+    responses built from it are orphaned at once and expire on their own.
+    Concurrent misses for one key are coalesced: a single caller renders while
+    the others wait for its result.
+    """
+
+    lock_stripes = 64
+
+    def __init__(self, alias: str = RESPONSE_CACHE_ALIAS) -> None:
+        self.alias = alias
+        self._locks = [threading.Lock() for _ in range(self.lock_stripes)]
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self) -> int:
+        return getattr(settings, "RESPONSE_CACHE_TTL", 300)
+
+    @property
+    def lock_timeout(self) -> int:
+        # How long a rendering caller holds the key and others wait for it
+        return getattr(settings, "RESPONSE_CACHE_LOCK_TIMEOUT", 10)
+
+    def generation_key(self, tenant_id: int, namespace: str) -> str:
+        return f"generation:{tenant_id}:{namespace}"
+
+    def get_generations(self, tenant_id: int, namespaces: Iterable[str]) -> List[str]:
+        keys = [self.generation_key(tenant_id, namespace) for namespace in namespaces]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                # A fresh value can never match a key written under an older generation
+                self.cache.add(key, str(time.time_ns()), timeout=None)
+                generations[key] = self.cache.get(key)
+        return [str(generations[key]) for key in keys]
+
+    def invalidate(self, tenant_id: Optional[int], *namespaces: str) -> None:
+        if tenant_id is None or not namespaces:
+            return
+        self.cache.delete_many([self.generation_key(tenant_id, namespace) for namespace in namespaces])
+
+    def make_key(
+        self, request, tenant_id: int, endpoint: str, namespaces: Iterable[str], scope: str
+    ) -> str:
+        params = sorted(
+            (name, value) for name, values in request.query_params.lists() for value in values
+        )
+        generations = self.get_generations(tenant_id, namespaces)
+        digest = hashlib.sha1(
+            json.dumps([endpoint, scope, generations, params]).encode("utf-8")
+        ).hexdigest()
+        return f"response:{tenant_id}:{digest}"
+
+    def get_or_render(self, key: str, render: Callable[[], Response]) -> Response:
+        data = self.cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        # The stripe lock only coalesces the threads of this process, it is
+        # released before waiting on another process so other keys are not held up
+        lock = self._locks[hash(key) % self.lock_stripes]
+        lock_key = f"{key}:lock"
+        with lock:
+            # Another thread of this process may have filled it while we waited
+            data = self.cache.get(key)
+            if data is not None:
+                return Response(data)
+            if self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+                try:
+                    return self.render_and_store(key, render)
+                finally:
+                    self.cache.delete(lock_key)
+
+        # Another process is rendering this key
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = self.cache.get(key)
+            if data is not None:
+                return Response(data)
+        return render()
+
+    def render_and_store(self, key: str, render: Callable[[], Response]) -> Response:
+        # Served to every client under the current generation, so never from a lagging replica
+        with read_from_primary():
+            response = render()
+        if isinstance(response, Response) and response.status_code == 200:
+            # Store plain JSON types, the renderer would emit the same output for them
+            data = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            self.cache.set(key, data, timeout=self.timeout)
+        return response
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """Serves read actions of a viewset from the tenant scoped response cache"""
+
+    def cached_response(
+        self,
+        render: Callable[[], Response],
+        namespaces: Iterable[str],
+        scope: str = "tenant",
+    ) -> Response:
+        """
+        scope must separate users who would see different data at the same URL,
+        e.g. f"user:{user.id}" for responses filtered to the requesting user.
+        """
+        request = self.request
+        tenant_id = getattr(request.user, "tenant_id", None)
+        if tenant_id is None:
+            return render()
+        endpoint = f"{self.basename}.{self.action}:{json.dumps(self.kwargs, sort_keys=True)}"
+        key = response_cache.make_key(request, tenant_id, endpoint, namespaces, scope)
+        return response_cache.get_or_render(key, render)
+
+
+def invalidate_responses(tenant_id: Optional[int], *namespaces: str) -> None:
+    """
+    Invalidate once the current transaction commits, otherwise a concurrent
+    request could cache the old rows again under the new generation.
+    """
+    transaction.on_commit(lambda: response_cache.invalidate(tenant_id, *namespaces))
+
+
+def invalidate_timelines(tenant_id: Optional[int], contact_ids: Iterable[int]) -> None:
+    invalidate_responses(tenant_id, *[timeline_namespace(contact_id) for contact_id in contact_ids])
+
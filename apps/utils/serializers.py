@@ -1,6 +1,77 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+
 class GetSerializerMixin(object):
     def get_serializer_class(self):
         try:
             return self.serializer_action_classes[self.action]
         except (KeyError, AttributeError):
-            return super().get_serializer_class()
\ No newline at end of file
+            return super().get_serializer_class()
+
+# Fields whose database value is already its JSON representation
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class RowSerializer:
+    """
+    Read-only fast path of a ModelSerializer for QuerySet.values() rows.
+
+    The field plan is compiled once from the ModelSerializer: columns whose
+    value is already JSON ready are copied as is and the rest keep their
+    field's to_representation. Rows skip model instantiation and the per-field
+    attribute lookups, and the output matches the ModelSerializer.
+    """
+
+    def __init__(self, serializer_class) -> None:
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def plan(self) -> List[Tuple[str, str, Optional[Callable]]]:
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            plan.append((name, field.source, convert))
+        return plan
+
+    @cached_property
+    def columns(self) -> List[str]:
+        return [source for _, source, _ in self.plan]
+
+    @property
+    def field_names(self) -> List[str]:
+        return [name for name, _, _ in self.plan]
+
+    def only(self, fields: Iterable[str]) -> "RowSerializer":
+        """A copy that outputs only the given fields, reusing the compiled plan"""
+        fields = set(fields)
+        row_serializer = RowSerializer(self.serializer_class)
+        row_serializer.plan = [entry for entry in self.plan if entry[0] in fields]
+        return row_serializer
+
+    def values(self, queryset: QuerySet, *extra_columns: str) -> QuerySet:
+        # Annotations are kept so paginators can key on them, e.g. a search rank
+        columns = dict.fromkeys([*self.columns, *extra_columns, *queryset.query.annotations])
+        return queryset.values(*columns)
+
+    def to_representation(self, row: Dict) -> Dict:
+        return {
+            name: row[source] if convert is None or row[source] is None else convert(row[source])
+            for name, source, convert in self.plan
+        }
+
+    def serialize(self, rows: Iterable[Dict]) -> List[Dict]:
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
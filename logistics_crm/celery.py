@@ -1,9 +1,30 @@
 import os
 
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
+
+from routers.db_routers import RoutingState, routing_state
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "logistics_crm.settings")
 app = Celery("logistics_crm")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.conf.timezone = 'US/Pacific'
 app.autodiscover_tasks()
+
+
+# task id -> token of the routing state set for the task
+routing_tokens = {}
+
+
+@task_prerun.connect
+def read_primary_in_tasks(task_id=None, **kwargs):
+    # Tasks mostly read rows written right before they were queued, a replica may not have them yet
+    routing_tokens[task_id] = routing_state.set(RoutingState(in_request=True, wrote=True))
+
+
+@task_postrun.connect
+def reset_routing_state(task_id=None, **kwargs):
+    # Eager and threaded tasks share their context with whatever runs next
+    token = routing_tokens.pop(task_id, None)
+    if token is not None:
+        routing_state.reset(token)
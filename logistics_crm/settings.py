@@ -21,6 +21,21 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT"))
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 EMAIL_USE_SSL = True
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# Seconds before a blocking SMTP operation of the outbox sender gives up
+EMAIL_TIMEOUT = 10
+# Outbox delivery (see apps.outbox.sender), times in seconds
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": 100,
+    # Batches per run, a longer backlog is left to the next run
+    "MAX_BATCHES": 50,
+    "MAX_ATTEMPTS": 5,
+    # Delay before the first retry, doubled per attempt up to MAX_BACKOFF
+    "RETRY_BACKOFF": 30,
+    "MAX_BACKOFF": 3600,
+    "SEND_INTERVAL": 60,
+    # How long a claimed batch is reserved for its run before another may take it over
+    "LEASE_SECONDS": 600,
+}
 
 ALLOWED_HOSTS = [
     "*",
@@ -33,6 +48,7 @@ CRM_APPS = [
     "apps.roles",
     "apps.contacts",
     "apps.gotoconnect",
+    "apps.outbox",
 ]
 
 DJANGO_APPS = [
@@ -42,6 +58,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "corsheaders",
@@ -58,6 +75,8 @@ INSTALLED_APPS = DJANGO_APPS + CRM_APPS + THIRD_PARTY_APPS
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Outside SessionMiddleware, whose session save must still see the request's routing state
+    "routers.middleware.ReplicaStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -99,9 +118,39 @@ DATABASES = {
     },
 }
 
+# Reads are spread over the replicas by weight, writes go to the primary (see routers.db_routers)
+DATABASE_ROUTING = {
+    "PRIMARY": "default",
+    "REPLICAS": {},
+    "STICKY_SECONDS": int(os.getenv("DB_STICKY_SECONDS", 5)),
+    "SESSION_STICKINESS": True,
+    "MAX_LAG": float(os.getenv("DB_REPLICA_MAX_LAG")) if os.getenv("DB_REPLICA_MAX_LAG") else None,
+    "LAG_CHECK_INTERVAL": 5,
+}
+
+# e.g. DB_REPLICA_HOSTS=replica-1,replica-2 and DB_REPLICA_WEIGHTS=3,1
+DB_REPLICA_HOSTS = [host for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host]
+DB_REPLICA_WEIGHTS = [float(weight) for weight in os.getenv("DB_REPLICA_WEIGHTS", "").split(",") if weight]
+for number, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        # Tests read the primary's data through the replica alias
+        "TEST": {"MIRROR": "default"},
+    }
+    weight = DB_REPLICA_WEIGHTS[number - 1] if number <= len(DB_REPLICA_WEIGHTS) else 1
+    DATABASE_ROUTING["REPLICAS"][f"replica_{number}"] = weight
+
+DATABASE_ROUTERS = ["routers.db_routers.ReplicaRouter"]
+
 
 AUTH_USER_MODEL = "profiles.UserProfile"
 
+AUTHENTICATION_BACKENDS = ["apps.roles.backends.RolePermissionBackend"]
+
+# Seconds a role's permission set is shared across requests (see apps.roles.backends)
+PERMISSION_CACHE_TTL = 300
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -137,6 +186,11 @@ STATICFILES_DIRS = [
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+# Archived timeline entries and notes (see apps.contacts.archive). Set
+# CONTACT_ARCHIVE_STORAGE to a storage class path to keep them in object storage
+CONTACT_ARCHIVE_ROOT = BASE_DIR / "archive"
+CONTACT_ARCHIVE_STORAGE = None
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGGING = {
@@ -177,4 +231,89 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 100,
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Shared across workers through Redis when available (see apps.utils.response_cache)
+    "responses": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+    if os.getenv("REDIS_URL")
+    else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+    },
+    # GoToConnect access tokens (see apps.gotoconnect.tokens)
+    "tokens": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+    if os.getenv("REDIS_URL")
+    else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tokens",
+    },
+    # Which clients read from the primary after a write (see routers.middleware)
+    "routing": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+    if os.getenv("REDIS_URL")
+    else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "routing",
+    },
+}
+
+# Seconds a cached GET response is served before it is rebuilt
+RESPONSE_CACHE_TTL = 300
+
+# Seconds an authenticated token -> user/tenant/role lookup is reused in-process
+AUTH_TOKEN_CACHE_TTL = 60
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+# GoToConnect origins, point both at `manage.py fake_gotoconnect` for local testing
+GOTOCONNECT_AUTH_URL = os.getenv("GOTOCONNECT_AUTH_URL", "https://authentication.logmeininc.com")
+GOTOCONNECT_API_URL = os.getenv("GOTOCONNECT_API_URL", "https://api.jive.com")
+# Outbound HTTP limits (see apps.gotoconnect.client), timeouts in seconds
+GOTOCONNECT_HTTP = {
+    "POOL_SIZE": 4,
+    "POOL_TIMEOUT": 2.0,
+    "CONNECT_TIMEOUT": 3.0,
+    "READ_TIMEOUT": 10.0,
+    "MAX_RETRIES": 2,
+    "BACKOFF": 0.2,
+    "FAILURE_THRESHOLD": 5,
+    "RESET_TIMEOUT": 30.0,
+}
+# OAuth token refresh (see apps.gotoconnect.tokens), in seconds
+GOTOCONNECT_TOKENS = {
+    # Tokens expiring within this window are refreshed, must exceed REFRESH_INTERVAL
+    "REFRESH_MARGIN": 900,
+    "REFRESH_INTERVAL": 300,
+    "BATCH_SIZE": 100,
+    # How long a process reuses a token before asking the shared cache again
+    "LOCAL_TTL": 30,
+}
+# Call event ingestion (see apps.gotoconnect.events). Without Redis, events are
+# buffered and recorded inside the web process
+GOTOCONNECT_EVENTS = {
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "QUEUE_KEY": "gotoconnect:call-events",
+    "BATCH_SIZE": 500,
+    # Seconds the worker waits for the first event of a batch
+    "MAX_WAIT": 1.0,
+    # Attempts before failing events are moved to the "<QUEUE_KEY>:dead" list
+    "MAX_ATTEMPTS": 5,
+}
+
+# Region of phone numbers given without a country code
+PHONENUMBER_DEFAULT_REGION = "US"
+# Seconds a process serves its caller ID index before checking for writes elsewhere
+CALLER_ID_RECHECK_INTERVAL = 1.0
+# Seconds after which an index is rebuilt even if no write was seen, e.g. without REDIS_URL
+CALLER_ID_MAX_AGE = 300.0
+
 CORS_ORIGIN_ALLOW_ALL = True
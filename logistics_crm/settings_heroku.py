@@ -22,3 +22,11 @@ if "DATABASE_URL" in os.environ:
     DATABASES["default"] = dj_database_url.config(
         conn_max_age=MAX_CONN_AGE, ssl_require=True
     )
+
+# Follower databases as read replicas, e.g. DB_REPLICA_URLS=<follower 1 URL>,<follower 2 URL>
+for number, url in enumerate([url for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url], 1):
+    DATABASES[f"replica_{number}"] = {
+        **dj_database_url.parse(url, conn_max_age=MAX_CONN_AGE, ssl_require=True),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTING["REPLICAS"].setdefault(f"replica_{number}", 1)
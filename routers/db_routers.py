@@ -1,3 +1,19 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from apps.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
 class DbRouter:
 
     def __init__(self, db):
@@ -18,3 +34,154 @@ class DbRouter:
 class LocalRouter(DbRouter):
     def __init__(self):
         super().__init__('local')
+
+
+def get_routing_options() -> Dict:
+    options = {
+        "PRIMARY": "default",
+        # replica alias -> weight
+        "REPLICAS": {},
+        # How long reads stay on the primary after a write outside of a request
+        "STICKY_SECONDS": 5,
+        # Also keep the client's following requests on the primary for STICKY_SECONDS
+        "SESSION_STICKINESS": True,
+        # Replicas lagging more seconds than this are skipped, None disables lag checks
+        "MAX_LAG": None,
+        "LAG_CHECK_INTERVAL": 5,
+        # Dotted path of a function(alias) -> lag in seconds, replaces the built-in query
+        "LAG_PROBE": None,
+    }
+    options.update(getattr(settings, "DATABASE_ROUTING", {}))
+    return options
+
+
+class RoutingState:
+    """Whether the current request or task has written to the primary"""
+
+    def __init__(self, in_request: bool = False, pinned_until: float = 0.0, wrote: bool = False) -> None:
+        self.in_request = in_request
+        self.wrote = wrote
+        self.pinned_until = pinned_until
+
+    def pin(self, seconds: float) -> None:
+        self.wrote = True
+        self.pinned_until = max(self.pinned_until, time.time() + seconds)
+
+    @property
+    def pinned(self) -> bool:
+        # A request reads its own writes until it ends, whatever it takes
+        return (self.in_request and self.wrote) or self.pinned_until > time.time()
+
+
+routing_state: ContextVar[Optional[RoutingState]] = ContextVar("routing_state", default=None)
+# Set by read_from_primary
+primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+def get_routing_state() -> RoutingState:
+    state = routing_state.get()
+    if state is None:
+        state = RoutingState()
+        routing_state.set(state)
+    return state
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Send every read of the block to the primary. For rebuilding caches that are
+    shared between clients: rows read from a lagging replica would be stored
+    under the current generation and served to clients who wrote newer ones.
+    """
+    token = primary_reads.set(True)
+    try:
+        yield
+    finally:
+        primary_reads.reset(token)
+
+
+def postgresql_lag(alias: str) -> float:
+    with connections[alias].cursor() as cursor:
+        # NULL when the server is not replaying WAL, i.e. it is no replica
+        cursor.execute(
+            "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def get_replica_lag(alias: str) -> float:
+    """Replication lag of the replica in seconds, 0 for backends that cannot report it"""
+    if connections[alias].vendor == "postgresql":
+        return postgresql_lag(alias)
+    return 0.0
+
+
+class ReplicaRouter(DbRouter):
+    """
+    Sends writes to the primary and reads to replicas picked by weight.
+
+    Reads go to the primary instead:
+    - inside a transaction on the primary,
+    - for the rest of a request after it wrote, and for STICKY_SECONDS after
+      a write outside of requests or, with SESSION_STICKINESS, in the
+      client's next requests (see routers.middleware),
+    - in Celery tasks, which mostly read rows written right before they were queued,
+    - with the primary=True hint, e.g. Model.objects.db_manager(hints={"primary": True}),
+    - inside read_from_primary(), e.g. while rebuilding a shared cache,
+    - for related objects of an instance loaded from the primary,
+    - when MAX_LAG is set and no replica is within it.
+
+    Without replicas every query goes to the primary.
+    """
+
+    def __init__(self):
+        self.options = get_routing_options()
+        super().__init__(self.options["PRIMARY"])
+        self.replicas: Dict[str, float] = dict(self.options["REPLICAS"])
+        probe = self.options["LAG_PROBE"]
+        self.lag_probe = import_string(probe) if probe else get_replica_lag
+        self._lags = TTLCache(maxsize=len(self.replicas) or 1, ttl=self.options["LAG_CHECK_INTERVAL"])
+
+    def get_lag(self, alias: str) -> float:
+        lag = self._lags.get(alias)
+        if lag is None:
+            try:
+                lag = self.lag_probe(alias)
+            except Exception:
+                # An unreachable replica is skipped until the next check
+                logger.exception(f"Could not check the replication lag of {alias}")
+                lag = float("inf")
+            self._lags.set(alias, lag)
+        return lag
+
+    def get_available_replicas(self) -> List[str]:
+        max_lag = self.options["MAX_LAG"]
+        if max_lag is None:
+            return list(self.replicas)
+        return [alias for alias in self.replicas if self.get_lag(alias) <= max_lag]
+
+    def reads_primary(self, hints) -> bool:
+        if not self.replicas or hints.get("primary") or primary_reads.get():
+            return True
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == self.db:
+            return True
+        if connections[self.db].in_atomic_block:
+            return True
+        return get_routing_state().pinned
+
+    def db_for_read(self, model, **hints):
+        if self.reads_primary(hints):
+            return self.db
+        replicas = self.get_available_replicas()
+        if not replicas:
+            return self.db
+        return random.choices(replicas, weights=[self.replicas[alias] for alias in replicas])[0]
+
+    def db_for_write(self, model, **hints):
+        get_routing_state().pin(self.options["STICKY_SECONDS"])
+        return self.db
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db == self.db
@@ -0,0 +1,57 @@
+import hashlib
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .db_routers import RoutingState, get_routing_options, routing_state
+
+ROUTING_CACHE_ALIAS = "routing"
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Gives each request its own RoutingState for ReplicaRouter.
+
+    With SESSION_STICKINESS, a request that wrote keeps the same client's
+    requests on the primary for STICKY_SECONDS, so a client reading right after
+    its own write never sees a lagging replica. Clients are told apart by their
+    Authorization header or session cookie, remembered in the "routing" cache.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = get_routing_options()
+        self.enabled = bool(self.options["REPLICAS"])
+
+    @property
+    def cache(self):
+        return caches[ROUTING_CACHE_ALIAS]
+
+    def get_client_key(self, request) -> Optional[str]:
+        credentials = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+            settings.SESSION_COOKIE_NAME
+        )
+        if not credentials:
+            return None
+        return f"db:pinned:{hashlib.sha256(credentials.encode('utf-8')).hexdigest()}"
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        session_sticky = self.options["SESSION_STICKINESS"]
+        client_key = self.get_client_key(request) if session_sticky else None
+        pinned_until = (self.cache.get(client_key) or 0.0) if client_key else 0.0
+        state = RoutingState(in_request=True, pinned_until=pinned_until)
+        token = routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+
+        if client_key and state.wrote:
+            sticky_seconds = self.options["STICKY_SECONDS"]
+            self.cache.set(client_key, time.time() + sticky_seconds, timeout=sticky_seconds)
+        return response
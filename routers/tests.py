@@ -0,0 +1,225 @@
+import random
+from collections import Counter
+from contextlib import contextmanager
+from unittest import mock
+
+from celery import shared_task
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from apps.contacts.models import ContactImport
+from apps.tenants.models import Tenant
+
+from .db_routers import (ReplicaRouter, RoutingState, read_from_primary,
+                         routing_state)
+from .middleware import ROUTING_CACHE_ALIAS, ReplicaStickinessMiddleware
+
+# replica alias -> lag in seconds reported by fake_lag
+LAGS = {}
+
+
+def fake_lag(alias: str) -> float:
+    lag = LAGS.get(alias, 0.0)
+    if isinstance(lag, Exception):
+        raise lag
+    return lag
+
+
+# The replica aliases only need to exist in DATABASES to run queries, the
+# router's decisions are checked through QuerySet.db without connecting
+ROUTING = {
+    "REPLICAS": {"replica_1": 3, "replica_2": 1},
+    "STICKY_SECONDS": 5,
+    "MAX_LAG": 2,
+    "LAG_CHECK_INTERVAL": 0,
+    "LAG_PROBE": "routers.tests.fake_lag",
+}
+
+
+@override_settings(DATABASE_ROUTING=ROUTING, DATABASE_ROUTERS=["routers.db_routers.ReplicaRouter"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        LAGS.clear()
+        token = routing_state.set(RoutingState())
+        self.addCleanup(routing_state.reset, token)
+
+    def read_alias(self) -> str:
+        return Tenant.objects.all().db
+
+    def test_reads_are_spread_by_weight(self):
+        with mock.patch("routers.db_routers.random", random.Random(0)):
+            reads = Counter(self.read_alias() for _ in range(4000))
+        self.assertEqual(set(reads), {"replica_1", "replica_2"})
+        self.assertAlmostEqual(reads["replica_1"] / 4000, 0.75, delta=0.03)
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_write(Tenant), "default")
+        self.assertEqual(self.read_alias(), "default")
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        router = ReplicaRouter()
+        router.db_for_write(Tenant)
+        self.assertEqual(self.read_alias(), "default")
+        with mock.patch("routers.db_routers.time.time", return_value=routing_state.get().pinned_until + 1):
+            self.assertIn(self.read_alias(), ROUTING["REPLICAS"])
+
+    def test_a_request_reads_its_own_writes_until_it_ends(self):
+        routing_state.set(RoutingState(in_request=True))
+        self.assertIn(self.read_alias(), ROUTING["REPLICAS"])
+        ReplicaRouter().db_for_write(Tenant)
+        with mock.patch("routers.db_routers.time.time", return_value=routing_state.get().pinned_until + 60):
+            self.assertEqual(self.read_alias(), "default")
+
+    def test_lagging_replicas_are_skipped(self):
+        LAGS["replica_1"] = 10
+        self.assertEqual({self.read_alias() for _ in range(50)}, {"replica_2"})
+        LAGS["replica_2"] = ConnectionError("unreachable")
+        self.assertEqual(self.read_alias(), "default")
+        LAGS.clear()
+        self.assertIn(self.read_alias(), ROUTING["REPLICAS"])
+
+    def test_primary_hint_and_read_from_primary(self):
+        self.assertEqual(Tenant.objects.db_manager(hints={"primary": True}).all().db, "default")
+        with read_from_primary():
+            self.assertEqual(self.read_alias(), "default")
+        self.assertIn(self.read_alias(), ROUTING["REPLICAS"])
+
+    def test_only_the_primary_is_migrated(self):
+        router = ReplicaRouter()
+        self.assertTrue(router.allow_migrate("default", "tenants"))
+        self.assertFalse(router.allow_migrate("replica_1", "tenants"))
+
+
+@override_settings(DATABASE_ROUTING=ROUTING, DATABASE_ROUTERS=["routers.db_routers.ReplicaRouter"])
+class ReplicaStickinessMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        LAGS.clear()
+        caches[ROUTING_CACHE_ALIAS].clear()
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def write(self, request):
+        ReplicaRouter().db_for_write(Tenant)
+        return HttpResponse()
+
+    def read(self, request):
+        self.reads.append(Tenant.objects.all().db)
+        return HttpResponse()
+
+    def request(self, view, credentials):
+        request = self.factory.get("/", HTTP_AUTHORIZATION=credentials)
+        return ReplicaStickinessMiddleware(view)(request)
+
+    def test_a_client_reads_from_the_primary_after_its_write(self):
+        self.request(self.write, "Token writer")
+        self.request(self.read, "Token writer")
+        self.request(self.read, "Token reader")
+        self.assertEqual(self.reads[0], "default")
+        self.assertIn(self.reads[1], ROUTING["REPLICAS"])
+
+    def test_the_routing_state_ends_with_the_request(self):
+        state = RoutingState()
+        token = routing_state.set(state)
+        self.addCleanup(routing_state.reset, token)
+        self.request(self.write, "Token writer")
+        self.assertIs(routing_state.get(), state)
+        self.assertFalse(state.wrote)
+
+
+REPLICA = "replica"
+# A second connection to the primary's database. Registered on import, before
+# the test runner sets up databases, which then points it at the primary's
+# test database as a mirror.
+connections.settings.setdefault(
+    REPLICA,
+    {
+        **connections.settings["default"],
+        "TEST": {**connections.settings["default"]["TEST"], "MIRROR": "default"},
+    },
+)
+
+
+@receiver(connection_created)
+def read_uncommitted_on_sqlite(sender, connection, **kwargs):
+    # Connections to SQLite's shared in-memory test database lock the tables
+    # written in an open transaction for each other, e.g. TestCase's
+    if connection.alias == REPLICA and connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA read_uncommitted = true")
+
+
+@contextmanager
+def outside_test_transaction():
+    """The router reads the primary inside transactions, which TestCase wraps every test in"""
+    with mock.patch.object(connections["default"], "in_atomic_block", False):
+        yield
+
+
+@shared_task
+def read_tenant_name(tenant_id: int) -> str:
+    return Tenant.objects.get(id=tenant_id).name
+
+
+@override_settings(
+    DATABASE_ROUTING={"REPLICAS": {REPLICA: 1}, "STICKY_SECONDS": 5},
+    DATABASE_ROUTERS=["routers.db_routers.ReplicaRouter"],
+)
+class ReplicaConnectionTests(TestCase):
+    """
+    Routing against real connections, the replica alias being a test mirror of
+    the primary, i.e. a replica without lag. Whether a mirror sees the rows
+    written in a test's transaction depends on the backend, so the tests check
+    which connection ran the queries.
+    """
+
+    databases = {"default", REPLICA}
+
+    def setUp(self):
+        self.start_request()
+        self.tenant = Tenant.objects.create(name="Replicated", subdomain_prefix="replicated")
+        self.start_request()
+
+    def start_request(self):
+        token = routing_state.set(RoutingState(in_request=True))
+        self.addCleanup(routing_state.reset, token)
+
+    @contextmanager
+    def assert_reads(self, alias: str):
+        with outside_test_transaction(), CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            yield
+        queries = {"default": len(primary), REPLICA: len(replica)}
+        self.assertGreater(queries.pop(alias), 0)
+        self.assertEqual(set(queries.values()), {0})
+
+    def test_reads_use_the_replica_connection(self):
+        with self.assert_reads(REPLICA):
+            self.assertFalse(ContactImport.objects.exists())
+
+    def test_a_request_reads_its_own_writes(self):
+        tenant = Tenant.objects.create(name="Fresh", subdomain_prefix="fresh")
+        with self.assert_reads("default"):
+            self.assertEqual(Tenant.objects.get(id=tenant.id).name, "Fresh")
+
+    def test_tasks_read_from_the_primary(self):
+        with self.assert_reads("default"):
+            self.assertEqual(read_tenant_name.apply(args=[self.tenant.id]).get(), "Replicated")
+        # Only for the task, the request goes on reading the replica
+        with self.assert_reads(REPLICA):
+            self.assertFalse(ContactImport.objects.exists())
+
+    def test_primary_hint(self):
+        with self.assert_reads("default"):
+            tenant = Tenant.objects.db_manager(hints={"primary": True}).get(id=self.tenant.id)
+        self.assertEqual(tenant.name, "Replicated")
+
+    def test_read_from_primary(self):
+        with self.assert_reads("default"), read_from_primary():
+            self.assertEqual(Tenant.objects.get(id=self.tenant.id).name, "Replicated")